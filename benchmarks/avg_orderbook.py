@@ -0,0 +1,118 @@
+"""
+benchmark of get_curr_avg_orderbook engines.
+compact books cache cumulative sums on the first read. "compact" times repeated reads
+of the same published books, "compact, first read" clears the cache before every read
+like books which are replaced by every message.
+
+python -m Exchanges.benchmarks.avg_orderbook [symbols] [depth] [repeat]
+"""
+import decimal
+import random
+import sys
+import timeit
+
+from decimal import Context, Decimal
+
+from Exchanges.settings import Consts
+from Exchanges.orderbooks import CompactOrderbook, average_prices
+
+
+def legacy_average_prices(orderbooks, btc_sum=1.0):
+    # level by level Decimal walk of the previous BaseExchange.get_curr_avg_orderbook
+    decimal.getcontext().prec = 8
+    average_orderbook = dict()
+    for sai_symbol, orderbook_items in orderbooks.items():
+        average_orderbook[sai_symbol] = dict()
+        for order_type in [Consts.ASKS, Consts.BIDS]:
+            total_amount, total_price = Decimal(0), Decimal(0)
+            for price, amount in orderbook_items[order_type]:
+                total_price += price * amount
+                total_amount += amount
+
+                if total_price > btc_sum:
+                    break
+            try:
+                average_orderbook[sai_symbol][order_type] = total_price / total_amount
+            except decimal.InvalidOperation:
+                average_orderbook[sai_symbol][order_type] = Decimal(0)
+    return average_orderbook
+
+
+def generate_orderbooks(symbols, depth):
+    # each level is worth 0.01 ~ 0.2 BTC, btc_sum=1 is reached in the middle of the book.
+    context = Context(prec=8)
+    orderbooks = dict()
+    for number in range(symbols):
+        mid = random.uniform(0.00001, 0.1)
+        bids, asks = list(), list()
+        for level in range(depth):
+            tick = mid * 0.0005 * (level + 1)
+            for levels, price in [(bids, mid - tick), (asks, mid + tick)]:
+                amount = random.uniform(0.01, 0.2) / price
+                levels.append(
+                    [
+                        context.create_decimal("{:.8f}".format(price)),
+                        context.create_decimal("{:.4f}".format(amount)),
+                    ]
+                )
+        orderbooks["BTC_C{}".format(number)] = {Consts.BIDS: bids, Consts.ASKS: asks}
+    return orderbooks
+
+
+def max_relative_difference(expected, actual):
+    difference = Decimal(0)
+    for sai_symbol, averages in expected.items():
+        for order_type, value in averages.items():
+            if value:
+                gap = abs(actual[sai_symbol][order_type] - value) / value
+                difference = max(difference, gap)
+    return difference
+
+
+def clear_cumulative(compact_orderbooks):
+    for orderbook in compact_orderbooks.values():
+        orderbook.bids._cumulative = None
+        orderbook.asks._cumulative = None
+    return compact_orderbooks
+
+
+def main(symbols=500, depth=Consts.ORDERBOOK_LIMITATION, repeat=20):
+    random.seed(0)
+    orderbooks = generate_orderbooks(symbols, depth)
+    compact_orderbooks = {
+        sai_symbol: CompactOrderbook.from_levels(book[Consts.BIDS], book[Consts.ASKS])
+        for sai_symbol, book in orderbooks.items()
+    }
+
+    expected = legacy_average_prices(orderbooks)
+    cases = [
+        ("legacy", lambda: legacy_average_prices(orderbooks)),
+        ("average_prices, list", lambda: average_prices(orderbooks)),
+        ("average_prices, compact", lambda: average_prices(compact_orderbooks)),
+        (
+            "compact, first read",
+            lambda: average_prices(clear_cumulative(compact_orderbooks)),
+        ),
+    ]
+
+    print("symbols={}, depth={}, repeat={}".format(symbols, depth, repeat))
+    legacy_time = None
+    for name, fn in cases:
+        elapsed = timeit.timeit(fn, number=repeat) / repeat
+        legacy_time = legacy_time or elapsed
+        print(
+            "{:<24} {:>9.3f} ms  x{:.1f}  max relative difference {:.1E}".format(
+                name,
+                elapsed * 1000,
+                legacy_time / elapsed,
+                max_relative_difference(expected, fn()),
+            )
+        )
+    print(
+        "compact is of cached repeat reads of the same books, "
+        "a book stored by a new message is a first read"
+    )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,87 @@
+"""
+decoding time of each installed json decoder on recorded-shape binance payloads,
+a <symbol>@depth diff, a <symbol>@kline_1m message and a /api/v3/depth snapshot.
+
+python -m Exchanges.benchmarks.json_decoders [repeat]
+"""
+import json
+import random
+import sys
+import timeit
+
+from Exchanges.decoders import AVAILABLE_LOADS
+
+
+def depth_levels(count, mid):
+    return [
+        [
+            "{:.8f}".format(mid * (1 + random.uniform(-0.01, 0.01))),
+            "{:.8f}".format(random.uniform(0, 1000)),
+        ]
+        for _ in range(count)
+    ]
+
+
+def payloads():
+    random.seed(0)
+    depth = {
+        "e": "depthUpdate",
+        "E": 1650000000123,
+        "s": "XRPBTC",
+        "U": 1027024,
+        "u": 1027036,
+        "b": depth_levels(12, 0.00002),
+        "a": depth_levels(12, 0.00002),
+    }
+    kline = {
+        "e": "kline",
+        "E": 1650000000123,
+        "s": "XRPBTC",
+        "k": {
+            "t": 1650000000000,
+            "T": 1650000059999,
+            "s": "XRPBTC",
+            "i": "1m",
+            "f": 100,
+            "L": 200,
+            "o": "0.00002000",
+            "c": "0.00002010",
+            "h": "0.00002020",
+            "l": "0.00001990",
+            "v": "1000.00000000",
+            "n": 100,
+            "x": False,
+            "q": "0.02000000",
+            "V": "500.00000000",
+            "Q": "0.01000000",
+            "B": "0",
+        },
+    }
+    snapshot = {
+        "lastUpdateId": 1027024,
+        "bids": depth_levels(1000, 0.00002),
+        "asks": depth_levels(1000, 0.00002),
+    }
+    return [
+        ("depth diff", json.dumps(depth)),
+        ("kline", json.dumps(kline)),
+        ("depth snapshot", json.dumps(snapshot)),
+    ]
+
+
+def main(repeat=2000):
+    print("decoders={}, repeat={}".format(list(AVAILABLE_LOADS), repeat))
+    for name, payload in payloads():
+        baseline = timeit.timeit(lambda: json.loads(payload), number=repeat) / repeat
+        for decoder, loads in AVAILABLE_LOADS.items():
+            assert loads(payload) == json.loads(payload)
+            elapsed = timeit.timeit(lambda: loads(payload), number=repeat) / repeat
+            print(
+                "{:<16} {:<8} {:>10.2f} us  x{:.1f}".format(
+                    name, decoder, elapsed * 1e6, baseline / elapsed
+                )
+            )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
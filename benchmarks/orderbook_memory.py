@@ -0,0 +1,92 @@
+"""
+memory and time per diff event of LocalOrderbook, Decimal levels published by
+to_compact against the fixed point master of compact=True.
+books are synced from a snapshot of depth levels a side, every event is applied
+and published like BinanceSubscriber with compact_orderbook.
+
+python -m Exchanges.benchmarks.orderbook_memory [symbols] [depth] [events]
+"""
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from Exchanges.orderbooks import LocalOrderbook
+
+
+def generate_snapshot(depth):
+    mid = random.uniform(0.00001, 0.1)
+    tick = mid * 0.0001
+    levels = {"bids": list(), "asks": list()}
+    for level in range(1, depth + 1):
+        for side, price in [("bids", mid - tick * level), ("asks", mid + tick * level)]:
+            amount = random.uniform(1, 100)
+            levels[side].append(["{:.8f}".format(price), "{:.4f}".format(amount)])
+    return {"lastUpdateId": 1, **levels}
+
+
+def generate_events(snapshot, events):
+    # every fifth event removes a level, the others update the amount of a level.
+    result = list()
+    for number in range(events):
+        side = "b" if number % 2 else "a"
+        levels = snapshot["bids" if side == "b" else "asks"]
+        price = random.choice(levels)[0]
+        amount = "0" if number % 5 == 0 else "{:.4f}".format(random.uniform(1, 100))
+        result.append(
+            {
+                "U": number + 2,
+                "u": number + 2,
+                side: [[price, amount]],
+                "a" if side == "b" else "b": list(),
+            }
+        )
+    return result
+
+
+def measure(compact, snapshots, events):
+    gc.collect()
+    tracemalloc.start()
+    orderbooks = dict()
+    for symbol, snapshot in snapshots.items():
+        orderbook = LocalOrderbook(symbol, compact=compact)
+        orderbook.apply_snapshot(snapshot)
+        orderbooks[symbol] = orderbook
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for symbol, orderbook in orderbooks.items():
+        for event in events[symbol]:
+            orderbook.apply_diff(event)
+            orderbook.to_compact()
+    elapsed = time.perf_counter() - start
+    return memory, elapsed
+
+
+def main(symbols=300, depth=1000, events=200):
+    random.seed(0)
+    snapshots = {
+        "C{}BTC".format(number): generate_snapshot(depth) for number in range(symbols)
+    }
+    symbol_events = {
+        symbol: generate_events(snapshot, events)
+        for symbol, snapshot in snapshots.items()
+    }
+
+    print("symbols={}, depth={}, events={} a symbol".format(symbols, depth, events))
+    for name, compact in [("Decimal master", False), ("fixed point master", True)]:
+        memory, elapsed = measure(compact, snapshots, symbol_events)
+        print(
+            "{:<20} {:>8.1f} MB  {:>6.0f} bytes/level  {:>6.1f} us/event".format(
+                name,
+                memory / 1024 / 1024,
+                memory / (symbols * depth * 2),
+                elapsed / (symbols * events) * 1e6,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,120 @@
+"""
+message throughput and CPU time of BinanceSubscriber for each websocket backend.
+a local server process streams recorded-shape kline frames as fast as possible.
+
+python -m Exchanges.benchmarks.websocket_backends [messages] [symbols]
+"""
+import json
+import multiprocessing
+import sys
+import threading
+import time
+
+from aiohttp import web
+
+from Exchanges.settings import Consts, WebsocketBackend
+from Exchanges.objects import DataStore
+from Exchanges.binance.binance import BinanceSubscriber
+
+
+HOST, PORT = "127.0.0.1", 18765
+
+
+def kline_frame(symbol, number):
+    open_time = 1650000000000 + (number // 10) * 60000
+    return json.dumps(
+        {
+            "e": "kline",
+            "E": open_time + number,
+            "s": symbol,
+            "k": {
+                "t": open_time,
+                "T": open_time + 59999,
+                "s": symbol,
+                "i": "1m",
+                "o": "0.00002000",
+                "c": "0.00002010",
+                "h": "0.00002020",
+                "l": "0.00001990",
+                "v": "{}.0".format(number),
+                "x": number % 10 == 9,
+            },
+        }
+    )
+
+
+def serve(messages, symbols):
+    frames = [
+        kline_frame("C{}BTC".format(number % symbols), number)
+        for number in range(messages)
+    ]
+
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for _ in ws:
+            for frame in frames:
+                await ws.send_str(frame)
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/ws", handler)
+    web.run_app(app, host=HOST, port=PORT, print=None)
+
+
+class BenchmarkSubscriber(BinanceSubscriber):
+    base_url = "ws://{}:{}/ws".format(HOST, PORT)
+
+    def __init__(self, data_store, lock_dic, messages):
+        super(BenchmarkSubscriber, self).__init__(data_store, lock_dic)
+        self.received = 0
+        self.done = threading.Event()
+        self._messages = messages
+
+    def candle_receiver(self, data):
+        # counted after dispatch, responses of SUBSCRIBE are not kline frames.
+        super(BenchmarkSubscriber, self).candle_receiver(data)
+        self.received += 1
+        if self.received == self._messages:
+            self.done.set()
+
+
+def run(backend, messages, symbols):
+    lock_dic = {Consts.ORDERBOOK: threading.Lock(), Consts.CANDLE: threading.Lock()}
+    subscriber = BenchmarkSubscriber(DataStore(), lock_dic, messages)
+    subscriber.websocket_backend = backend
+    subscriber.start_websocket_thread()
+    subscriber.set_candle_symbol_set(
+        ["c{}btc".format(number) for number in range(symbols)]
+    )
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    subscriber.subscribe_candle()
+    subscriber.done.wait(timeout=300)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    subscriber.close_websockets()
+    return subscriber.received, wall, cpu
+
+
+def main(messages=100000, symbols=300):
+    server = multiprocessing.Process(
+        target=serve, args=(messages, symbols), daemon=True
+    )
+    server.start()
+    time.sleep(1)
+
+    print("messages={}, symbols={}".format(messages, symbols))
+    for backend in [WebsocketBackend.THREAD, WebsocketBackend.ASYNCIO]:
+        received, wall, cpu = run(backend, messages, symbols)
+        print(
+            "{:<8} received={:<8} {:>10.0f} msg/s  cpu {:.2f}s ({:.1f} us/msg)".format(
+                backend, received, received / wall, cpu, cpu / max(received, 1) * 1e6
+            )
+        )
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -1,10 +1,10 @@
 import hmac
 import hashlib
-import requests
 import time
-import aiohttp
-import json
 import datetime
+import threading
+import functools
+import queue
 
 from decimal import (
     getcontext,
@@ -16,6 +16,7 @@ from urllib.parse import urlencode
 
 from Exchanges.settings import (
     Consts,
+    SessionConsts,
     BaseTradeType,
     SaiOrderStatus,
     Tickets,
@@ -28,18 +29,23 @@ from Exchanges.binance.util import (
     BinanceConverter,
     symbol_localizing,
     symbol_customizing,
+    create_rate_limiter,
 )
 from Exchanges.binance.setting import (
     OrderStatus,
     DepositStatus,
     WithdrawalStatus,
-    FilterType
+    FilterType,
+    EventType,
 )
 from Exchanges.objects import (
     ExchangeResult,
     BaseExchange,
     BaseSubscriber
 )
+from Exchanges.fetchers import fetch_concurrently
+from Exchanges.orderbooks import LocalOrderbook
+from Exchanges.sessions import create_session
 
 import logging.config
 
@@ -57,70 +63,170 @@ class BinanceSubscriber(BaseSubscriber):
     name = "Binance Subscriber"
     converter = BinanceConverter
     base_logger = logging
+    rest_url = "https://api.binance.com"
+    snapshot_path = "/api/v3/depth"
 
     def __init__(self, data_store, lock_dic):
         """
         data_store: An object for storing orderbook&candle data, using orderbook&candle queue in this object.
-        lock_dic: dictionary for avoid race condition, {orderbook: Lock, candle: Lock}
+        lock_dic: dictionary for avoid race condition, {candle: Lock, ..}
+            orderbooks are locked by data_store.orderbook_locks of each symbol.
         """
         logging.debug(f"{self.name}::: start")
 
         super(BinanceSubscriber, self).__init__()
         self.data_store = data_store
-        self._interval = "1m"
+        self._interval = Consts.CANDLE_BASE_INTERVAL
         self._lock_dic = lock_dic
 
         self.subscribe_set = set()
         self.unsubscribe_set = set()
 
+        self._local_orderbooks = dict()
+        self._session = create_session()
+
+        # symbols waiting for a REST snapshot, fetched by a bounded set of workers
+        # which acquire the rate limiter before each request.
+        self._snapshot_queue = queue.Queue()
+        self._snapshot_workers = list()
+        self._snapshot_workers_lock = threading.Lock()
+
+        self.register_handler(EventType.DEPTH_UPDATE, self.orderbook_receiver)
+        self.register_handler(EventType.KLINE, self.candle_receiver)
+        self.register_handler(EventType.MINI_TICKER, self.ticker_receiver)
+
     def on_message(self, *args):
         obj_, message = args
         try:
-            data = json.loads(message)
-            if "error" in data:
-                logging.debug(
-                    "BinanceSubscriber::: on_message error, not found messages [{}]".format(
-                        data["error"]["msg"]
+            data = self.loads(message)
+            event_type = self._get_event_type(data)
+            if event_type is None:
+                if "error" in data:
+                    logging.debug(
+                        "BinanceSubscriber::: on_message error, not found messages [{}]".format(
+                            data["error"]["msg"]
+                        )
                     )
-                )
+                # responses of SUBSCRIBE, UNSUBSCRIBE are {"result": null, "id": ticket}
                 return
-            if "result" not in data:
-                # b: orderbook's price
-                # B: orderbook's amount
-                if "b" in data and "s" in data:
-                    self.orderbook_receiver(data)
-                else:
-                    self.candle_receiver(data)
+
+            if not self.dispatcher.dispatch(event_type, data):
+                logging.debug(f"{self.name}::: no handler of [{event_type}]")
         except Exception as ex:
             logging.debug("BinanceSubscriber::: on_message error, [{}]".format(ex))
 
-    def orderbook_receiver(self, data):
-        with self._lock_dic[Consts.ORDERBOOK]:
-            symbol = data["s"]
-            sai_symbol = self.converter.exchange_to_sai_subscriber(symbol)
-            context = Context(prec=8)
+    def _get_event_type(self, data):
+        """
+        e field of the message, arrays of all market streams use e of their items.
+        """
+        if isinstance(data, list):
+            return data[0].get("e") if data else None
+        event_type = data.get("e")
+        if event_type is None and "A" in data:
+            # A: best ask amount of bookTicker
+            return EventType.BOOK_TICKER
+        return event_type
 
-            total_bids, total_asks = [], []
-            for bid_price, bid_amount in data["b"]:
-                total_bids.append(
-                    [
-                        context.create_decimal(bid_price),
-                        context.create_decimal(bid_amount),
-                    ]
+    def orderbook_receiver(self, data):
+        symbol = data["s"]
+        with self.data_store.orderbook_locks.get(symbol):
+            orderbook = self._local_orderbooks.get(symbol)
+            if orderbook is None:
+                orderbook = LocalOrderbook(
+                    symbol, compact=self.data_store.compact_orderbook
                 )
+                self._local_orderbooks[symbol] = orderbook
+
+            if orderbook.synced and not orderbook.apply_diff(data):
+                logging.debug(f"{self.name}::: orderbook gap, resync [{symbol}]")
+                orderbook.reset()
+
+            if not orderbook.synced:
+                orderbook.buffer(data)
+                if not orderbook.snapshot_requested:
+                    orderbook.snapshot_requested = True
+                    if not self.fetch_snapshot:
+                        return
+                    self._request_snapshot(symbol)
+                return
 
-            for ask_price, ask_amount in data["a"]:
-                total_asks.append(
-                    [
-                        context.create_decimal(ask_price),
-                        context.create_decimal(ask_amount),
-                    ]
-                )
+            self._set_orderbook(orderbook)
 
-            self.data_store.orderbook_queue[sai_symbol] = {
-                Consts.BIDS: total_bids,
-                Consts.ASKS: total_asks,
-            }
+    def _set_orderbook(self, orderbook):
+        sai_symbol = self.converter.exchange_to_sai_subscriber(orderbook.symbol)
+        if self.data_store.compact_orderbook:
+            self.store_orderbook(sai_symbol, orderbook.to_compact())
+        else:
+            self.store_orderbook(sai_symbol, orderbook.to_dict())
+
+    def _get_orderbook_snapshot(self, symbol):
+        params = {"symbol": symbol, "limit": Consts.ORDERBOOK_SNAPSHOT_LIMITATION}
+        try:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire("GET", self.snapshot_path, params)
+            response = self._session.get(
+                self.rest_url + self.snapshot_path,
+                params=params,
+                timeout=SessionConsts.TIMEOUT,
+            )
+            if self.rate_limiter is not None:
+                self.rate_limiter.update(response.status_code, response.headers)
+            snapshot = self.loads(response.content)
+            if self.recorder is not None:
+                self.recorder.record_snapshot(symbol, response.content)
+        except Exception as ex:
+            logging.debug(f"{self.name}::: _get_orderbook_snapshot error, [{ex}]")
+            return None
+
+        if "lastUpdateId" not in snapshot:
+            logging.debug(f"{self.name}::: _get_orderbook_snapshot error, [{snapshot}]")
+            return None
+
+        return snapshot
+
+    def _request_snapshot(self, symbol):
+        with self._snapshot_workers_lock:
+            if not self._snapshot_workers:
+                for _ in range(Consts.ORDERBOOK_SNAPSHOT_WORKERS):
+                    worker = threading.Thread(target=self._snapshot_worker, daemon=True)
+                    worker.start()
+                    self._snapshot_workers.append(worker)
+        self._snapshot_queue.put(symbol)
+
+    def _snapshot_worker(self):
+        while self._evt.is_set():
+            try:
+                symbol = self._snapshot_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            self._sync_orderbook(symbol)
+
+    def _sync_orderbook(self, symbol):
+        """
+        get a REST snapshot and replay buffered events, retry until the book is synced.
+        """
+        while self._evt.is_set():
+            snapshot = self._get_orderbook_snapshot(symbol)
+            if snapshot is not None and self.on_snapshot(symbol, snapshot):
+                return
+            time.sleep(1)
+
+    def on_snapshot(self, symbol, snapshot):
+        """
+        return False if the snapshot is older than buffered events.
+        """
+        if "lastUpdateId" not in snapshot:
+            return False
+        with self.data_store.orderbook_locks.get(symbol):
+            orderbook = self._local_orderbooks.get(symbol)
+            if orderbook is None or orderbook.synced:
+                return True
+            if orderbook.apply_snapshot(snapshot):
+                self._set_orderbook(orderbook)
+                return True
+            # keep it requested, the next snapshot is applied.
+            orderbook.snapshot_requested = True
+            return False
 
     def candle_receiver(self, data):
         with self._lock_dic[Consts.CANDLE]:
@@ -135,11 +241,43 @@ class BinanceSubscriber(BaseSubscriber):
                 kline["v"],
                 kline["t"],
             ]
-            store_list = self.temp_candle_setter(
-                self.data_store.candle_queue[sai_symbol], candle_list
-            )
+            # x: is this kline closed?
+            self.store_candle(sai_symbol, candle_list, kline["x"])
+
+    def ticker_receiver(self, data):
+        # !miniTicker@arr, close prices of the symbols changed in the last second
+        prices = dict()
+        for ticker in data:
+            sai_symbol = self.converter.exchange_to_sai(ticker["s"])
+            if sai_symbol is not None:
+                prices[sai_symbol] = Decimal(ticker["c"])
+        self.data_store.store_tickers(prices)
+
+    def subscribe_message(self, streams, ticket):
+        return {"method": "SUBSCRIBE", "params": streams, "id": ticket}
+
+    def unsubscribe_message(self, streams, ticket):
+        return {"method": "UNSUBSCRIBE", "params": streams, "id": ticket}
+
+    def on_reconnected(self, streams):
+        # diffs are lost while disconnected, books of the connection are synced again.
+        symbols = [
+            stream.split("@")[0] for stream in streams if stream.endswith("@depth")
+        ]
+        self._reset_local_orderbooks(symbols)
+
+    def _reset_local_orderbooks(self, symbols):
+        for symbol in symbols:
+            symbol = symbol.upper()
+            with self.data_store.orderbook_locks.get(symbol):
+                orderbook = self._local_orderbooks.get(symbol)
+                if orderbook is not None:
+                    orderbook.reset()
 
-            self.data_store.candle_queue[sai_symbol] = store_list
+    def resubscribe_orderbook(self, symbol_list):
+        self._reset_local_orderbooks(symbol_list)
+        streams = ["{symbol}@depth".format(symbol=symbol) for symbol in symbol_list]
+        self.resend_streams(streams, Tickets.RESUBSCRIBE)
 
     def subscribe_orderbook(self):
         logging.debug(f"{self.name}::: subscribe_orderbook")
@@ -147,13 +285,11 @@ class BinanceSubscriber(BaseSubscriber):
             "{symbol}@depth".format(symbol=symbol)
             for symbol in self._orderbook_symbol_set
         ]
-        self._subscribe_dict[Consts.ORDERBOOK] = {
-            "method": "SUBSCRIBE",
-            "params": streams,
-            "id": Tickets.ORDERBOOK,
-        }
+        self._subscribe_dict[Consts.ORDERBOOK] = self.subscribe_message(
+            streams, Tickets.ORDERBOOK
+        )
 
-        self._websocket_app.send(json.dumps(self._subscribe_dict[Consts.ORDERBOOK]))
+        self.subscribe_streams(streams, Tickets.ORDERBOOK)
 
     def subscribe_candle(self):
         logging.debug(f"{self.name}::: subscribe_candle")
@@ -161,12 +297,18 @@ class BinanceSubscriber(BaseSubscriber):
             "{symbol}@kline_{interval}".format(symbol=symbol, interval=self._interval)
             for symbol in self._candle_symbol_set
         ]
-        self._subscribe_dict[Consts.CANDLE] = {
-            "method": "SUBSCRIBE",
-            "params": streams,
-            "id": Tickets.CANDLE,
-        }
-        self._websocket_app.send(json.dumps(self._subscribe_dict[Consts.CANDLE]))
+        self._subscribe_dict[Consts.CANDLE] = self.subscribe_message(
+            streams, Tickets.CANDLE
+        )
+        self.subscribe_streams(streams, Tickets.CANDLE)
+
+    def subscribe_ticker(self):
+        logging.debug(f"{self.name}::: subscribe_ticker")
+        streams = ["!miniTicker@arr"]
+        self._subscribe_dict[Consts.TICKER] = self.subscribe_message(
+            streams, Tickets.TICKER
+        )
+        self.subscribe_streams(streams, Tickets.TICKER)
 
 
 class Binance(BaseExchange):
@@ -176,9 +318,15 @@ class Binance(BaseExchange):
     base_url = "https://api.binance.com"
     error_key = "msg"
     base_logger = logging
+    warmup_path = "/api/v3/ping"
 
-    def __init__(self, key, secret):
-        super(Binance, self).__init__()
+    def __init__(self, key, secret, **options):
+        """
+        options: pool_size, max_retries, timeout, compact_orderbook,
+            websocket_backend, json_decoder, data_store, base_url, websocket_url
+            of BaseExchange
+        """
+        super(Binance, self).__init__(**options)
         self._key = key
         self._secret = secret
 
@@ -186,15 +334,25 @@ class Binance(BaseExchange):
         self.all_details = None
         self._symbol_details_dict = None
         self.time_difference = 0
+        self.rate_limiter = create_rate_limiter()
 
     def __str__(self):
         return self.name
 
-    def setup(self):
+    def setup(self, public_only=False):
+        """
+        public_only: markets and symbol details only, without the keys
+            asset details of the account are not loaded.
+        """
+        # connect first so that the servertime is not delayed by the handshake.
+        self.warmup()
         self.time_difference = self._get_servertime() - int(time.time() * 1000)
 
         self.exchange_info = self._get_exchange_info().data
-        self.all_details = self._get_all_asset_details().data
+        if self.exchange_info:
+            self.converter.load_exchange_info(self.exchange_info)
+        if not public_only:
+            self.all_details = self._get_all_asset_details().data
         self._symbol_details_dict = self._set_symbol_details()
 
     def get_balance(self, cached=False):
@@ -204,8 +362,10 @@ class Binance(BaseExchange):
             )
         )
 
-        if cached and Consts.BALANCE:
-            return self.get_cached_data(Consts.BALANCE)
+        if cached:
+            balance = self.get_cached_data(Consts.BALANCE, refresh=self.get_balance)
+            if balance is not None:
+                return ExchangeResult(True, balance)
 
         result_object = self._private_api("GET", "/api/v3/account")
 
@@ -227,18 +387,46 @@ class Binance(BaseExchange):
             )
         )
         if cached:
-            return self.get_cached_data(Consts.TICKER, sai_symbol)
+            price = self.get_ticker_price(sai_symbol)
+            if price is not None:
+                return ExchangeResult(True, {"sai_price": price})
+            ticker = self.get_cached_data(
+                Consts.TICKER,
+                sai_symbol,
+                refresh=functools.partial(self.get_ticker, sai_symbol),
+            )
+            if ticker is not None:
+                return ExchangeResult(True, ticker)
 
         binance_symbol = self.converter.sai_to_exchange(sai_symbol)
         result_object = self._public_api("/api/v3/ticker/price", {"symbol": binance_symbol})
         if result_object.success:
-            ticker = Decimal(result_object.data[0]["trade_price"])
+            ticker = Decimal(result_object.data["price"])
 
             result_object.data = {"sai_price": ticker}
-            self.set_cached_data(Consts.TICKER, result_object.data)
+            self.set_cached_data(Consts.TICKER, result_object.data, sai_symbol)
 
         return result_object
 
+    def refresh_tickers(self):
+        # all symbols in a request, weight 4 instead of 2 per symbol.
+        result_object = self._public_api("/api/v3/ticker/price")
+        if result_object.success:
+            prices = dict()
+            for ticker in result_object.data:
+                sai_symbol = self.converter.exchange_to_sai(ticker["symbol"])
+                if sai_symbol is not None:
+                    prices[sai_symbol] = Decimal(ticker["price"])
+            self.data_store.store_tickers(prices)
+            result_object.data = prices
+        return result_object
+
+    def get_symbol_id(self, sai_symbol):
+        """
+        integer id of sai_symbol from exchangeInfo, a compact key of per-symbol data.
+        """
+        return self.converter.get_symbol_id(sai_symbol)
+
     def get_available_symbols(self):
         logging.debug(
             DebugMessage.ENTRANCE.format(
@@ -321,7 +509,11 @@ class Binance(BaseExchange):
             )
         )
         if cached:
-            return self.get_cached_data(Consts.DEPOSIT_ADDRESS)
+            deposit_addrs = self.get_cached_data(
+                Consts.DEPOSIT_ADDRESS, refresh=self.get_deposit_addrs
+            )
+            if deposit_addrs is not None:
+                return ExchangeResult(True, deposit_addrs)
 
         able_to_trading_coin_set = set()
         for data in self.exchange_info["symbols"]:
@@ -332,20 +524,9 @@ class Binance(BaseExchange):
         able_to_trading_coin_set = ["BTC", "ETH", "XRP"]
 
         try:
-            result_message = str()
-            return_deposit_dict = dict()
+            coin_list = list()
             for coin in able_to_trading_coin_set:
                 coin = symbol_customizing(coin)
-                get_deposit_result_object = await self._async_private_api(
-                    "GET", "/sapi/v1/capital/deposit/address", {"coin": coin.lower()}
-                )
-
-                if not get_deposit_result_object.success:
-                    result_message += "[{}]해당 코인은 값을 가져오는데 실패했습니다.\n".format(
-                        get_deposit_result_object.message
-                    )
-                    continue
-
                 coin_details = self.all_details.get(coin, None)
 
                 if coin_details is not None:
@@ -363,7 +544,18 @@ class Binance(BaseExchange):
                             "Binance, [{}] 해당 코인은 출금이 막혀있는 상태입니다.".format(coin)
                         )
                         continue
+                coin_list.append(coin)
 
+            report = await fetch_concurrently(
+                self._get_deposit_addr,
+                coin_list,
+                self.request_concurrency,
+                name=self.name,
+                logger=self.base_logger,
+            )
+
+            return_deposit_dict = dict()
+            for coin, get_deposit_result_object in report.results.items():
                 address = get_deposit_result_object.data.get("address")
                 if address:
                     return_deposit_dict[coin] = address
@@ -372,10 +564,10 @@ class Binance(BaseExchange):
                 if "addressTag" in get_deposit_result_object.data:
                     return_deposit_dict[coin + "TAG"] = address_tag
             self.set_cached_data(Consts.DEPOSIT_ADDRESS, return_deposit_dict)
-            return ExchangeResult(True, return_deposit_dict, result_message)
+            return ExchangeResult(True, return_deposit_dict, report.failed_message())
 
-        except Exception as ex:
-            logging.exception("FATAL: Binance, get_deposit_addrs")
+        except Exception:
+            self.base_logger.exception("FATAL: Binance, get_deposit_addrs")
 
             return ExchangeResult(
                 False,
@@ -383,6 +575,11 @@ class Binance(BaseExchange):
                 wait_time=1,
             )
 
+    async def _get_deposit_addr(self, coin):
+        return await self._async_private_api(
+            "GET", "/sapi/v1/capital/deposit/address", {"coin": coin.lower()}
+        )
+
     async def get_transaction_fee(self, cached=False):
         logging.debug(
             DebugMessage.ENTRANCE.format(
@@ -391,7 +588,11 @@ class Binance(BaseExchange):
         )
 
         if cached:
-            self.get_cached_data(Consts.TRANSACTION_FEE)
+            fees = self.get_cached_data(
+                Consts.TRANSACTION_FEE, refresh=self.get_transaction_fee
+            )
+            if fees is not None:
+                return ExchangeResult(True, fees)
 
         result = self._private_api("GET", "/sapi/v1/capital/config/getall")
         if result.success:
@@ -410,7 +611,7 @@ class Binance(BaseExchange):
                         break
 
             result.data = fees
-            self.set_cached_data(Consts.BALANCE, fees)
+            self.set_cached_data(Consts.TRANSACTION_FEE, fees)
         return result
 
     def buy(self, sai_symbol, trade_type, amount=None, price=None):
@@ -421,10 +622,10 @@ class Binance(BaseExchange):
         if not amount:
             return ExchangeResult(False, message="")
 
-        if BaseTradeType.BUY_LIMIT and not price:
+        if trade_type == BaseTradeType.BUY_LIMIT and not price:
             return ExchangeResult(False, message="")
 
-        binance_trade_type = self.converter.sai_to_exchange(trade_type)
+        binance_trade_type = self.converter.sai_to_exchange_trade_type(trade_type)
         symbol = self.converter.sai_to_exchange(sai_symbol)
 
         default_parameters = {
@@ -457,7 +658,7 @@ class Binance(BaseExchange):
             raw_dict = {
                 "average_price": Decimal(result.data["price"]),
                 "amount": Decimal(result.data["origQty"]),
-                "order_id": result.data["orderId"],
+                "id": result.data["orderId"],
             }
             sai_dict = self._data_validator.trade(raw_dict)
             result.data.update(sai_dict)
@@ -468,7 +669,6 @@ class Binance(BaseExchange):
         logging.debug(
             DebugMessage.ENTRANCE.format(name=self.name, fn="sell", data=str(locals()))
         )
-        params = dict()
 
         binance_trade_type = self.converter.sai_to_exchange_trade_type(trade_type)
         symbol = self.converter.sai_to_exchange(sai_symbol)
@@ -496,13 +696,13 @@ class Binance(BaseExchange):
         if DEBUG:
             return trade_result_mock(price, amount)
 
-        result = self._private_api("POST", "/api/v3/order", params)
+        result = self._private_api("POST", "/api/v3/order", default_parameters)
 
         if result.success:
             raw_dict = {
                 "average_price": Decimal(result.data["price"]),
                 "amount": Decimal(result.data["origQty"]),
-                "order_id": result.data["orderId"],
+                "id": result.data["orderId"],
             }
             sai_dict = self._data_validator.trade(raw_dict)
             result.data.update(sai_dict)
@@ -582,10 +782,13 @@ class Binance(BaseExchange):
             if result_object.success:
                 result = dict()
                 for each in result_object.data:
-                    coin = each.pop("coin", None)
+                    coin = each.get("coin")
 
                     if coin:
-                        result.update({coin: each})
+                        # the response may be shared with other callers, see _coalesce
+                        result[coin] = {
+                            key: value for key, value in each.items() if key != "coin"
+                        }
                 result_object.data = result
                 return result_object
             time.sleep(3)
@@ -679,7 +882,10 @@ class Binance(BaseExchange):
         return step_size_result
 
     def _trading_validator(self, symbol, amount):
-        ticker_object = self.get_ticker(symbol)
+        # the ticker table of start_ticker_refresher or set_subscribe_ticker,
+        # a request only when it does not have a fresh price of the symbol.
+        sai_symbol = self.converter.exchange_to_sai(symbol) or symbol
+        ticker_object = self.get_ticker(sai_symbol, cached=True)
         if not ticker_object.success:
             return ticker_object
 
@@ -742,45 +948,76 @@ class Binance(BaseExchange):
         if extra is None:
             extra = dict()
 
+        return self._coalesce(
+            method,
+            path,
+            extra,
+            functools.partial(self._send_private_api, method, path, extra),
+        )
+
+    def _send_private_api(self, method, path, extra):
+        # wait before signing, the timestamp must be inside recvWindow when sent.
+        self._wait_rate_limit(method, path, extra)
         query = self._sign_generator(extra)
         sig = query.pop("signature")
         query = "{}&signature={}".format(urlencode(sorted(extra.items())), sig)
 
+        headers = {"X-MBX-APIKEY": self._key}
         if method == "GET":
-            rq = requests.get(
-                self.base_url + path, params=query, headers={"X-MBX-APIKEY": self._key}
+            rq = self._session.get(
+                self.base_url + path,
+                params=query,
+                headers=headers,
+                timeout=self._timeout,
             )
         else:
             if "/withdraw/apply/" in path:
-                rq = requests.post(
-                    self.base_url + path, params=query, headers={"X-MBX-APIKEY": self._key}
+                rq = self._session.post(
+                    self.base_url + path,
+                    params=query,
+                    headers=headers,
+                    timeout=self._timeout,
                 )
             else:
-                rq = requests.post(
-                    self.base_url + path, data=query, headers={"X-MBX-APIKEY": self._key}
+                rq = self._session.post(
+                    self.base_url + path,
+                    data=query,
+                    headers=headers,
+                    timeout=self._timeout,
                 )
 
+        self._update_rate_limit(rq.status_code, rq.headers)
         return self._get_result(rq, path, extra, fn="_private_api")
 
     async def _async_private_api(self, method, path, extra=None):
         if extra is None:
             extra = dict()
 
-        async with aiohttp.ClientSession(
-            headers={"X-MBX-APIKEY": self._key}
-        ) as session:
-            query = self._sign_generator(extra)
+        return await self._async_coalesce(
+            method,
+            path,
+            extra,
+            functools.partial(self._async_send_private_api, method, path, extra),
+        )
 
-            if method == "GET":
-                sig = query.pop("signature")
-                query = "{}&signature={}".format(urlencode(sorted(extra.items())), sig)
-                rq = await session.get(self.base_url + path + "?{}".format(query))
+    async def _async_send_private_api(self, method, path, extra):
+        await self._async_wait_rate_limit(method, path, extra)
+        session = await self._async_session.get()
+        headers = {"X-MBX-APIKEY": self._key}
+        query = self._sign_generator(extra)
 
-            else:
-                rq = await session.post(self.base_url + path, data=query)
+        if method == "GET":
+            sig = query.pop("signature")
+            query = "{}&signature={}".format(urlencode(sorted(extra.items())), sig)
+            rq = session.get(self.base_url + path + "?{}".format(query), headers=headers)
+
+        else:
+            rq = session.post(self.base_url + path, data=query, headers=headers)
 
-            result_text = await rq.text()
-            return self._get_result(result_text, path, extra, fn="_async_private_api")
+        async with rq as response:
+            self._update_rate_limit(response.status, response.headers)
+            result_text = await response.text()
+        return self._get_result(result_text, path, extra, fn="_async_private_api")
 
 
 if __name__ == "__main__":
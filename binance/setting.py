@@ -31,3 +31,46 @@ class FilterType(object):
     MARKET_LOT_SIZE = "MARKET_LOT_SIZE"
     MAX_NUM_ORDERS = "MAX_NUM_ORDERS"
     MAX_NUM_ALGO_ORDERS = "MAX_NUM_ALGO_ORDERS"
+
+
+class EventType(object):
+    DEPTH_UPDATE = "depthUpdate"
+    KLINE = "kline"
+    TRADE = "trade"
+    AGG_TRADE = "aggTrade"
+    MINI_TICKER = "24hrMiniTicker"
+    # bookTicker messages do not have the e field.
+    BOOK_TICKER = "bookTicker"
+
+
+class RateLimit(object):
+    # request weight of /api and /sapi are counted separately per ip.
+    REQUEST_WEIGHT = 6000
+    SAPI_REQUEST_WEIGHT = 12000
+    WEIGHT_INTERVAL = 60
+    ORDERS = 50
+    ORDER_INTERVAL = 10
+
+    WEIGHT = "weight"
+    SAPI_WEIGHT = "sapi_weight"
+    ORDER = "order"
+
+    USED_HEADERS = {
+        "X-MBX-USED-WEIGHT-1M": WEIGHT,
+        "X-SAPI-USED-IP-WEIGHT-1M": SAPI_WEIGHT,
+        "X-MBX-ORDER-COUNT-10S": ORDER,
+    }
+
+
+# weight of each endpoint, the others weigh 1.
+ENDPOINT_WEIGHTS = {
+    "/api/v3/exchangeInfo": 20,
+    "/api/v3/account": 20,
+    "/api/v3/ticker/price": 2,
+    "/api/v3/order": 4,
+    "/sapi/v1/capital/config/getall": 10,
+    "/sapi/v1/capital/deposit/address": 10,
+}
+
+# /api/v3/depth weight by the limit of levels.
+DEPTH_WEIGHTS = ((100, 5), (500, 25), (1000, 50), (5000, 250))
@@ -1,16 +1,87 @@
 from Exchanges.binance import binance
-from Exchanges.objects import DataStore
-
-from Exchanges.settings import BaseTradeType
+from Exchanges.objects import (
+    DataStore,
+    BaseSubscriber,
+    WebsocketShard,
+    MessageDispatcher,
+    OpenEventMixin,
+    SAIDataValidator,
+    reconnect_delay,
+)
+from Exchanges.candles import CandleSeries, interval_to_milliseconds
+from Exchanges.orderbooks import (
+    LocalOrderbook,
+    AverageOrderbookCache,
+    OrderbookSnapshot,
+    average_prices,
+)
+
+from Exchanges.settings import BaseTradeType, Consts, JsonDecoder, WebsocketBackend
+from Exchanges.decoders import AVAILABLE_LOADS, get_loads
+from Exchanges.shared import SharedColumnTable, SharedMarketData
+from Exchanges.marketdata import MarketDataServer, RemoteDataStore
+from Exchanges.recorder import FrameRecorder, read_records, SNAPSHOT
+from Exchanges.binance.util import BinanceConverter, request_cost
+from Exchanges.binance.setting import RateLimit
+from Exchanges.ratelimits import TokenBucket, RateLimiter
+from Exchanges.caches import TTLCache
+from Exchanges.singleflight import SingleFlight
+from Exchanges.sessions import AsyncSessionManager
+from Exchanges.mockserver import MockExchangeServer
 
 import unittest
 import asyncio
 import threading
 import time
-
+import json
+import logging
+import os
+import tempfile
+import multiprocessing
+import pickle
+import random
+
+from array import array
+from unittest import mock
 from decimal import Decimal, ROUND_DOWN
 
 
+mock_server = None
+
+
+def setUpModule():
+    global mock_server
+    # every test of an exchange runs against the mock server, no keys or network.
+    mock_server = MockExchangeServer(port=0, messages_per_second=20).start_in_thread()
+
+
+def tearDownModule():
+    mock_server.stop_thread()
+
+
+def create_mock_binance(**kwargs):
+    exchange = binance.Binance(
+        "key",
+        "secret",
+        base_url=mock_server.base_url,
+        websocket_url=mock_server.websocket_url,
+        **kwargs,
+    )
+    exchange.setup()
+    return exchange
+
+
+def write_shared_slot(name, key, writes):
+    # target of the writer process, write number n fills the columns with n.
+    table = SharedColumnTable.attach(name)
+    try:
+        for number in range(1, writes + 1):
+            values = array("q", [number]) * (number % table.capacity + 1)
+            table.write(key, [values, values])
+    finally:
+        table.close()
+
+
 class TestBaseBinance(unittest.TestCase):
     """
     tests for execute functions
@@ -18,44 +89,41 @@ class TestBaseBinance(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls) -> None:
-        exchange = binance.Binance(
-            "oYQYru6IvzCgxSFaCRdRQyKCHfpUQEEujZAxJsCw5LEjuR7D2F8S7pIGxrN9u2lB ",
-            "4WcKtsR88UqGMyYUuKVb7XZlo0adfr8z3eOtZZm4mRWaWTfJTc4prLcZ29Ti8zXl",
-        )
+        exchange = create_mock_binance()
 
         cls.test_main_sai_symbol = "BTC_TRX"
         cls.test_main_market, cls.test_main_coin = cls.test_main_sai_symbol.split("_")
         cls.exchange = exchange
+        cls.lot_size = exchange._symbol_details_dict[
+            exchange.converter.sai_to_exchange(cls.test_main_sai_symbol)
+        ]
         available_result = exchange.get_available_symbols()
         cls.available_symbols = available_result.data
 
-        loop = asyncio.new_event_loop()
-        transaction_result = loop.run_until_complete(exchange.get_transaction_fee())
+        transaction_result = asyncio.run(exchange.get_transaction_fee())
         cls.transaction_fees = transaction_result.data
 
-        loop = asyncio.new_event_loop()
-        deposit_result = loop.run_until_complete(
-            exchange.get_deposit_addrs(cls.available_symbols)
-        )
+        deposit_result = asyncio.run(exchange.get_deposit_addrs())
         cls.deposits = deposit_result.data
 
         exchange.set_subscriber()
         exchange.set_subscribe_orderbook(cls.available_symbols)
         exchange.set_subscribe_candle(cls.available_symbols)
 
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.exchange._subscriber.close_websockets()
+        cls.exchange.close()
+
     def setUp(self) -> None:
-        loop = asyncio.new_event_loop()
-        result_object = loop.run_until_complete(self.exchange.get_balance())
+        result_object = self.exchange.get_balance()
 
         self.balance = None if not result_object.success else result_object.data
-        print(self.balance)
 
 
 class TestTradeMarket(TestBaseBinance):
     def test_under_minimum_buy(self):
-        minimum = (
-            self.exchange._lot_sizes[self.test_main_sai_symbol]["min_quantity"] * 0.9
-        )
+        minimum = self.lot_size["min_quantity"] * Decimal("0.9")
         test_symbol_minimum_price = self.exchange.buy(
             self.test_main_sai_symbol, BaseTradeType.BUY_MARKET, amount=minimum
         )
@@ -63,9 +131,7 @@ class TestTradeMarket(TestBaseBinance):
         self.assertFalse(test_symbol_minimum_price.success)
 
     def test_under_minimum_sell(self):
-        minimum = (
-            self.exchange._lot_sizes[self.test_main_sai_symbol]["min_quantity"] * 0.9
-        )
+        minimum = self.lot_size["min_quantity"] * Decimal("0.9")
         test_symbol_minimum_price = self.exchange.sell(
             self.test_main_sai_symbol, BaseTradeType.SELL_MARKET, amount=minimum
         )
@@ -78,10 +144,8 @@ class TestTradeMarket(TestBaseBinance):
 
         btc_alt_price = result.data["sai_price"]
 
-        btc_over_balance = self.balance[self.test_main_market] * 1.1
-        amount = (btc_over_balance / btc_alt_price).quantize(
-            Decimal(10) ** -8, rounding=ROUND_DOWN
-        )
+        btc_over_balance = self.balance[self.test_main_market] * Decimal("1.1")
+        amount = (btc_over_balance / btc_alt_price).to_integral_value(ROUND_DOWN)
         test_symbol_over_balance = self.exchange.buy(
             self.test_main_sai_symbol, BaseTradeType.BUY_MARKET, amount=amount
         )
@@ -89,52 +153,47 @@ class TestTradeMarket(TestBaseBinance):
         self.assertFalse(test_symbol_over_balance.success)
 
     def test_over_balance_sell(self):
-        result = self.exchange.get_ticker(self.test_main_sai_symbol)
-        self.assertTrue(result.success)
-
-        btc_alt_price = result.data["sai_price"]
-
-        btc_over_balance = self.balance[self.test_main_market] * 1.1
-        amount = (btc_over_balance / btc_alt_price).quantize(
-            Decimal(10) ** -8, rounding=ROUND_DOWN
-        )
+        amount = self.balance[self.test_main_coin] * Decimal("1.1")
         test_symbol_over_balance = self.exchange.sell(
             self.test_main_sai_symbol, BaseTradeType.SELL_MARKET, amount=amount
         )
 
-        self.assertFalse(test_symbol_over_balance)
+        self.assertFalse(test_symbol_over_balance.success)
 
     def test_no_amount_buy(self):
         test_symbol_no_amount = self.exchange.buy(
             self.test_main_sai_symbol, BaseTradeType.BUY_MARKET, amount=0
         )
 
-        self.assertFalse(test_symbol_no_amount)
+        self.assertFalse(test_symbol_no_amount.success)
 
     def test_no_amount_sell(self):
         test_symbol_no_amount = self.exchange.sell(
-            self.test_main_sai_symbol, BaseTradeType.BUY_MARKET, amount=0
+            self.test_main_sai_symbol, BaseTradeType.SELL_MARKET, amount=0
         )
 
-        self.assertFalse(test_symbol_no_amount)
+        self.assertFalse(test_symbol_no_amount.success)
 
     def test_incorrect_lot_size_buy(self):
-        step_size = self.exchange._lot_sizes[self.test_main_sai_symbol]["step_size"]
-        amount = step_size + step_size * 0.1
+        # an amount between steps is rounded down to the step.
+        step_size = self.lot_size["step_size"]
+        amount = step_size + step_size * Decimal("0.1")
         test_symbol_incorrect_lot_size = self.exchange.buy(
             self.test_main_sai_symbol, BaseTradeType.BUY_MARKET, amount=amount
         )
 
-        self.assertFalse(test_symbol_incorrect_lot_size)
+        self.assertTrue(test_symbol_incorrect_lot_size.success)
+        self.assertEqual(test_symbol_incorrect_lot_size.data["sai_amount"], step_size)
 
     def test_incorrect_lot_size_sell(self):
-        step_size = self.exchange._lot_sizes[self.test_main_sai_symbol]["step_size"]
-        amount = step_size + step_size * 0.1
+        step_size = self.lot_size["step_size"]
+        amount = step_size + step_size * Decimal("0.1")
         test_symbol_incorrect_lot_size = self.exchange.sell(
-            self.test_main_sai_symbol, BaseTradeType.BUY_MARKET, amount=amount
+            self.test_main_sai_symbol, BaseTradeType.SELL_MARKET, amount=amount
         )
 
-        self.assertFalse(test_symbol_incorrect_lot_size)
+        self.assertTrue(test_symbol_incorrect_lot_size.success)
+        self.assertEqual(test_symbol_incorrect_lot_size.data["sai_amount"], step_size)
 
 
 class TestTradeLimit(TestBaseBinance):
@@ -147,37 +206,35 @@ class TestTradeLimit(TestBaseBinance):
         return super(TestTradeLimit, self).setUp()
 
     def test_under_minimum_buy(self):
-        minimum = (
-            self.exchange._lot_sizes[self.test_main_sai_symbol]["min_quantity"] * 0.9
-        )
+        minimum = self.lot_size["min_quantity"] * Decimal("0.9")
 
-        self.exchange.buy(
+        result = self.exchange.buy(
             self.test_main_sai_symbol,
             BaseTradeType.BUY_LIMIT,
             amount=minimum,
             price=self.btc_alt_price,
         )
 
+        self.assertFalse(result.success)
+
     def test_under_minimum_sell(self):
-        minimum = (
-            self.exchange._lot_sizes[self.test_main_sai_symbol]["min_quantity"] * 0.9
-        )
+        minimum = self.lot_size["min_quantity"] * Decimal("0.9")
 
-        self.exchange.sell(
+        result = self.exchange.sell(
             self.test_main_sai_symbol,
             BaseTradeType.SELL_LIMIT,
             amount=minimum,
             price=self.btc_alt_price,
         )
 
+        self.assertFalse(result.success)
+
     def test_over_balance_buy(self):
-        btc_over_balance = self.balance[self.test_main_market] * 1.1
-        amount = (btc_over_balance / self.btc_alt_price).quantize(
-            Decimal(10) ** -8, rounding=ROUND_DOWN
-        )
+        btc_over_balance = self.balance[self.test_main_market] * Decimal("1.1")
+        amount = (btc_over_balance / self.btc_alt_price).to_integral_value(ROUND_DOWN)
         test_symbol_over_balance = self.exchange.buy(
             self.test_main_sai_symbol,
-            BaseTradeType.BUY_MARKET,
+            BaseTradeType.BUY_LIMIT,
             amount=amount,
             price=self.btc_alt_price,
         )
@@ -185,62 +242,55 @@ class TestTradeLimit(TestBaseBinance):
         self.assertFalse(test_symbol_over_balance.success)
 
     def test_over_balance_sell(self):
-        btc_over_balance = self.balance[self.test_main_market] * 1.1
-        amount = (btc_over_balance / self.btc_alt_price).quantize(
-            Decimal(10) ** -8, rounding=ROUND_DOWN
-        )
+        amount = self.balance[self.test_main_coin] * Decimal("1.1")
         test_symbol_over_balance = self.exchange.sell(
             self.test_main_sai_symbol,
-            BaseTradeType.SELL_MARKET,
+            BaseTradeType.SELL_LIMIT,
             amount=amount,
             price=self.btc_alt_price,
         )
 
-        self.assertFalse(test_symbol_over_balance)
+        self.assertFalse(test_symbol_over_balance.success)
 
-    def test_no_amount_buy(self):
-        test_symbol_no_amount = self.exchange.buy(
-            self.test_main_sai_symbol,
-            BaseTradeType.BUY_MARKET,
-            amount=0,
-            price=self.btc_alt_price,
+    def test_no_price_buy(self):
+        result = self.exchange.buy(
+            self.test_main_sai_symbol, BaseTradeType.BUY_LIMIT, amount=5
         )
 
-        self.assertFalse(test_symbol_no_amount)
+        self.assertFalse(result.success)
 
-    def test_no_amount_sell(self):
-        test_symbol_no_amount = self.exchange.sell(
+    def test_limit_sell(self):
+        # the order parameters are posted, the order id comes back as sai_id.
+        result = self.exchange.sell(
             self.test_main_sai_symbol,
-            BaseTradeType.BUY_MARKET,
-            amount=0,
+            BaseTradeType.SELL_LIMIT,
+            amount=5,
             price=self.btc_alt_price,
         )
 
-        self.assertFalse(test_symbol_no_amount)
+        self.assertTrue(result.success, result.message)
+        self.assertEqual(result.data["sai_amount"], 5)
+        self.assertEqual(result.data["sai_id"], str(result.data["orderId"]))
 
-    def test_incorrect_lot_size_buy(self):
-        step_size = self.exchange._lot_sizes[self.test_main_sai_symbol]["step_size"]
-        amount = step_size + step_size * 0.1
-        test_symbol_incorrect_lot_size = self.exchange.buy(
+    def test_no_amount_buy(self):
+        test_symbol_no_amount = self.exchange.buy(
             self.test_main_sai_symbol,
-            BaseTradeType.BUY_MARKET,
-            amount=amount,
+            BaseTradeType.BUY_LIMIT,
+            amount=0,
             price=self.btc_alt_price,
         )
 
-        self.assertFalse(test_symbol_incorrect_lot_size)
+        self.assertFalse(test_symbol_no_amount.success)
 
-    def test_incorrect_lot_size_sell(self):
-        step_size = self.exchange._lot_sizes[self.test_main_sai_symbol]["step_size"]
-        amount = step_size + step_size * 0.1
-        test_symbol_incorrect_lot_size = self.exchange.sell(
+    def test_no_amount_sell(self):
+        test_symbol_no_amount = self.exchange.sell(
             self.test_main_sai_symbol,
-            BaseTradeType.BUY_MARKET,
-            amount=amount,
+            BaseTradeType.SELL_LIMIT,
+            amount=0,
             price=self.btc_alt_price,
         )
 
-        self.assertFalse(test_symbol_incorrect_lot_size)
+        self.assertFalse(test_symbol_no_amount.success)
 
 
 class TestNotification(unittest.TestCase):
@@ -248,117 +298,1153 @@ class TestNotification(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        cls.exchange = binance.Binance(
-            "oYQYru6IvzCgxSFaCRdRQyKCHfpUQEEujZAxJsCw5LEjuR7D2F8S7pIGxrN9u2lB ",
-            "4WcKtsR88UqGMyYUuKVb7XZlo0adfr8z3eOtZZm4mRWaWTfJTc4prLcZ29Ti8zXl",
-        )
+        cls.exchange = create_mock_binance()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.exchange.close()
 
     def test_exchange_info(self):
         # get default info for taking deposit fee and etc..
         result = self.exchange._get_exchange_info()
         self.assertTrue(result.success)
-        print(result.data)
-        self.assertIn("BTC_ETH", sorted(list(result.data.keys())))
+        symbols = [data["symbol"] for data in result.data["symbols"]]
+        self.assertIn("ETHBTC", symbols)
 
-    def test_get_available_coin(self):
-        result = self.exchange.get_available_coin()
+    def test_get_available_symbols(self):
+        result = self.exchange.get_available_symbols()
         self.assertTrue(result.success)
         self.assertIn("BTC_XRP", result.data)
-        print(result.data)
-
-    def test_get_candle(self):
-        result = self.exchange.get_candle(self.symbol_set, 1)
-        self.assertTrue(result.success)
-        print(result.data)
-        self.assertEqual(len(result.data["timestamp"]), 20)
-
-    def test_get_orderbook(self):
-        loop = asyncio.get_event_loop()
-        result = loop.run_until_complete(
-            self.exchange.get_curr_avg_orderbook(self.symbol_set)
-        )
-        self.assertTrue(result.success)
-        print(result.data)
-        self.assertEqual(len(result.data["timestamp"]), 199)
 
     def test_get_deposit_addrs(self):
-        loop = asyncio.get_event_loop()
-        result = loop.run_until_complete(self.exchange.get_deposit_addrs())
+        result = asyncio.run(self.exchange.get_deposit_addrs())
         self.assertTrue(result.success)
         self.assertIn("BTC", result.data)
-        print(result.data)
 
     def test_get_transaction_fee(self):
-        loop = asyncio.get_event_loop()
-        result = loop.run_until_complete(self.exchange.get_transaction_fee())
+        result = asyncio.run(self.exchange.get_transaction_fee())
         self.assertTrue(result.success)
         self.assertIn("BTC", result.data)
-        print(result.data)
+
+    def test_coalesced_callers_get_their_own_data(self):
+        # _get_all_asset_details rewrites the coins of the response it got,
+        # get_transaction_fee sharing the same GET still sees every coin.
+        results = dict()
+        mock_server.latency = 0.3
+        try:
+            threads = [
+                threading.Thread(
+                    target=lambda: results.update(
+                        fee=asyncio.run(self.exchange.get_transaction_fee())
+                    )
+                ),
+                threading.Thread(
+                    target=lambda: results.update(
+                        details=self.exchange._get_all_asset_details()
+                    )
+                ),
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            mock_server.latency = 0.0
+
+        self.assertEqual(self.exchange.get_coalescing_stats()["collapsed"], 1)
+        self.assertTrue(results["fee"].success)
+        self.assertTrue(results["details"].success)
+        self.assertEqual(set(results["fee"].data), set(results["details"].data))
+        self.assertNotIn("coin", results["details"].data["BTC"])
 
     def test_get_balance(self):
-        loop = asyncio.get_event_loop()
-        balance_result = loop.run_until_complete(self.exchange.get_balance())
+        balance_result = self.exchange.get_balance()
         self.assertTrue(balance_result.success)
         self.assertIn("BTC", balance_result.data)
-        print(balance_result.data)
 
-    def test_get_avg_price(self):
-        loop = asyncio.get_event_loop()
-        result = loop.run_until_complete(self.exchange.get_avg_price(self.symbol_set))
+    def test_get_ticker(self):
+        result = self.exchange.get_ticker("BTC_XRP")
         self.assertTrue(result.success)
-        self.assertIn("BTC", result.data)
-        print(result.data)
+        self.assertGreater(result.data["sai_price"], 0)
 
     def test_market_trade(self):
-        converted_coin = self.exchange._sai_symbol_converter("BTC_XRP")
-        buy_result = self.exchange.buy(converted_coin, 5)
-        if buy_result.success:
-            print(buy_result.data)
-        else:
-            print(buy_result.message)
-        self.assertTrue(buy_result.success)
-
-        sell_result = self.exchange.sell(converted_coin, 5)
-        if sell_result.success:
-            print(sell_result.data)
-        else:
-            print(sell_result.message)
-        self.assertTrue(sell_result.success)
+        buy_result = self.exchange.buy("BTC_XRP", BaseTradeType.BUY_MARKET, 5)
+        self.assertTrue(buy_result.success, buy_result.message)
+        self.assertEqual(buy_result.data["sai_amount"], 5)
+
+        sell_result = self.exchange.sell("BTC_XRP", BaseTradeType.SELL_MARKET, 5)
+        self.assertTrue(sell_result.success, sell_result.message)
+        self.assertEqual(sell_result.data["sai_amount"], 5)
 
     def test_servertime(self):
-        servertime_result = self.exchange
-        print(time.time() - float(servertime_result.data))
+        servertime = self.exchange._get_servertime()
+        self.assertLess(abs(time.time() * 1000 - servertime), 60 * 1000)
 
 
 class BinanceSocketTest(unittest.TestCase):
-    symbol_set = ["BTC_XRP", "BTC_ETH", "BTC_ADA"]
-    symbol = "BTC_ADA"
+    symbol_set = ["BTC_XRP", "BTC_ETH", "BTC_TRX"]
+    symbol = "BTC_TRX"
 
-    @classmethod
-    def setUpClass(cls):
-        cls.exchange = binance.Binance(
-            "oYQYru6IvzCgxSFaCRdRQyKCHfpUQEEujZAxJsCw5LEjuR7D2F8S7pIGxrN9u2lB ",
-            "4WcKtsR88UqGMyYUuKVb7XZlo0adfr8z3eOtZZm4mRWaWTfJTc4prLcZ29Ti8zXl",
-        )
+    def setUp(self):
+        self.exchange = create_mock_binance()
+        self.exchange.set_subscriber()
+
+    def tearDown(self):
+        self.exchange._subscriber.close_websockets()
+        self.exchange.close()
 
     def test_subscribe_orderbook(self):
-        time.sleep(1)
-        self.exchange.set_subscribe_orderbook(self.symbol)
-        for _ in range(20):
-            time.sleep(1)
+        self.exchange.set_subscribe_orderbook([self.symbol])
+        asyncio.run(self.exchange.wait_orderbook(self.symbol, timeout=10))
+
+        result = self.exchange.get_orderbook()
+        self.assertTrue(result.success)
+        orderbook = result.data[self.symbol]
+        self.assertLess(orderbook[Consts.BIDS][0][0], orderbook[Consts.ASKS][0][0])
 
     def test_subscribe_candle(self):
-        time.sleep(1)
         self.exchange.set_subscribe_candle(self.symbol_set)
-        time.sleep(1)
+        for symbol in self.symbol_set:
+            asyncio.run(self.exchange.wait_candle(symbol, timeout=10))
 
-        for _ in range(20):
-            time.sleep(1)
+            result = self.exchange.get_candle(symbol)
+            self.assertTrue(result.success)
+            self.assertEqual(len(result.data[-1]), len(CandleSeries.COLUMNS))
+            self.assertIsInstance(result.data[-1][3], Decimal)
+
+            result = self.exchange.get_candle_series(symbol)
+            self.assertTrue(result.success)
+            key = (symbol, Consts.CANDLE_BASE_INTERVAL)
+            self.assertIsNot(result.data, self.exchange.data_store.candle_queue[key])
 
     def test_subscribe_mix(self):
-        time.sleep(1)
-        self.exchange.set_subscribe_orderbook(self.symbol)
-        time.sleep(1)
+        # an order validated by the REST ticker while the websocket keeps the book.
+        self.exchange.set_subscribe_orderbook([self.symbol])
         self.exchange.set_subscribe_candle(self.symbol_set)
-        for _ in range(20):
-            time.sleep(1)
+        asyncio.run(self.exchange.wait_orderbook(self.symbol, timeout=10))
+        asyncio.run(self.exchange.wait_candle(self.symbol, timeout=10))
+
+        avg_result = asyncio.run(self.exchange.get_curr_avg_orderbook())
+        self.assertTrue(avg_result.success)
+        ticker_result = self.exchange.get_ticker(self.symbol)
+        self.assertTrue(ticker_result.success)
+        price = ticker_result.data["sai_price"]
+        avg_orderbook = avg_result.data[self.symbol]
+        self.assertLess(abs(avg_orderbook[Consts.BIDS] - price) / price, Decimal("0.1"))
+
+        buy_result = self.exchange.buy(
+            self.symbol, BaseTradeType.BUY_LIMIT, 10, avg_orderbook[Consts.ASKS]
+        )
+        self.assertTrue(buy_result.success, buy_result.message)
+
+    def test_subscriber_process(self):
+        # the spawned subscriber connects to the urls of the exchange.
+        exchange = create_mock_binance()
+        exchange.start_subscriber_process([self.symbol])
+        try:
+            for _ in range(100):
+                result = exchange.get_orderbook()
+                if result.success:
+                    break
+                time.sleep(0.1)
+            self.assertTrue(result.success)
+            self.assertIn(self.symbol, result.data)
+        finally:
+            exchange.stop_subscriber_process()
+            exchange.close()
+
+
+class BinanceAsyncioSocketTest(BinanceSocketTest):
+    def setUp(self):
+        self.exchange = create_mock_binance(websocket_backend=WebsocketBackend.ASYNCIO)
+        self.exchange.set_subscriber()
+
+    def test_reconnect(self):
+        self.exchange.set_subscribe_orderbook([self.symbol])
+        asyncio.run(self.exchange.wait_orderbook(self.symbol, timeout=10))
+
+        app = self.exchange._subscriber._websocket_app
+        mock_server.drop_websockets()
+        for _ in range(100):
+            if app._open_count > 1 and app.opened.is_set():
+                break
+            time.sleep(0.05)
+        self.assertGreater(app._open_count, 1)
+
+        # the stream is subscribed again on the new connection.
+        asyncio.run(self.exchange.wait_orderbook(self.symbol, timeout=10))
+        result = self.exchange.get_orderbook()
+        self.assertIn(self.symbol, result.data)
+
+    def test_send_after_drop_is_queued(self):
+        # the loop cleared sock after send checked that the websocket was opened.
+        app = self.exchange._subscriber._websocket_app
+        self.assertTrue(app.wait_opened(10))
+        sock, app.sock = app.sock, None
+        try:
+            app._loop_thread.submit(app._send("message")).result()
+            self.assertEqual(app._pending_messages, ["message"])
+        finally:
+            app._pending_messages.clear()
+            app.sock = sock
+
+
+class TestSAIDataValidator(unittest.TestCase):
+    def test_trade(self):
+        validator = SAIDataValidator()
+        result = validator.trade(
+            {"average_price": "0.00002", "amount": "5", "id": 1, "extra": True}
+        )
+        self.assertEqual(
+            result,
+            {
+                "sai_average_price": Decimal("0.00002"),
+                "sai_amount": Decimal("5"),
+                "sai_id": "1",
+            },
+        )
+        self.assertIsNone(validator.trade({"average_price": "1", "amount": "5"}))
+
+    def test_missing_optional_key(self):
+        result = SAIDataValidator().withdrawal({"amount": "1", "coin": "BTC", "id": 3})
+        self.assertEqual(result["sai_fee"], Consts.NOT_FOUND)
+        self.assertEqual(result["sai_amount"], Decimal("1"))
+
+
+class TestLocalOrderbook(unittest.TestCase):
+    def setUp(self) -> None:
+        self.orderbook = LocalOrderbook("XRPBTC")
+        self.snapshot = {
+            "lastUpdateId": 10,
+            "bids": [["0.00002000", "100"], ["0.00001900", "50"]],
+            "asks": [["0.00002100", "70"], ["0.00002200", "30"]],
+        }
+
+    def test_buffered_events_are_replayed(self):
+        self.orderbook.buffer({"U": 5, "u": 10, "b": [["0.00002000", "1"]], "a": []})
+        self.orderbook.buffer(
+            {"U": 9, "u": 12, "b": [["0.00001950", "5"]], "a": [["0.00002100", "0"]]}
+        )
+
+        self.assertTrue(self.orderbook.apply_snapshot(self.snapshot))
+        self.assertEqual(self.orderbook.last_update_id, 12)
+
+        result = self.orderbook.to_dict()
+        self.assertEqual(
+            [price for price, _ in result["bids"]],
+            [Decimal("0.00002000"), Decimal("0.00001950"), Decimal("0.00001900")],
+        )
+        self.assertEqual(result["bids"][0][1], Decimal("100"))
+        self.assertEqual(result["asks"], [[Decimal("0.00002200"), Decimal("30")]])
+
+    def test_gap_is_detected(self):
+        self.assertTrue(self.orderbook.apply_snapshot(self.snapshot))
+        self.assertTrue(self.orderbook.apply_diff({"U": 11, "u": 11, "b": [], "a": []}))
+        self.assertFalse(
+            self.orderbook.apply_diff({"U": 13, "u": 14, "b": [], "a": []})
+        )
+
+    def test_snapshot_older_than_buffer(self):
+        self.orderbook.buffer({"U": 20, "u": 21, "b": [], "a": []})
+
+        self.assertFalse(self.orderbook.apply_snapshot(self.snapshot))
+        self.assertFalse(self.orderbook.synced)
+
+    def test_compact_orderbook(self):
+        self.assertTrue(self.orderbook.apply_snapshot(self.snapshot))
+
+        compact = self.orderbook.to_compact()
+        self.assertEqual(list(compact["bids"]), self.orderbook.to_dict()["bids"])
+        self.assertEqual(compact["asks"][0], [Decimal("0.00002100"), Decimal("70")])
+        self.assertEqual(compact.asks.prices[0], 2100)
+
+    def test_compact_master(self):
+        compact_orderbook = LocalOrderbook("XRPBTC", compact=True)
+        events = [
+            {"U": 11, "u": 11, "b": [["0.00001950", "5"]], "a": [["0.00002100", "0"]]},
+            {"U": 12, "u": 12, "b": [["0.00002000", "0"]], "a": [["0.00002150", "9"]]},
+        ]
+        for orderbook in [self.orderbook, compact_orderbook]:
+            self.assertTrue(orderbook.apply_snapshot(self.snapshot))
+        published = compact_orderbook.to_compact()
+
+        for event in events:
+            for orderbook in [self.orderbook, compact_orderbook]:
+                self.assertTrue(orderbook.apply_diff(event))
+
+        self.assertEqual(compact_orderbook.to_dict(), self.orderbook.to_dict())
+        self.assertEqual(
+            list(compact_orderbook.to_compact()["asks"]),
+            [
+                [Decimal("0.00002150"), Decimal("9")],
+                [Decimal("0.00002200"), Decimal("30")],
+            ],
+        )
+        # a published book is not changed by later events.
+        self.assertEqual(list(published.bids.prices), [2000, 1900])
+
+    def test_average_prices(self):
+        self.assertTrue(self.orderbook.apply_snapshot(self.snapshot))
+
+        orderbooks = {"BTC_XRP": self.orderbook.to_dict()}
+        compact_orderbooks = {"BTC_XRP": self.orderbook.to_compact()}
+        for btc_sum in [0.001, 0.0025, 1]:
+            expected = average_prices(orderbooks, btc_sum)["BTC_XRP"]
+            result = average_prices(compact_orderbooks, btc_sum)["BTC_XRP"]
+            for order_type in ["bids", "asks"]:
+                self.assertAlmostEqual(
+                    expected[order_type], result[order_type], delta=Decimal("1E-12")
+                )
+
+
+class TestSnapshotWorkers(unittest.TestCase):
+    def test_snapshots_are_fetched_by_bounded_workers(self):
+        lock_dic = {Consts.ORDERBOOK: threading.Lock(), Consts.CANDLE: threading.Lock()}
+        subscriber = binance.BinanceSubscriber(DataStore(), lock_dic)
+        release, lock, running = threading.Event(), threading.Lock(), [0, 0]
+
+        def get_snapshot(symbol):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            release.wait(5)
+            with lock:
+                running[0] -= 1
+            return {"lastUpdateId": 0, "bids": [], "asks": []}
+
+        subscriber._get_orderbook_snapshot = get_snapshot
+        try:
+            symbols = ["C{}BTC".format(number) for number in range(20)]
+            for symbol in symbols:
+                subscriber.orderbook_receiver(
+                    {"s": symbol, "U": 1, "u": 1, "b": list(), "a": list()}
+                )
+            time.sleep(0.2)
+            self.assertEqual(running, [Consts.ORDERBOOK_SNAPSHOT_WORKERS] * 2)
+            self.assertEqual(
+                len(subscriber._snapshot_workers), Consts.ORDERBOOK_SNAPSHOT_WORKERS
+            )
+
+            release.set()
+            for _ in range(100):
+                if all(book.synced for book in subscriber._local_orderbooks.values()):
+                    break
+                time.sleep(0.05)
+            self.assertEqual(len(subscriber._local_orderbooks), len(symbols))
+            self.assertTrue(
+                all(book.synced for book in subscriber._local_orderbooks.values())
+            )
+        finally:
+            release.set()
+            subscriber.stop()
+
+
+class TestAverageOrderbookCache(unittest.TestCase):
+    def test_only_dirty_symbols_are_recomputed(self):
+        cache = AverageOrderbookCache()
+        orderbooks = {
+            "BTC_XRP": {
+                "bids": [[Decimal("1"), Decimal("2")]],
+                "asks": [[Decimal("2"), Decimal("1")]],
+            },
+            "BTC_ETH": {
+                "bids": [[Decimal("3"), Decimal("1")]],
+                "asks": [[Decimal("4"), Decimal("1")]],
+            },
+        }
+        first = cache.get(orderbooks)
+        self.assertEqual(first["BTC_XRP"]["bids"], Decimal("1"))
+
+        orderbooks["BTC_XRP"] = {"bids": [[Decimal("5"), Decimal("1")]], "asks": []}
+        orderbooks["BTC_ETH"] = {"bids": [[Decimal("6"), Decimal("1")]], "asks": []}
+        cache.mark_dirty("BTC_XRP")
+
+        result = cache.get(orderbooks)
+        self.assertEqual(result["BTC_XRP"]["bids"], Decimal("5"))
+        self.assertEqual(result["BTC_ETH"]["bids"], Decimal("3"))
+        self.assertEqual(first["BTC_XRP"]["bids"], Decimal("1"))
+
+        result.clear()
+        self.assertIn("BTC_XRP", cache.get(orderbooks))
+
+    def test_concurrent_first_gets(self):
+        cache = AverageOrderbookCache()
+        orderbooks = {
+            "BTC_XRP": {
+                "bids": [[Decimal("1"), Decimal("2")]],
+                "asks": [[Decimal("2"), Decimal("1")]],
+            },
+        }
+        errors = list()
+
+        def get():
+            try:
+                for _ in range(100):
+                    cache.mark_dirty("BTC_XRP")
+                    self.assertIn("BTC_XRP", cache.get(orderbooks))
+            except Exception as ex:
+                errors.append(ex)
+
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, list())
+
+    def test_least_recently_used_btc_sum_is_dropped(self):
+        cache = AverageOrderbookCache(max_size=2)
+        orderbooks = {"BTC_XRP": {"bids": [[Decimal("1"), Decimal("2")]], "asks": []}}
+        for btc_sum in [1.0, 2.0, 1.0, 3.0]:
+            cache.get(orderbooks, btc_sum)
+        self.assertEqual(list(cache._tables), [1.0, 3.0])
+
+
+class TestCandleSeries(unittest.TestCase):
+    def test_current_bar_is_updated_in_place(self):
+        series = CandleSeries(capacity=3)
+        series.update("1", "2", "0.5", "1.5", "10", 60000)
+        series.update("1", "3", "0.5", "2.5", "12", 60000)
+
+        self.assertEqual(len(series), 1)
+        self.assertEqual(series.last(), [1.0, 3.0, 0.5, 2.5, 12.0, 60000])
+
+    def test_rolls_over_capacity(self):
+        series = CandleSeries(capacity=3)
+        for minute in range(5):
+            series.update(minute, minute, minute, minute, 1, minute * 60000)
+
+        self.assertEqual(len(series), 3)
+        self.assertEqual(list(series["close"]), [2.0, 3.0, 4.0])
+        self.assertEqual(list(series["timestamp"]), [120000, 180000, 240000])
+        self.assertFalse(series.update(0, 0, 0, 0, 0, 0))
+
+    def test_copy(self):
+        series = CandleSeries(capacity=3)
+        series.update(1, 2, 0.5, 1.5, 10, 60000)
+        copied = series.copy()
+        series.update(1, 3, 0.5, 2.5, 12, 60000)
+        series.update(2, 3, 0.5, 2.5, 12, 120000)
+
+        self.assertEqual(list(copied), [[1.0, 2.0, 0.5, 1.5, 10.0, 60000]])
+        self.assertEqual(len(series), 2)
+
+    def test_decimal_rows(self):
+        series = CandleSeries(capacity=3)
+        series.update("0.00002345", "61234.56", "0.1", "123456.78901234", "10", 60000)
+
+        self.assertEqual(series.decimal_rows(), [[
+            Decimal("0.00002345"), Decimal("61234.56"), Decimal("0.1"),
+            Decimal("123456.78901234"), Decimal("10.0"), 60000,
+        ]])
+
+    def test_fold_into_higher_interval(self):
+        subscriber = BaseSubscriber()
+        subscriber.data_store = DataStore()
+        subscriber.set_candle_intervals(["1m", "5m"])
+
+        for minute in range(6):
+            high, close, timestamp = str(2 + minute), str(minute), minute * 60000
+            candle_list = ["1", high, "0.5", close, "10", timestamp]
+            subscriber.store_candle("BTC_XRP", candle_list)
+            subscriber.store_candle("BTC_XRP", candle_list, closed=True)
+
+        series = subscriber.data_store.candle_queue[("BTC_XRP", "5m")]
+        self.assertEqual(list(series["timestamp"]), [0, 300000])
+        self.assertEqual(list(series)[0], [1.0, 6.0, 0.5, 4.0, 50.0, 0])
+        self.assertEqual(len(subscriber.data_store.candle_queue[("BTC_XRP", "1m")]), 6)
+
+    def test_intervals(self):
+        self.assertEqual(interval_to_milliseconds("1s"), 1000)
+        self.assertEqual(interval_to_milliseconds("4h"), 14400000)
+        for interval in ["1M", "m", "1x"]:
+            with self.assertRaises(ValueError):
+                interval_to_milliseconds(interval)
+
+        subscriber = BaseSubscriber()
+        for intervals in [["1m", "1M"], ["1s"], ["90s"]]:
+            with self.assertRaises(ValueError):
+                subscriber.set_candle_intervals(intervals)
+        subscriber.set_candle_intervals(["1m", "120s", "1w"])
+
+
+class TestOrderbookSnapshot(unittest.TestCase):
+    def test_versions_and_copy_on_write(self):
+        subscriber = BaseSubscriber()
+        subscriber.data_store = DataStore()
+        first = {"bids": [[Decimal("1"), Decimal("1")]], "asks": []}
+        second = {"bids": [[Decimal("2"), Decimal("1")]], "asks": []}
+
+        subscriber.store_orderbook("BTC_XRP", first)
+        snapshot = OrderbookSnapshot(subscriber.data_store.orderbook_entries)
+        subscriber.store_orderbook("BTC_XRP", second)
+
+        self.assertIs(snapshot["BTC_XRP"], first)
+        self.assertEqual(snapshot.versions["BTC_XRP"], 1)
+        self.assertEqual(subscriber.data_store.orderbook_entries["BTC_XRP"][0], 2)
+
+
+class TestReconnect(unittest.TestCase):
+    class FakeApp(OpenEventMixin):
+        def __init__(self):
+            self._init_open_event()
+
+        def send(self, message):
+            self._queue_if_not_opened(message)
+
+        def flush(self):
+            return [json.loads(message) for message in self._take_pending_or_open()]
+
+    def setUp(self):
+        self.subscriber = BaseSubscriber()
+        self.subscriber.converter = BinanceConverter
+        self.subscriber.base_logger = logging
+        self.subscriber.data_store = DataStore()
+        self.subscriber.subscribe_message = lambda streams, ticket: streams
+
+    def test_reconnect_delay(self):
+        for attempt in range(10):
+            delay = reconnect_delay(attempt)
+            self.assertLessEqual(delay, Consts.RECONNECT_MAX_DELAY)
+            self.assertGreaterEqual(
+                delay, min(Consts.RECONNECT_MAX_DELAY, 2 ** attempt) / 2
+            )
+
+    def test_resubscribe_on_reopen(self):
+        shard, app = WebsocketShard(0), self.FakeApp()
+        shard.streams.update(["xrpbtc@depth", "ethbtc@depth"])
+        # sent while it was disconnected
+        app.send(json.dumps(["ltcbtc@depth"]))
+        self.subscriber._on_shard_reopened(shard, app)
+        self.assertEqual(
+            app.flush(), [["ethbtc@depth", "xrpbtc@depth"], ["ltcbtc@depth"]]
+        )
+
+    def test_stale_symbols(self):
+        self.subscriber.set_orderbook_symbol_set(["xrpbtc", "ethbtc"])
+        self.subscriber._orderbook_watch_times = dict.fromkeys(
+            ["xrpbtc", "ethbtc"], time.time() - 60
+        )
+        self.subscriber.store_orderbook("BTC_XRP", {"bids": [], "asks": []})
+
+        self.assertEqual(self.subscriber.get_stale_symbols(30), ["ethbtc"])
+
+
+class TestSharding(unittest.TestCase):
+    class FakeWebsocket(OpenEventMixin):
+        # [(app, message), ..] of every app in the order they were sent
+        log = None
+
+        def __init__(self, url, on_message, ping_time_per_second):
+            self._init_open_event()
+
+        def start(self):
+            self.connect()
+
+        def connect(self):
+            self._reopened()
+            while True:
+                pending = self._take_pending_or_open()
+                if not pending:
+                    break
+                self.log.extend((self, json.loads(message)) for message in pending)
+
+        def drop(self):
+            self._set_closed()
+
+        def send(self, message):
+            if not self._queue_if_not_opened(message):
+                self.log.append((self, json.loads(message)))
+
+    def setUp(self):
+        self.FakeWebsocket.log = list()
+        patcher = mock.patch("Exchanges.objects.CustomWebsocket", self.FakeWebsocket)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.subscriber = BaseSubscriber()
+        self.subscriber.base_logger = logging
+        self.subscriber.max_streams_per_connection = 2
+        self.subscriber.subscribe_message = lambda streams, ticket: ["+"] + streams
+        self.subscriber.unsubscribe_message = lambda streams, ticket: ["-"] + streams
+        self.subscriber.start_websocket_thread()
+
+    def placement(self):
+        return [sorted(shard.streams) for shard in self.subscriber._shards]
+
+    def test_split_into_new_shard(self):
+        self.subscriber.subscribe_streams(["a", "b"], 1)
+        self.assertEqual(len(self.subscriber._shards), 1)
+
+        self.subscriber.subscribe_streams(["c", "d", "e"], 1)
+        placement = self.placement()
+        self.assertEqual(len(placement), 3)
+        self.assertTrue(all(len(streams) <= 2 for streams in placement))
+        self.assertEqual(sorted(sum(placement, list())), ["a", "b", "c", "d", "e"])
+
+    def test_rebalance_subscribes_before_unsubscribing(self):
+        self.subscriber.subscribe_streams(["a", "b"], 1)
+        self.subscriber.max_streams_per_connection = 4
+        source = self.subscriber._shards[0]
+        target = self.subscriber._add_shard()
+        for stream in ["c", "d"]:
+            source.streams.add(stream)
+            self.subscriber._stream_shard_dict[stream] = source
+        del self.FakeWebsocket.log[:]
+
+        self.subscriber.rebalance(1)
+        self.assertEqual([len(streams) for streams in self.placement()], [2, 2])
+        self.assertEqual(sorted(sum(self.placement(), list())), ["a", "b", "c", "d"])
+        (first_app, subscribed), (second_app, unsubscribed) = self.FakeWebsocket.log
+        self.assertEqual((first_app, subscribed[0]), (target.app, "+"))
+        self.assertEqual((second_app, unsubscribed[0]), (source.app, "-"))
+        self.assertEqual(sorted(subscribed[1:]), sorted(target.streams))
+        for stream in target.streams:
+            self.assertIs(self.subscriber._stream_shard_dict[stream], target)
+
+    def test_shard_stats(self):
+        self.subscriber.subscribe_streams(["a", "b", "c"], 1)
+        shard = self.subscriber._shards[1]
+        for _ in range(3):
+            shard.on_message(lambda *args: None, "frame")
+
+        stats = self.subscriber.shard_stats()
+        self.assertEqual([each["index"] for each in stats], [0, 1])
+        self.assertEqual([each["streams"] for each in stats], [2, 1])
+        self.assertEqual([each["messages"] for each in stats], [0, 3])
+        self.assertGreater(stats[1]["rate"], 0)
+
+    def test_resubscribe_after_reconnect(self):
+        self.subscriber.subscribe_streams(["a", "b", "c"], 1)
+        shard = self.subscriber._shards[1]
+        shard.app.drop()
+        # placed on the dropped shard, the least loaded one.
+        self.subscriber.subscribe_streams(["d"], 1)
+        del self.FakeWebsocket.log[:]
+
+        shard.app.connect()
+        # every stream of the shard is subscribed again before the queued message.
+        self.assertEqual(
+            self.FakeWebsocket.log,
+            [(shard.app, ["+", "c", "d"]), (shard.app, ["+", "d"])],
+        )
+        self.assertTrue(self.subscriber._shards[0].app.opened.is_set())
+
+
+class TestDecoders(unittest.TestCase):
+    def test_get_loads(self):
+        payload = '{"s": "XRPBTC", "b": [["0.00002000", "1.0"]], "u": 1}'
+        for decoder in list(AVAILABLE_LOADS) + [JsonDecoder.AUTO]:
+            loads = get_loads(decoder)
+            self.assertEqual(loads(payload), json.loads(payload))
+            self.assertEqual(loads(payload.encode()), json.loads(payload))
+            self.assertRaises(ValueError, loads, "{")
+
+        self.assertIs(get_loads(JsonDecoder.JSON), json.loads)
+        self.assertRaises(ValueError, get_loads, "unknown")
+
+
+class TestMessageDispatcher(unittest.TestCase):
+    def test_dispatch_and_stats(self):
+        dispatcher, received = MessageDispatcher(), list()
+        dispatcher.register("kline", received.append)
+        dispatcher.register("trade", lambda data: data["missing"])
+
+        self.assertTrue(dispatcher.dispatch("kline", {"e": "kline"}))
+        self.assertFalse(dispatcher.dispatch("depthUpdate", {}))
+        self.assertRaises(KeyError, dispatcher.dispatch, "trade", {})
+
+        stats = {stat["event_type"]: stat for stat in dispatcher.stats()}
+        self.assertEqual(received, [{"e": "kline"}])
+        self.assertEqual((stats["kline"]["count"], stats["kline"]["errors"]), (1, 0))
+        self.assertEqual((stats["trade"]["count"], stats["trade"]["errors"]), (1, 1))
+        self.assertEqual(dispatcher.unknown_count, 1)
+
+
+class TestSharedMarketData(unittest.TestCase):
+    def setUp(self):
+        self.shared = SharedMarketData.create(["BTC_XRP"], [("BTC_XRP", "1m")])
+        self.reader = SharedMarketData.attach(*self.shared.names)
+
+    def tearDown(self):
+        self.reader.close()
+        self.shared.close()
+        self.shared.unlink()
+
+    def test_orderbook(self):
+        self.assertIsNone(self.reader.read_orderbook("BTC_XRP"))
+        bids = [
+            [Decimal("0.00002"), Decimal("10")],
+            [Decimal("0.000019"), Decimal("5")],
+        ]
+        asks = [[Decimal("0.000021"), Decimal("3")]]
+        self.shared.publish_orderbook("BTC_XRP", {"bids": bids, "asks": asks})
+
+        version, orderbook = self.reader.read_orderbook("BTC_XRP")
+        self.assertEqual(version, 1)
+        self.assertEqual(list(orderbook["bids"]), bids)
+        self.assertEqual(list(orderbook["asks"]), asks)
+        self.assertIsNone(self.reader.read_orderbook("BTC_XRP", version))
+
+    def test_candle(self):
+        self.assertIsNone(self.reader.read_candle("BTC_XRP", "1m"))
+        series = CandleSeries(capacity=3)
+        for minute in range(5):
+            series.update(minute, minute, minute, minute, 1, minute * 60000)
+        self.shared.publish_candle("BTC_XRP", "1m", series)
+
+        candles = self.reader.read_candle("BTC_XRP", "1m")
+        self.assertEqual(list(candles), list(series))
+        self.assertEqual(candles.last_timestamp, 240000)
+
+    def test_seqlock_of_writer_process(self):
+        # reads racing 200k writes of another process never see a torn slot.
+        writes = 200000
+        table = SharedColumnTable.create(["BTC_XRP"], "qq", 16)
+        context = multiprocessing.get_context("spawn")
+        writer = context.Process(
+            target=write_shared_slot, args=(table.name, "BTC_XRP", writes)
+        )
+        try:
+            writer.start()
+            last_version = 0
+            while True:
+                done = not writer.is_alive()
+                version, columns = table.read("BTC_XRP")
+                self.assertGreaterEqual(version, last_version)
+                if version:
+                    expected = [version] * (version % table.capacity + 1)
+                    self.assertEqual(list(map(list, columns)), [expected] * 2)
+                last_version = version
+                if done:
+                    break
+            writer.join()
+            self.assertEqual(writer.exitcode, 0)
+            self.assertEqual(last_version, writes)
+        finally:
+            table.close()
+            table.unlink()
+
+
+async def cancel_tasks():
+    # the server and its connection handlers, before the loop is closed.
+    tasks = asyncio.all_tasks() - {asyncio.current_task()}
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class TestMarketDataServer(unittest.TestCase):
+    def test_respond_newer_versions(self):
+        exchange = type("FakeExchange", (), {"data_store": DataStore()})()
+        subscriber = BaseSubscriber()
+        subscriber.data_store = exchange.data_store
+        subscriber.store_orderbook(
+            "BTC_XRP", {"bids": [[Decimal("1"), Decimal("2")]], "asks": []}
+        )
+        subscriber.store_orderbook("BTC_ETH", {"bids": [], "asks": []})
+        server = MarketDataServer(exchange)
+
+        response = server.respond({"op": "orderbooks", "versions": {"BTC_XRP": 1}})
+        self.assertEqual(
+            response, {"orderbooks": {"BTC_ETH": [1, [], []]}, "diffs": dict()}
+        )
+        response = server.respond({"op": "orderbooks"})
+        self.assertEqual(response["orderbooks"]["BTC_XRP"], [1, [["1", "2"]], []])
+
+    def test_orderbook_diffs(self):
+        exchange = type("FakeExchange", (), {"data_store": DataStore()})()
+        subscriber = BaseSubscriber()
+        subscriber.data_store = exchange.data_store
+        bids = [[Decimal("3"), Decimal("1")], [Decimal("2"), Decimal("1")]]
+        asks = [[Decimal("4"), Decimal("1")]]
+        subscriber.store_orderbook("BTC_XRP", {"bids": bids, "asks": asks})
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "market.sock")
+            server = MarketDataServer(exchange, path)
+            loop = asyncio.new_event_loop()
+            loop.create_task(server.serve_forever())
+            thread = threading.Thread(target=loop.run_forever, daemon=True)
+            thread.start()
+            data_store = RemoteDataStore(path)
+            try:
+                for _ in range(100):
+                    if os.path.exists(path):
+                        break
+                    time.sleep(0.01)
+                data_store.sync_orderbooks()
+
+                responses, request = list(), data_store.client.request
+
+                def record(op, **params):
+                    responses.append(request(op, **params))
+                    return responses[-1]
+
+                data_store.client.request = record
+
+                # a level changed, one removed and one added
+                bids = [[Decimal("3"), Decimal("2")], [Decimal("1"), Decimal("5")]]
+                subscriber.store_orderbook("BTC_XRP", {"bids": bids, "asks": asks})
+                data_store.sync_orderbooks()
+                self.assertEqual(
+                    responses[-1],
+                    {
+                        "orderbooks": dict(),
+                        "diffs": {
+                            "BTC_XRP": [2, [["3", "2"], ["1", "5"], ["2", "0"]], []]
+                        },
+                    },
+                )
+                self.assertEqual(data_store.orderbook_entries["BTC_XRP"][0], 2)
+                self.assertEqual(data_store.orderbook_queue["BTC_XRP"]["bids"], bids)
+                self.assertEqual(data_store.orderbook_queue["BTC_XRP"]["asks"], asks)
+            finally:
+                data_store.client.close()
+                asyncio.run_coroutine_threadsafe(cancel_tasks(), loop).result()
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join()
+                loop.close()
+
+    def test_public_setup(self):
+        # the server has no keys, markets come from public endpoints only.
+        exchange = binance.Binance(
+            str(),
+            str(),
+            base_url=mock_server.base_url,
+            websocket_url=mock_server.websocket_url,
+        )
+        try:
+            exchange.setup(public_only=True)
+            self.assertIsNone(exchange.all_details)
+            self.assertEqual(exchange.converter.sai_to_exchange("BTC_XRP"), "XRPBTC")
+            self.assertIn("XRPBTC", exchange._symbol_details_dict)
+        finally:
+            exchange.close()
+
+    def test_respond_candle_since(self):
+        exchange = create_mock_binance()
+        series = CandleSeries(capacity=3)
+        for minute in range(3):
+            series.update(minute, minute, minute, minute, 1, minute * 60000)
+        exchange.data_store.candle_queue[("BTC_XRP", "1m")] = series
+        server = MarketDataServer(exchange)
+        try:
+            response = server.respond(
+                {"op": "candle", "symbol": "BTC_XRP", "interval": "1m", "since": 60000}
+            )
+            self.assertEqual(response["candle"], list(series)[1:])
+            response = server.respond(
+                {"op": "candle", "symbol": "BTC_ETH", "interval": "1m"}
+            )
+            self.assertEqual(response, {"candle": list()})
+        finally:
+            exchange.close()
+
+
+class TestMockExchangeServer(unittest.TestCase):
+    def test_seed_does_not_touch_global_random(self):
+        random.seed(1)
+        expected = random.random()
+        random.seed(1)
+        first = MockExchangeServer(seed=7)
+        self.assertEqual(random.random(), expected)
+
+        second = MockExchangeServer(seed=7)
+        for server in (first, second):
+            server.markets[("BTC", "XRP")].step()
+        self.assertEqual(
+            first.markets[("BTC", "XRP")].levels(),
+            second.markets[("BTC", "XRP")].levels(),
+        )
+
+
+class TestFrameRecorder(unittest.TestCase):
+    def test_record_and_read(self):
+        with tempfile.TemporaryDirectory() as directory:
+            recorder = FrameRecorder(directory, segment_size=100)
+            for number in range(10):
+                recorder.record(json.dumps({"e": "kline", "n": number}))
+            recorder.record_snapshot("XRPBTC", b'{"lastUpdateId": 1}')
+            recorder.close()
+
+            records = list(read_records(directory))
+            self.assertGreater(len(os.listdir(directory)), 1)
+            self.assertEqual(
+                [json.loads(payload)["n"] for _, _, _, payload in records[:10]],
+                list(range(10)),
+            )
+            self.assertEqual(records[-1][0], SNAPSHOT)
+            self.assertEqual(records[-1][2], "XRPBTC")
+
+    def test_closed_when_subscriber_stops(self):
+        with tempfile.TemporaryDirectory() as directory:
+            subscriber = BaseSubscriber()
+            subscriber.start_recording(directory)
+            for number in range(3):
+                subscriber.receive(None, json.dumps({"e": "kline", "n": number}))
+            subscriber.close_websockets()
+
+            self.assertIsNone(subscriber.recorder)
+            # a truncated gzip segment would raise EOFError while it is read.
+            self.assertEqual(len(list(read_records(directory))), 3)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.limiter = RateLimiter(
+            {
+                RateLimit.WEIGHT: TokenBucket(100, 60),
+                RateLimit.ORDER: TokenBucket(5, 10),
+            },
+            request_cost,
+            RateLimit.USED_HEADERS,
+        )
+
+    def test_request_cost(self):
+        self.assertEqual(
+            request_cost("GET", "/api/v3/depth", {"limit": 1000}), {"weight": 50}
+        )
+        self.assertEqual(
+            request_cost("POST", "/api/v3/order", {}), {"weight": 1, "order": 1}
+        )
+        self.assertEqual(
+            request_cost("GET", "/sapi/v1/capital/config/getall", {}),
+            {"sapi_weight": 10},
+        )
+
+    def test_wait_for_debt(self):
+        params = {"limit": 1000}
+        self.assertEqual(self.limiter.reserve("GET", "/api/v3/depth", params), 0)
+        self.assertEqual(self.limiter.reserve("GET", "/api/v3/depth", params), 0)
+        wait = self.limiter.reserve("GET", "/api/v3/depth", params)
+        self.assertAlmostEqual(wait, 30, delta=0.1)
+        self.assertEqual(self.limiter.stats()["waits"], 1)
+
+    def test_calibrate_and_retry_after(self):
+        self.limiter.update(200, {"X-MBX-USED-WEIGHT-1M": "90"})
+        stats = self.limiter.stats()["buckets"][RateLimit.WEIGHT]
+        self.assertEqual(stats["server_used"], 90)
+        self.assertAlmostEqual(stats["available"], 10, delta=0.1)
+
+        self.limiter.update(429, {"Retry-After": "3"})
+        wait = self.limiter.reserve("POST", "/api/v3/order")
+        self.assertGreaterEqual(wait, 3)
+        self.assertEqual(self.limiter.stats()["retry_afters"], 1)
+
+    def test_pickled_for_subscriber_process(self):
+        self.limiter.update(200, {"X-MBX-USED-WEIGHT-1M": "90"})
+        limiter = pickle.loads(pickle.dumps(self.limiter))
+        stats = limiter.stats()["buckets"][RateLimit.WEIGHT]
+        self.assertEqual(stats["server_used"], 90)
+        self.assertAlmostEqual(stats["available"], 10, delta=0.1)
+        self.assertIsNot(limiter._lock, self.limiter._lock)
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_eviction(self):
+        cache = TTLCache(ttl=60, max_size=2)
+        for symbol in ["BTC_XRP", "BTC_ETH", "BTC_LTC"]:
+            cache.set(symbol, symbol)
+
+        self.assertIsNone(cache.get("BTC_XRP"))
+        self.assertEqual(cache.get("BTC_LTC"), "BTC_LTC")
+        stats = cache.stats()
+        self.assertEqual((stats["size"], stats["evictions"]), (2, 1))
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_stale_while_revalidate(self):
+        cache, refreshed = TTLCache(ttl=0, stale_ttl=60), threading.Event()
+
+        def refresh():
+            cache.set(None, 2)
+            refreshed.set()
+
+        cache.set(None, 1)
+        self.assertIsNone(cache.get(None))
+        self.assertEqual(cache.get(None, refresh), 1)
+        self.assertTrue(refreshed.wait(1))
+        self.assertEqual(cache.get(None, refresh), 2)
+        self.assertEqual(cache.stats()["stale_hits"], 2)
+
+    def test_async_revalidate_keeps_the_task(self):
+        cache = TTLCache(ttl=0, stale_ttl=60)
+
+        async def refresh():
+            await asyncio.sleep(0.01)
+            cache.set(None, 2)
+
+        async def run():
+            cache.set(None, 1)
+            self.assertEqual(cache.get(None, refresh), 1)
+            self.assertEqual(len(cache._tasks), 1)
+            await asyncio.gather(*cache._tasks)
+            await asyncio.sleep(0)
+            self.assertEqual(cache._tasks, set())
+            self.assertEqual(cache.get(None, refresh), 2)
+
+        asyncio.run(run())
+        self.assertEqual(cache.stats()["refreshes"], 2)
+
+
+class TestAsyncSessionManager(unittest.TestCase):
+    def test_session_of_a_closed_loop_is_closed(self):
+        manager = AsyncSessionManager()
+
+        async def ping():
+            session = await manager.get()
+            async with session.get(mock_server.base_url + "/api/v3/ping") as response:
+                self.assertEqual(response.status, 200)
+            return session
+
+        first = asyncio.run(ping())
+        second = asyncio.run(ping())
+        self.assertIsNot(first, second)
+        self.assertTrue(first.closed)
+
+        asyncio.run(manager.close())
+        self.assertTrue(second.closed)
+
+    def test_session_of_another_thread_loop_is_closed_there(self):
+        manager, loop = AsyncSessionManager(), asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            first = asyncio.run_coroutine_threadsafe(manager.get(), loop).result()
+            second = asyncio.run(manager.get())
+            self.assertIsNot(first, second)
+            for _ in range(100):
+                if first.closed:
+                    break
+                time.sleep(0.01)
+            self.assertTrue(first.closed)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_threads_share_a_call(self):
+        flight, release, executions = SingleFlight(), threading.Event(), list()
+
+        def request():
+            executions.append(1)
+            release.wait(1)
+            return "ticker"
+
+        results = list()
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do("key", request)))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        while flight.stats()["calls"] < 3:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual((results, executions), (["ticker"] * 3, [1]))
+        self.assertEqual(flight.stats(), {"calls": 3, "collapsed": 2, "in_flight": 0})
+
+    def test_shared_call_is_copied(self):
+        flight, release = SingleFlight(), threading.Event()
+
+        def request():
+            release.wait(1)
+            return ["BTC"]
+
+        results = list()
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(flight.do("key", request, list))
+            )
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        while flight.stats()["calls"] < 2:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [["BTC"], ["BTC"]])
+        self.assertIsNot(results[0], results[1])
+        # a call nobody shared is not copied.
+        result = flight.do("key", request)
+        self.assertIs(flight.do("other", lambda: result, list), result)
+
+    def test_coroutines_share_a_call(self):
+        flight, executions = SingleFlight(), list()
+
+        async def request():
+            executions.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("failed")
+
+        async def gather():
+            return await asyncio.gather(
+                *[flight.do_async("key", request) for _ in range(3)],
+                return_exceptions=True,
+            )
+
+        results = asyncio.new_event_loop().run_until_complete(gather())
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual((executions, flight.collapsed), ([1], 2))
+
+
+class TestTickerTable(unittest.TestCase):
+    def test_fresh_prices_only(self):
+        data_store = DataStore()
+        self.assertIsNone(data_store.get_ticker_price("BTC_XRP"))
+
+        data_store.store_tickers({"BTC_XRP": Decimal("0.00002")})
+        data_store.store_tickers({"BTC_ETH": Decimal("0.05")})
+        self.assertEqual(data_store.get_ticker_price("BTC_XRP"), Decimal("0.00002"))
+        self.assertIsNone(data_store.get_ticker_price("BTC_LTC"))
+
+        data_store.ticker_update_time -= Consts.TICKER_STALE_SECONDS + 1
+        self.assertIsNone(data_store.get_ticker_price("BTC_ETH"))
+
+
+class TestSymbolIndex(unittest.TestCase):
+    def tearDown(self):
+        BinanceConverter.index = None
+
+    def test_exchange_info_index(self):
+        exchange_info = {
+            "symbols": [
+                {"symbol": "XRPBTC", "baseAsset": "XRP", "quoteAsset": "BTC"},
+                {"symbol": "BTCSTBTC", "baseAsset": "BTCST", "quoteAsset": "BTC"},
+                {"symbol": "BCCBNB", "baseAsset": "BCC", "quoteAsset": "BNB"},
+            ]
+        }
+        index = BinanceConverter.load_exchange_info(exchange_info)
+
+        self.assertEqual(BinanceConverter.exchange_to_sai("btcstbtc"), "BTC_BTCST")
+        self.assertEqual(BinanceConverter.exchange_to_sai("BCCBNB"), "BNB_BCH")
+        self.assertEqual(BinanceConverter.sai_to_exchange("BNB_BCH"), "BCCBNB")
+        self.assertEqual(
+            BinanceConverter.sai_to_exchange_subscriber("BTC_XRP"), "xrpbtc"
+        )
+        self.assertEqual(
+            [BinanceConverter.get_symbol_id(sai) for sai in index.sai_symbols()],
+            [0, 1, 2],
+        )
+        self.assertEqual(index.get_sai(2), "BNB_BCH")
+
+    def test_trade_type(self):
+        self.assertEqual(
+            BinanceConverter.sai_to_exchange_trade_type(BaseTradeType.BUY_LIMIT), "limit"
+        )
+        self.assertEqual(
+            BinanceConverter.sai_to_exchange_trade_type(BaseTradeType.SELL_MARKET),
+            "market",
+        )
+
+    def test_parse_without_index(self):
+        self.assertEqual(BinanceConverter.exchange_to_sai("btcstbtc"), "BTC_BTCST")
+        self.assertIsNone(BinanceConverter.exchange_to_sai("BCCBNB"))
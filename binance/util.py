@@ -1,4 +1,7 @@
 from Exchanges.settings import BaseMarkets
+from Exchanges.ratelimits import TokenBucket, RateLimiter
+from Exchanges.symbols import SymbolIndex
+from Exchanges.binance.setting import RateLimit, ENDPOINT_WEIGHTS, DEPTH_WEIGHTS
 
 
 def symbol_localizing(symbol):
@@ -13,9 +16,40 @@ def symbol_customizing(symbol):
 
 
 class BinanceConverter(object):
+    # SymbolIndex of exchangeInfo, symbols are parsed only until it is loaded.
+    index = None
+
+    @classmethod
+    def load_exchange_info(cls, exchange_info):
+        pairs = [
+            (
+                "{}_{}".format(
+                    data["quoteAsset"], symbol_customizing(data["baseAsset"])
+                ),
+                data["symbol"],
+            )
+            for data in exchange_info["symbols"]
+        ]
+        cls.index = SymbolIndex.from_pairs(pairs)
+        return cls.index
+
+    @staticmethod
+    def get_symbol_id(sai_symbol):
+        """
+        integer id of sai_symbol in the index, None when it is not listed.
+        """
+        if BinanceConverter.index is None:
+            return None
+        return BinanceConverter.index.get_id(sai_symbol)
+
     @staticmethod
     def sai_to_exchange(sai_symbol):
         # BTC_XRP -> XRPBTC
+        if BinanceConverter.index is not None:
+            symbol = BinanceConverter.index.to_exchange(sai_symbol)
+            if symbol is not None:
+                return symbol
+
         if "_" not in sai_symbol:
             return sai_symbol
 
@@ -30,9 +64,15 @@ class BinanceConverter(object):
     @staticmethod
     def exchange_to_sai(symbol):
         # xrpbtc -> BTC_XRP
+        if BinanceConverter.index is not None:
+            sai_symbol = BinanceConverter.index.to_sai(symbol)
+            if sai_symbol is not None:
+                return sai_symbol
+
         if "_" in symbol:
             return symbol
 
+        symbol = symbol.upper()
         if symbol.endswith(BaseMarkets.BTC):
             market = BaseMarkets.BTC
         elif symbol.endswith(BaseMarkets.ETH):
@@ -42,12 +82,12 @@ class BinanceConverter(object):
         else:
             return None
 
-        coin = symbol.replace(market, "")
-        return "{}_{}".format(market, symbol_customizing(coin)).upper()
+        coin = symbol[: -len(market)]
+        return "{}_{}".format(market, symbol_customizing(coin))
 
     @staticmethod
     def exchange_to_sai_subscriber(symbol):
-        return BinanceConverter.exchange_to_sai(symbol).upper()
+        return BinanceConverter.exchange_to_sai(symbol)
 
     @staticmethod
     def sai_to_exchange_trade_type(trade_type):
@@ -59,3 +99,38 @@ class BinanceConverter(object):
         )
 
         return actual_trade_type.get(trade_type, trade_type)
+
+
+def request_cost(method, path, params):
+    """
+    {bucket: amount} of a request for RateLimiter.
+    """
+    if path == "/api/v3/depth":
+        limit = int(params.get("limit", 100))
+        weight = next(
+            (weight for max_limit, weight in DEPTH_WEIGHTS if limit <= max_limit),
+            DEPTH_WEIGHTS[-1][1],
+        )
+    elif path == "/api/v3/ticker/price" and "symbol" not in params:
+        weight = 4
+    elif path == "/api/v3/order" and method == "POST":
+        return {RateLimit.WEIGHT: 1, RateLimit.ORDER: 1}
+    else:
+        weight = ENDPOINT_WEIGHTS.get(path, 1)
+
+    if path.startswith("/sapi/"):
+        return {RateLimit.SAPI_WEIGHT: weight}
+    return {RateLimit.WEIGHT: weight}
+
+
+def create_rate_limiter():
+    buckets = {
+        RateLimit.WEIGHT: TokenBucket(
+            RateLimit.REQUEST_WEIGHT, RateLimit.WEIGHT_INTERVAL
+        ),
+        RateLimit.SAPI_WEIGHT: TokenBucket(
+            RateLimit.SAPI_REQUEST_WEIGHT, RateLimit.WEIGHT_INTERVAL
+        ),
+        RateLimit.ORDER: TokenBucket(RateLimit.ORDERS, RateLimit.ORDER_INTERVAL),
+    }
+    return RateLimiter(buckets, request_cost, RateLimit.USED_HEADERS)
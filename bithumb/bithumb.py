@@ -2,11 +2,10 @@ import re
 import hmac
 import base64
 import time
-import requests
 import hashlib
 import json
-import aiohttp
 import asyncio
+import logging
 
 from lxml import html as lh
 from decimal import Decimal, ROUND_DOWN
@@ -14,9 +13,11 @@ from urllib.parse import urlencode
 
 from Exchanges.bithumb.setting import Urls, AVAILABLE_COINS
 
-from Exchanges.settings import Consts
+from Exchanges.settings import Consts, SessionConsts
 from Exchanges.messages import WarningMessage as WarningMsg
-from Exchanges.objects import ExchangeResult, DataStore
+from Exchanges.objects import ExchangeResult
+from Exchanges.sessions import create_session, AsyncSessionManager
+from Exchanges.fetchers import fetch_concurrently
 
 
 class RequestError(Exception):
@@ -42,10 +43,41 @@ class RequestError(Exception):
 
 class BaseBithumb(object):
     name = "Bithumb"
-
-    def __init__(self, key, secret):
+    base_logger = logging
+    request_concurrency = SessionConsts.CONCURRENCY
+
+    def __init__(
+        self,
+        key,
+        secret,
+        pool_size=SessionConsts.POOL_SIZE,
+        max_retries=SessionConsts.MAX_RETRIES,
+        timeout=SessionConsts.TIMEOUT,
+        base_url=Urls.BASE,
+    ):
+        """
+        base_url: REST endpoint, a local mock server in load tests
+        """
+        self.base_url = base_url
         self._key = key
         self._secret = secret
+        self._session = create_session(pool_size, max_retries)
+        self._async_session = AsyncSessionManager(timeout=timeout)
+        self._timeout = timeout
+
+    def close(self):
+        self._session.close()
+
+    async def aclose(self):
+        await self._async_session.close()
+        self.close()
+
+    async def __aenter__(self):
+        await self._async_session.get()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
 
     def _sign_generator(self, *args):
         extra, data, path, nonce = args
@@ -61,7 +93,7 @@ class BaseBithumb(object):
     def _public_api(self, path, extra=None):
         try:
             extra = dict() if extra is None else urlencode(extra)
-            rq = requests.get(Urls.BASE + path, data=extra)
+            rq = self._session.get(self.base_url + path, data=extra, timeout=self._timeout)
             response = rq.json()
             status = response.get("status")
 
@@ -74,7 +106,7 @@ class BaseBithumb(object):
                 return ExchangeResult(False, message=message, wait_time=1)
 
         except:
-            debugger.exception("FATAL: Bithumb, _public_api")
+            logging.exception("FATAL: Bithumb, _public_api")
             return ExchangeResult(
                 False,
                 message=WarningMsg.EXCEPTION_RAISED.format(name=self.name),
@@ -98,7 +130,9 @@ class BaseBithumb(object):
                 "Api-Nonce": nonce,
             }
 
-            rq = requests.post(Urls.BASE + path, headers=headers, data=extra)
+            rq = self._session.post(
+                self.base_url + path, headers=headers, data=extra, timeout=self._timeout
+            )
 
             response = rq.json()
 
@@ -113,7 +147,7 @@ class BaseBithumb(object):
                 return ExchangeResult(False, message=message, wait_time=1)
 
         except:
-            debugger.exception("FATAL: Bithumb, _private_api")
+            logging.exception("FATAL: Bithumb, _private_api")
             return ExchangeResult(
                 False,
                 message=WarningMsg.EXCEPTION_RAISED.format(name=self.name),
@@ -260,28 +294,27 @@ class BaseBithumb(object):
             "Api-Nonce": nonce,
         }
 
-        async with aiohttp.ClientSession(headers=header) as session:
-            try:
-                rq = await session.post(Urls.BASE + path, data=data)
-
+        session = await self._async_session.get()
+        try:
+            async with session.post(self.base_url + path, data=data, headers=header) as rq:
                 response = json.loads(await rq.text())
 
-                status = response.get("status")
+            status = response.get("status")
 
-                if status and status == "0000":
-                    return ExchangeResult(True, response)
-                else:
-                    message = response.get(
-                        "message", WarningMsg.MESSAGE_NOT_FOUND.format(name=self.name)
-                    )
-                    return ExchangeResult(False, message=message, wait_time=1)
-            except:
-                debugger.exception("FATAL: Bithumb, _async_private_api")
-                return ExchangeResult(
-                    False,
-                    message=WarningMsg.EXCEPTION_RAISED.format(name=self.name),
-                    wait_time=1,
+            if status and status == "0000":
+                return ExchangeResult(True, response)
+            else:
+                message = response.get(
+                    "message", WarningMsg.MESSAGE_NOT_FOUND.format(name=self.name)
                 )
+                return ExchangeResult(False, message=message, wait_time=1)
+        except:
+            logging.exception("FATAL: Bithumb, _async_private_api")
+            return ExchangeResult(
+                False,
+                message=WarningMsg.EXCEPTION_RAISED.format(name=self.name),
+                wait_time=1,
+            )
 
     async def _get_deposit_addrs(self, currency):
         for _ in range(3):
@@ -291,7 +324,7 @@ class BaseBithumb(object):
 
             if result_object.success:
                 break
-            time.sleep(result_object.wait_time)
+            await asyncio.sleep(result_object.wait_time)
 
         return result_object
 
@@ -301,7 +334,7 @@ class BaseBithumb(object):
             if result_object.success:
                 break
 
-            time.sleep(result_object.wait_time)
+            await asyncio.sleep(result_object.wait_time)
 
         return result_object
 
@@ -313,7 +346,7 @@ class BaseBithumb(object):
             if result_object.success:
                 break
 
-            time.sleep(result_object.wait_time)
+            await asyncio.sleep(result_object.wait_time)
 
         return result_object
 
@@ -325,7 +358,7 @@ class BaseBithumb(object):
             if result_object.success:
                 break
 
-            time.sleep(result_object.wait_time)
+            await asyncio.sleep(result_object.wait_time)
 
         return result_object
 
@@ -354,7 +387,7 @@ class BaseBithumb(object):
     async def get_transaction_fee(self):
         # 현철이 레거시
         try:
-            ret = requests.get(Urls.PAGE_BASE + Urls.TRANSACTION_FEE, timeout=60)
+            ret = self._session.get(Urls.PAGE_BASE + Urls.TRANSACTION_FEE, timeout=60)
             #   API 사용이 아니다.
             doc = lh.fromstring(ret.text)
             tags = doc.cssselect("table.g_tb_normal.fee_in_out tr")
@@ -384,7 +417,7 @@ class BaseBithumb(object):
             else:
                 return ExchangeResult(True, ret_data)
         except:
-            debugger.exception("FATAL: Bithumb, get_transaction_fee")
+            logging.exception("FATAL: Bithumb, get_transaction_fee")
             return ExchangeResult(
                 False,
                 message=WarningMsg.EXCEPTION_RAISED.format(name=self.name),
@@ -392,30 +425,31 @@ class BaseBithumb(object):
             )
 
     async def get_deposit_addrs(self, coin_list=None):
-        ret_data = dict()
-        failed_log = str()
-        for currency in AVAILABLE_COINS:
-            # todo test시 결과 값 보고 수정처리 필요.
-            currency = currency[4:]
-
-            deposit_result_object = await self._get_deposit_addrs(currency)
-            if deposit_result_object.success:
-                data = deposit_result_object.data
-                if currency in ["XRP", "XMR"]:
-                    try:
-                        address, tag = data["data"]["wallet_address"].split("&dt=")
-                        ret_data[currency + "TAG"] = tag
-                        ret_data[currency] = address
-                    except ValueError:
-                        ret_data[currency] = str()
-                        ret_data[currency + "TAG"] = str()
-                else:
-                    ret_data[currency] = data["data"]["wallet_address"]
+        # todo test시 결과 값 보고 수정처리 필요.
+        currencies = [currency[4:] for currency in AVAILABLE_COINS]
+        report = await fetch_concurrently(
+            self._get_deposit_addrs,
+            currencies,
+            self.request_concurrency,
+            name=self.name,
+            logger=self.base_logger,
+        )
 
+        ret_data = dict()
+        for currency, deposit_result_object in report.results.items():
+            data = deposit_result_object.data
+            if currency in ["XRP", "XMR"]:
+                try:
+                    address, tag = data["data"]["wallet_address"].split("&dt=")
+                    ret_data[currency + "TAG"] = tag
+                    ret_data[currency] = address
+                except ValueError:
+                    ret_data[currency] = str()
+                    ret_data[currency + "TAG"] = str()
             else:
-                failed_log += "[{}], {} \n".format(
-                    currency, deposit_result_object.message
-                )
+                ret_data[currency] = data["data"]["wallet_address"]
+
+        failed_log = report.failed_message()
         return ExchangeResult(True, ret_data, failed_log, 0)
 
     async def get_curr_avg_orderbook(self, currencies, default_btc=1):
@@ -430,15 +464,15 @@ class BaseBithumb(object):
             total_price = Decimal(0.0)
             total_amount = Decimal(0.0)
             for row in rows:
-                total_price += Decimal(row["price"]) * Decimal(row["quantity"])
-                total_amount += Decimal(row["quantity"])
+                quantity = Decimal(row["quantity"])
+                total_price += Decimal(row["price"]) * quantity
+                total_amount += quantity
 
                 if total_amount >= default_btc:
                     break
 
-            btc_average[order_type] = (total_price / total_amount).quantize(
-                Decimal(10) ** -8
-            )
+            # not quantized, krw prices of btc have more digits than the precision.
+            btc_average[order_type] = total_price / total_amount
 
         del data["BTC"]
 
@@ -452,20 +486,14 @@ class BaseBithumb(object):
                 rows = data[c][order_type]
                 total_price = Decimal(0.0)
                 total_amount = Decimal(0.0)
+                # bids are converted by btc asks, asks are converted by btc bids.
+                btc_price = btc_average[
+                    Consts.ASKS if order_type == Consts.BIDS else Consts.BIDS
+                ]
                 for row in rows:
-                    if order_type == Consts.BIDS:
-                        total_price += (
-                            Decimal(row["price"])
-                            / btc_average[Consts.ASKS]
-                            * Decimal(row["quantity"])
-                        )
-                    else:
-                        total_price += (
-                            Decimal(row["price"])
-                            / btc_average[Consts.BIDS]
-                            * Decimal(row["quantity"])
-                        )
-                    total_amount += Decimal(row["quantity"])
+                    quantity = Decimal(row["quantity"])
+                    total_price += Decimal(row["price"]) / btc_price * quantity
+                    total_amount += quantity
 
                     if total_price >= default_btc:
                         break
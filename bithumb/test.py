@@ -1,64 +1,76 @@
 import unittest
 from Exchanges.bithumb import bithumb
+from Exchanges.bithumb.setting import Urls
+from Exchanges.settings import Consts
+from Exchanges.mockserver import MockExchangeServer
 import asyncio
-import time
 
 
 class TestNotification(unittest.TestCase):
     symbol_set = ["BTC_ETH", "BTC_XRP"]
-    symbol = "BTC_ETH"
+    symbol = "XRP"
 
     @classmethod
     def setUpClass(cls):
-        cls.exchange = bithumb.BaseBithumb("", "")
+        cls.server = MockExchangeServer(port=0).start_in_thread()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop_thread()
+
+    def setUp(self):
+        self.exchange = bithumb.BaseBithumb(
+            "key", "secret", base_url=self.server.base_url
+        )
+        # the async session is closed in the loop it was created in.
+        self.loop = asyncio.new_event_loop()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def tearDown(self):
+        self.run_async(self.exchange.aclose())
+        self.loop.close()
 
     def test_get_available_coin(self):
         result = self.exchange.get_available_coin()
         self.assertTrue(result.success)
         self.assertIn("BTC_XRP", result.data)
-        print(result.data)
 
-    def test_get_orderbook(self):
-        loop = asyncio.get_event_loop()
-        result = loop.run_until_complete(
-            self.exchange.get_curr_avg_orderbook(self.symbol_set)
+    def test_private_api_post(self):
+        result = self.exchange._private_api(
+            Consts.POST, Urls.BALANCE, {"currency": "ALL"}
         )
-        self.assertTrue(result.success)
-        print(result.data)
-        self.assertEqual(len(result.data["timestamp"]), 199)
+        self.assertTrue(result.success, result.message)
+
+    def test_get_orderbook(self):
+        result = self.run_async(self.exchange.get_curr_avg_orderbook(self.symbol_set))
+        self.assertTrue(result.success, result.message)
+        self.assertIn("BTC_XRP", result.data)
+        self.assertGreater(result.data["BTC_XRP"][Consts.BIDS], 0)
 
     def test_get_deposit_addrs(self):
-        loop = asyncio.get_event_loop()
-        result = loop.run_until_complete(self.exchange.get_deposit_addrs())
+        with self.assertLogs(level="DEBUG") as logs:
+            result = self.run_async(self.exchange.get_deposit_addrs())
         self.assertTrue(result.success)
-        self.assertIn("BTC", result.data)
-        print(result.data)
+        self.assertIn("ETH", result.data)
+        # a latency of each currency
+        self.assertTrue(any("_get_deposit_addrs" in line for line in logs.output))
 
+    @unittest.skip("scrapes the fee page of the website, not served by the mock")
     def test_get_transaction_fee(self):
-        loop = asyncio.get_event_loop()
-        result = loop.run_until_complete(self.exchange.get_transaction_fee())
+        result = self.run_async(self.exchange.get_transaction_fee())
         self.assertTrue(result.success)
         self.assertIn("BTC", result.data)
-        print(result.data)
 
     def test_get_balance(self):
-        loop = asyncio.get_event_loop()
-        balance_result = loop.run_until_complete(self.exchange.get_balance())
+        balance_result = self.run_async(self.exchange.get_balance())
         self.assertTrue(balance_result.success)
         self.assertIn("BTC", balance_result.data)
-        print(balance_result.data)
 
     def test_market_trade(self):
         buy_result = self.exchange.buy(self.symbol, 5)
-        if buy_result.success:
-            print(buy_result.data)
-        else:
-            print(buy_result.message)
-        self.assertTrue(buy_result.success)
+        self.assertTrue(buy_result.success, buy_result.message)
 
         sell_result = self.exchange.sell(self.symbol, 5)
-        if sell_result.success:
-            print(sell_result.data)
-        else:
-            print(sell_result.message)
-        self.assertTrue(sell_result.success)
+        self.assertTrue(sell_result.success, sell_result.message)
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class TTLCache(object):
+    """
+    values which are fresh for ttl seconds, the least recently used key is evicted
+    when max_size keys are stored.
+
+    stale_ttl: seconds an expired value is still returned while refresh() fetches
+        it again in the background, stale-while-revalidate. 0 never returns it.
+    """
+
+    def __init__(self, ttl, stale_ttl=0, max_size=None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        # key: (value, stored time)
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        # the loop keeps only weak references of tasks, a running refresh is kept here.
+        self._tasks = set()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            if self.max_size is not None and len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key, refresh=None):
+        """
+        cached value of key, None when it is missing or expired.
+
+        refresh: function which fetches the value again and set()s it,
+            a coroutine function is scheduled on the running loop and
+            the others run in a daemon thread.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_time = entry
+            age = time.monotonic() - stored_time
+            if age <= self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+
+            if age > self.ttl + self.stale_ttl or refresh is None:
+                self.misses += 1
+                return None
+
+            self.stale_hits += 1
+            if key in self._refreshing:
+                return value
+            self._refreshing.add(key)
+            self.refreshes += 1
+
+        self._revalidate(key, refresh)
+        return value
+
+    def _refreshed(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def _revalidate(self, key, refresh):
+        if asyncio.iscoroutinefunction(refresh):
+
+            async def run():
+                try:
+                    await refresh()
+                finally:
+                    self._refreshed(key)
+
+            task = asyncio.get_running_loop().create_task(run())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+
+            def run():
+                try:
+                    refresh()
+                finally:
+                    self._refreshed(key)
+
+            threading.Thread(target=run, daemon=True).start()
+
+    def invalidate(self, key=None):
+        """
+        remove key, or every key when key is None.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            ages = [now - stored_time for _, stored_time in self._entries.values()]
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refreshes": self.refreshes,
+                "max_age": max(ages, default=0),
+            }
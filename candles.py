@@ -0,0 +1,186 @@
+from array import array
+from decimal import Context
+
+from Exchanges.settings import Consts
+
+
+INTERVAL_UNITS = {
+    "s": 1000,
+    "m": 60000,
+    "h": 3600000,
+    "d": 86400000,
+    "w": 604800000,
+}
+
+
+def interval_to_milliseconds(interval):
+    """
+    1s -> 1000, 4h -> 14400000
+    months have no fixed length, 1M raises ValueError like an unknown interval.
+    """
+    unit = INTERVAL_UNITS.get(interval[-1:])
+    if unit is None or not interval[:-1].isdigit():
+        raise ValueError(f"candle interval [{interval}] has no fixed length")
+    return int(interval[:-1]) * unit
+
+
+def validate_intervals(intervals, base_interval=Consts.CANDLE_BASE_INTERVAL):
+    """
+    raise ValueError if an interval can not be folded from base_interval candles.
+    """
+    base = interval_to_milliseconds(base_interval)
+    for interval in intervals:
+        if interval_to_milliseconds(interval) % base:
+            raise ValueError(
+                f"candle interval [{interval}] is not a multiple of [{base_interval}]"
+            )
+
+
+class CandleSeries(object):
+    """
+    fixed-capacity ring buffer of candles of a symbol.
+
+    each column keeps every value twice, at i and i + capacity, so the latest
+    candles are always one contiguous slice and column views are zero-copy.
+    the current bar is updated in place, a new open time rolls over to the next bar.
+
+    series["close"] -> memoryview of close prices from the oldest candle
+    prices and volume are float64, decimal_rows gives them back as Decimals.
+    """
+
+    COLUMNS = (
+        ("open", "d"),
+        ("high", "d"),
+        ("low", "d"),
+        ("close", "d"),
+        ("volume", "d"),
+        ("timestamp", "q"),
+    )
+
+    __slots__ = ("capacity", "_columns", "_end", "_size")
+
+    def __init__(self, capacity=Consts.CANDLE_LIMITATION):
+        self.capacity = capacity
+        self._columns = {
+            name: array(typecode, [0]) * (capacity * 2)
+            for name, typecode in self.COLUMNS
+        }
+        self._end = 0
+        self._size = 0
+
+    @classmethod
+    def from_columns(cls, columns, capacity=Consts.CANDLE_LIMITATION):
+        """
+        columns: arrays of each of COLUMNS from the oldest candle
+        """
+        series = cls(capacity)
+        size = min(len(columns[0]), capacity)
+        for (name, _), values in zip(cls.COLUMNS, columns):
+            values = values[len(values) - size:]
+            column = series._columns[name]
+            column[:size] = values
+            column[capacity:capacity + size] = values
+        series._end = size % capacity
+        series._size = size
+        return series
+
+    def copy(self):
+        series = CandleSeries.__new__(CandleSeries)
+        series.capacity = self.capacity
+        series._columns = {name: column[:] for name, column in self._columns.items()}
+        series._end = self._end
+        series._size = self._size
+        return series
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, name):
+        return self.column(name)
+
+    def __iter__(self):
+        columns = [self.column(name) for name, _ in self.COLUMNS]
+        return (list(row) for row in zip(*columns))
+
+    def decimal_rows(self):
+        """
+        rows with prices and volume as Decimal of their shortest repr, which is
+        the number the exchange sent when it has at most 15 significant digits.
+        """
+        create_decimal = Context(prec=15).create_decimal
+        return [
+            [create_decimal(repr(value)) for value in row[:-1]] + row[-1:]
+            for row in self
+        ]
+
+    @property
+    def last_timestamp(self):
+        if not self._size:
+            return None
+        return self._columns["timestamp"][(self._end - 1) % self.capacity]
+
+    def column(self, name):
+        start = (self._end - self._size) % self.capacity
+        return memoryview(self._columns[name])[start:start + self._size]
+
+    def last(self):
+        """
+        [open, high, low, close, volume, timestamp] of the current bar
+        """
+        if not self._size:
+            return None
+        index = (self._end - 1) % self.capacity
+        return [self._columns[name][index] for name, _ in self.COLUMNS]
+
+    def update(self, open_, high, low, close, volume, timestamp):
+        """
+        return False if the candle is older than the current bar.
+        """
+        timestamp = int(timestamp)
+        last_timestamp = self.last_timestamp
+
+        if last_timestamp is not None and timestamp < last_timestamp:
+            return False
+
+        if last_timestamp is not None and timestamp == last_timestamp:
+            index = (self._end - 1) % self.capacity
+        else:
+            index = self._end
+            self._end = (self._end + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+        values = (
+            float(open_),
+            float(high),
+            float(low),
+            float(close),
+            float(volume),
+            timestamp,
+        )
+        for (name, _), value in zip(self.COLUMNS, values):
+            column = self._columns[name]
+            column[index] = value
+            column[index + self.capacity] = value
+
+        return True
+
+    def fold(self, candle_list, interval_milliseconds):
+        """
+        merge a closed candle of a lower interval into the bar of this series.
+        candle_list: open, high, low, close, amount, timestamp
+        """
+        open_, high, low, close, volume, timestamp = candle_list
+        bar_timestamp = int(timestamp) - int(timestamp) % interval_milliseconds
+
+        if self.last_timestamp != bar_timestamp:
+            return self.update(open_, high, low, close, volume, bar_timestamp)
+
+        bar_open, bar_high, bar_low, _, bar_volume, _ = self.last()
+        return self.update(
+            bar_open,
+            max(bar_high, float(high)),
+            min(bar_low, float(low)),
+            close,
+            bar_volume + float(volume),
+            bar_timestamp,
+        )
@@ -0,0 +1,39 @@
+import json
+
+from Exchanges.settings import JsonDecoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def _available_loads():
+    loads_dict = dict()
+    if orjson is not None:
+        loads_dict[JsonDecoder.ORJSON] = orjson.loads
+    if ujson is not None:
+        loads_dict[JsonDecoder.UJSON] = ujson.loads
+    loads_dict[JsonDecoder.JSON] = json.loads
+    return loads_dict
+
+
+AVAILABLE_LOADS = _available_loads()
+
+
+def get_loads(decoder=JsonDecoder.AUTO):
+    """
+    loads(str or bytes) of decoder, every decoder raises ValueError on invalid json.
+    AUTO falls back to stdlib json when no faster decoder is installed.
+    """
+    if decoder == JsonDecoder.AUTO:
+        return next(iter(AVAILABLE_LOADS.values()))
+
+    if decoder not in AVAILABLE_LOADS:
+        raise ValueError(f"json decoder [{decoder}] is not installed")
+    return AVAILABLE_LOADS[decoder]
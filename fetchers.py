@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+from Exchanges.messages import DebugMessage, WarningMessage
+from Exchanges.objects import ExchangeResult
+
+
+class FetchReport(object):
+    """
+    result of fetch_concurrently.
+
+    results: {key: ExchangeResult} of succeeded keys
+    failures: {key: ExchangeResult} of failed keys
+    latencies: {key: seconds}
+    """
+
+    def __init__(self):
+        self.results = dict()
+        self.failures = dict()
+        self.latencies = dict()
+
+    def failed_message(self):
+        message = str()
+        for key, result_object in self.failures.items():
+            message += WarningMessage.KEY_FAILED.format(
+                key=key, message=result_object.message, latency=self.latencies[key]
+            )
+        return message
+
+
+async def fetch_concurrently(fetch, keys, limit, name=str(), logger=None):
+    """
+    fan out fetch(key) for each key, at most limit requests are in flight.
+    an exception of a key is stored as a failure and does not cancel others.
+
+    fetch: coroutine function which returns ExchangeResult
+    limit: semaphore size, follows the rate limit of the exchange
+    """
+    semaphore = asyncio.Semaphore(limit)
+    report = FetchReport()
+
+    async def _fetch(key):
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                result_object = await fetch(key)
+            except Exception as ex:
+                result_object = ExchangeResult(False, message=str(ex), wait_time=1)
+            latency = time.monotonic() - start
+
+        report.latencies[key] = latency
+        if result_object.success:
+            report.results[key] = result_object
+        else:
+            report.failures[key] = result_object
+
+        if logger is not None:
+            logger.debug(
+                DebugMessage.LATENCY.format(
+                    name=name,
+                    fn=getattr(fetch, "__name__", "fetch"),
+                    key=key,
+                    latency=latency,
+                )
+            )
+
+    await asyncio.gather(*[_fetch(key) for key in keys])
+
+    return report
@@ -0,0 +1,362 @@
+"""
+local market data server, one process owns the subscribers of an exchange
+and strategy processes on the host read from it through a unix domain socket.
+
+python -m Exchanges.marketdata binance [--path PATH]
+    [--orderbook BTC_XRP,BTC_ETH] [--candle BTC_XRP] [--intervals 1m,5m]
+
+protocol: a json request and a json response per line.
+    {"op": "subscribe", "orderbook": [sai_symbol, ..], "candle": [..],
+        "intervals": [..]}
+    {"op": "orderbooks", "versions": {sai_symbol: version}}
+        -> {"orderbooks": {sai_symbol: [version, bids, asks]},
+            "diffs": {sai_symbol: [version, bid changes, ask changes]}}
+        only newer versions. a book is sent as changed levels when the client has
+        the version last sent on the connection, amount "0" removes a level.
+    {"op": "candle", "symbol": sai_symbol, "interval": interval, "since": timestamp}
+        -> {"candle": [[open, high, low, close, volume, timestamp], ..]}, since on
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import socket
+import threading
+
+from decimal import Context
+
+from Exchanges.settings import Consts
+from Exchanges.objects import DataStore
+from Exchanges.orderbooks import CompactOrderbook
+from Exchanges.candles import CandleSeries
+
+
+EXCHANGES = {
+    "binance": "Exchanges.binance.binance.Binance",
+}
+
+
+def _dump_levels(levels):
+    return [[str(price), str(amount)] for price, amount in levels]
+
+
+def _diff_levels(previous, levels):
+    """
+    previous: {price: amount} of the version the client has
+    levels: [[price, amount], ..] of the current version
+    return: changed and added levels, then removed ones with amount "0"
+    """
+    current = dict(levels)
+    changes = [
+        [price, amount] for price, amount in levels if previous.get(price) != amount
+    ]
+    changes.extend([price, "0"] for price in previous if price not in current)
+    return changes
+
+
+class MarketDataServer(object):
+    """
+    serves orderbooks and candles of exchange, subscribed on demand of clients.
+    orderbooks are sent only when their version is newer than the client's one,
+    as changed levels when the client has the version last sent on its connection,
+    candles only from the timestamp the client has.
+    """
+
+    def __init__(self, exchange, path=Consts.MARKET_DATA_SOCKET_PATH):
+        self.exchange = exchange
+        self.path = path
+
+        self._subscribe_lock = threading.Lock()
+        self._orderbook_symbol_set = set()
+        self._candle_symbol_set = set()
+        self._intervals = set()
+
+    async def serve_forever(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self._handle, path=self.path)
+        logging.debug(
+            f"MarketDataServer::: serve [{self.exchange.name}], [{self.path}]"
+        )
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        # {sai_symbol: (version, bids, asks)} last sent on this connection
+        sent = dict()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if request.get("op") == "subscribe":
+                        # subscribing may wait for a new connection to be opened.
+                        response = await loop.run_in_executor(
+                            None, self.subscribe, request
+                        )
+                    else:
+                        response = self.respond(request, sent)
+                except Exception as ex:
+                    response = {"error": str(ex)}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def subscribe(self, request):
+        with self._subscribe_lock:
+            orderbook_symbols = set(request.get("orderbook", list()))
+            if orderbook_symbols - self._orderbook_symbol_set:
+                self._orderbook_symbol_set |= orderbook_symbols
+                self.exchange.set_subscribe_orderbook(
+                    sorted(self._orderbook_symbol_set)
+                )
+
+            candle_symbols = set(request.get("candle", list()))
+            intervals = set(request.get("intervals", Consts.CANDLE_INTERVALS))
+            if candle_symbols - self._candle_symbol_set or intervals - self._intervals:
+                self._candle_symbol_set |= candle_symbols
+                self._intervals |= intervals
+                if self._candle_symbol_set:
+                    self.exchange.set_subscribe_candle(
+                        sorted(self._candle_symbol_set), sorted(self._intervals)
+                    )
+        return {"success": True}
+
+    def respond(self, request, sent=None):
+        """
+        sent: {sai_symbol: (version, bids, asks)} of the connection, orderbooks are
+            sent whole without it.
+        """
+        op = request.get("op")
+        data_store = self.exchange.data_store
+        if op == "orderbooks":
+            versions = request.get("versions", dict())
+            orderbooks, diffs = dict(), dict()
+            for sai_symbol, (version, orderbook) in list(
+                data_store.orderbook_entries.items()
+            ):
+                client_version = versions.get(sai_symbol)
+                if client_version == version:
+                    continue
+                bids = _dump_levels(orderbook[Consts.BIDS])
+                asks = _dump_levels(orderbook[Consts.ASKS])
+                previous = None if sent is None else sent.get(sai_symbol)
+                if previous is not None and previous[0] == client_version:
+                    diffs[sai_symbol] = [
+                        version,
+                        _diff_levels(previous[1], bids),
+                        _diff_levels(previous[2], asks),
+                    ]
+                else:
+                    orderbooks[sai_symbol] = [version, bids, asks]
+                if sent is not None:
+                    sent[sai_symbol] = (version, dict(bids), dict(asks))
+            return {"orderbooks": orderbooks, "diffs": diffs}
+
+        elif op == "candle":
+            # receivers keep updating the stored series, it is copied under the lock.
+            result = self.exchange.get_candle_series(
+                request["symbol"], request["interval"]
+            )
+            if not result.success:
+                return {"candle": list()}
+            since = request.get("since")
+            return {
+                "candle": [
+                    row for row in result.data if since is None or row[-1] >= since
+                ]
+            }
+
+        return {"error": f"unknown op [{op}]"}
+
+
+class MarketDataClient(object):
+    """
+    blocking client of MarketDataServer, a request at a time.
+    """
+
+    def __init__(self, path=Consts.MARKET_DATA_SOCKET_PATH, timeout=5):
+        self.path = path
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._sock = None
+        self._file = None
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        self._sock, self._file = sock, sock.makefile("rb")
+
+    def request(self, op, **params):
+        """
+        response of the server, raises OSError if the server is not reachable.
+        """
+        params["op"] = op
+        message = json.dumps(params).encode() + b"\n"
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                self._sock.sendall(message)
+                line = self._file.readline()
+                if not line:
+                    raise ConnectionError("market data server closed the connection")
+            except OSError:
+                self.close()
+                raise
+        return json.loads(line)
+
+    def close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+        self._sock, self._file = None, None
+
+
+class RemoteDataStore(DataStore):
+    """
+    DataStore filled from a MarketDataServer instead of a subscriber,
+    BaseExchange(data_store=RemoteDataStore(path)) reads market data transparently.
+    """
+
+    def __init__(
+        self,
+        path=Consts.MARKET_DATA_SOCKET_PATH,
+        compact_orderbook=False,
+        timeout=5,
+    ):
+        super(RemoteDataStore, self).__init__(compact_orderbook)
+        self.client = MarketDataClient(path, timeout)
+        self._context = Context(prec=8)
+        # {sai_symbol: (bids, asks)} as {price: amount} strings, diffs apply to them.
+        self._levels = dict()
+
+    def subscribe(
+        self,
+        orderbook_sai_symbol_list=(),
+        candle_sai_symbol_list=(),
+        intervals=Consts.CANDLE_INTERVALS,
+    ):
+        return self.client.request(
+            "subscribe",
+            orderbook=list(orderbook_sai_symbol_list),
+            candle=list(candle_sai_symbol_list),
+            intervals=list(intervals),
+        )
+
+    def _load_levels(self, levels, descending):
+        create_decimal = self._context.create_decimal
+        return sorted(
+            (
+                [create_decimal(price), create_decimal(amount)]
+                for price, amount in levels.items()
+            ),
+            key=lambda level: level[0],
+            reverse=descending,
+        )
+
+    def _apply_changes(self, levels, changes):
+        for price, amount in changes:
+            if amount == "0":
+                levels.pop(price, None)
+            else:
+                levels[price] = amount
+
+    def sync_orderbooks(self):
+        versions = {
+            sai_symbol: version
+            for sai_symbol, (version, _) in self.orderbook_entries.items()
+        }
+        try:
+            response = self.client.request("orderbooks", versions=versions)
+        except OSError as ex:
+            logging.debug(f"RemoteDataStore::: sync_orderbooks error, [{ex}]")
+            return
+
+        updates = dict()
+        for sai_symbol, (version, bids, asks) in response["orderbooks"].items():
+            self._levels[sai_symbol] = (dict(bids), dict(asks))
+            updates[sai_symbol] = version
+        for sai_symbol, (version, bid_changes, ask_changes) in response.get(
+            "diffs", dict()
+        ).items():
+            bids, asks = self._levels[sai_symbol]
+            self._apply_changes(bids, bid_changes)
+            self._apply_changes(asks, ask_changes)
+            updates[sai_symbol] = version
+
+        for sai_symbol, version in updates.items():
+            bids, asks = self._levels[sai_symbol]
+            bids = self._load_levels(bids, descending=True)
+            asks = self._load_levels(asks, descending=False)
+            if self.compact_orderbook:
+                orderbook = CompactOrderbook.from_levels(bids, asks)
+            else:
+                orderbook = {Consts.BIDS: bids, Consts.ASKS: asks}
+            self.orderbook_entries[sai_symbol] = (version, orderbook)
+            self.orderbook_queue[sai_symbol] = orderbook
+            self.orderbook_averages.mark_dirty(sai_symbol)
+
+    def sync_candle(self, sai_symbol, interval):
+        key = (sai_symbol, interval)
+        series = self.candle_queue.get(key)
+        since = series.last_timestamp if series is not None else None
+        try:
+            response = self.client.request(
+                "candle", symbol=sai_symbol, interval=interval, since=since
+            )
+        except OSError as ex:
+            logging.debug(f"RemoteDataStore::: sync_candle error, [{ex}]")
+            return
+
+        if not response["candle"]:
+            return
+        if series is None:
+            series = CandleSeries()
+        for candle_list in response["candle"]:
+            series.update(*candle_list)
+        self.candle_queue[key] = series
+
+
+def _split(value):
+    return [item for item in value.split(",") if item] if value else list()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("exchange", choices=sorted(EXCHANGES))
+    parser.add_argument("--path", default=Consts.MARKET_DATA_SOCKET_PATH)
+    parser.add_argument("--orderbook", default="", help="BTC_XRP,BTC_ETH")
+    parser.add_argument("--candle", default="", help="BTC_XRP,BTC_ETH")
+    parser.add_argument("--intervals", default=",".join(Consts.CANDLE_INTERVALS))
+    args = parser.parse_args(argv)
+
+    module_name, class_name = EXCHANGES[args.exchange].rsplit(".", 1)
+    exchange_class = getattr(importlib.import_module(module_name), class_name)
+    # only public streams are served, no keys are needed.
+    exchange = exchange_class(str(), str())
+    # markets and the symbol index of the exchange, from public endpoints.
+    exchange.setup(public_only=True)
+    exchange.set_subscriber()
+
+    server = MarketDataServer(exchange, args.path)
+    server.subscribe(
+        {
+            "orderbook": _split(args.orderbook),
+            "candle": _split(args.candle),
+            "intervals": _split(args.intervals),
+        }
+    )
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,8 @@ class WarningMessage(object):
     HAS_NO_WITHDRAW_ID = "[{name}] 데이터에 해당 출금 ID가 존재하지 않습니다. = [{withdrawal_id}]"
 
     FUNCTION_FAILED = "[{name}][{function_name}]함수 값을 가져오는데 실패했습니다."
+    NOT_SUPPORTED = "[{name}][{function_name}]함수를 지원하지 않는 거래소입니다."
+    KEY_FAILED = "[{key}]해당 값을 가져오는데 실패했습니다. [{message}], [{latency:.3f}s]\n"
 
 
 class CriticalMessage(object):
@@ -33,4 +35,5 @@ class CriticalMessage(object):
 
 class DebugMessage(object):
     ENTRANCE = "{name}, fn={fn}, data={data}"
+    LATENCY = "{name}, fn={fn}, key={key}, latency={latency:.3f}s"
     FATAL = "FATAL, {name}, fn={fn}"
@@ -0,0 +1,811 @@
+"""
+offline stand-in of the Binance, Bithumb and Upbit endpoints used by this package,
+for load tests and benchmarks of request pipelines without keys or network.
+
+python -m Exchanges.mockserver [--port PORT] [--latency SECONDS]
+    [--error-rate RATE] [--rate-limit WEIGHT] [--messages-per-second N]
+
+    Binance(key, secret, base_url=server.base_url, websocket_url=server.websocket_url)
+    Bithumb(key, secret, base_url=server.base_url)
+    Upbit(key, secret, base_url=server.upbit_url)
+
+latency, error and rate limit are injected into every REST request,
+a rate limited request gets 429 with Retry-After like Binance.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+import uuid
+
+from urllib.parse import parse_qsl
+
+from aiohttp import web, WSCloseCode, WSMsgType
+
+
+DEFAULT_PAIRS = (
+    ("BTC", "XRP"),
+    ("BTC", "ETH"),
+    ("BTC", "LTC"),
+    ("BTC", "TRX"),
+    ("USDT", "BTC"),
+    ("KRW", "BTC"),
+    ("KRW", "XRP"),
+)
+
+# weight of each Binance path, the others weigh 1.
+BINANCE_WEIGHTS = {
+    "/api/v3/exchangeInfo": 10,
+    "/api/v3/depth": 10,
+    "/api/v3/account": 10,
+    "/sapi/v1/capital/config/getall": 10,
+}
+
+
+def _millisecond():
+    return int(time.time() * 1000)
+
+
+def _number(value):
+    return "{:.8f}".format(value)
+
+
+class MockMarket(object):
+    """
+    order book of a pair with a random walk, each step is a diff-depth event
+    and lastUpdateId of a snapshot is continued by the next event.
+    rng: random.Random of the server, the global random module is not touched
+    """
+
+    def __init__(self, market, coin, price, rng, depth=50):
+        self.market = market
+        self.coin = coin
+        self.price = price
+        self.update_id = 1
+        self.bids = dict()
+        self.asks = dict()
+        self.candle = None
+        self._random = rng
+
+        tick = price * 0.0005
+        for level in range(1, depth + 1):
+            self.bids[round(price - tick * level, 8)] = round(rng.uniform(1, 100), 4)
+            self.asks[round(price + tick * level, 8)] = round(rng.uniform(1, 100), 4)
+
+    @property
+    def binance_symbol(self):
+        return f"{self.coin}{self.market}"
+
+    def levels(self, limit=100):
+        bids = sorted(self.bids.items(), reverse=True)[:limit]
+        asks = sorted(self.asks.items())[:limit]
+        return bids, asks
+
+    def step(self):
+        """
+        return (bid changes, ask changes) of the step, amount 0 is a removed level.
+        """
+        self.price *= 1 + self._random.uniform(-0.0005, 0.0005)
+        self.update_id += 1
+
+        bid_changes, ask_changes = list(), list()
+        sides = [(self.bids, bid_changes, -1), (self.asks, ask_changes, 1)]
+        for book, changes, sign in sides:
+            change = sign * self._random.uniform(0.0001, 0.02)
+            price = round(self.price * (1 + change), 8)
+            if price in book and self._random.random() < 0.3:
+                del book[price]
+                changes.append([_number(price), _number(0)])
+            else:
+                book[price] = round(self._random.uniform(1, 100), 4)
+                changes.append([_number(price), _number(book[price])])
+
+        # levels crossed by the price are removed.
+        for price in [price for price in self.bids if price >= self.price]:
+            del self.bids[price]
+            bid_changes.append([_number(price), _number(0)])
+        for price in [price for price in self.asks if price <= self.price]:
+            del self.asks[price]
+            ask_changes.append([_number(price), _number(0)])
+
+        return bid_changes, ask_changes
+
+    def update_candle(self, now):
+        open_time = now - now % 60000
+        if self.candle is None or self.candle["t"] != open_time:
+            closed = self.candle
+            self.candle = {
+                "t": open_time,
+                "o": self.price,
+                "h": self.price,
+                "l": self.price,
+                "c": self.price,
+                "v": 0.0,
+            }
+        else:
+            closed = None
+        self.candle["h"] = max(self.candle["h"], self.price)
+        self.candle["l"] = min(self.candle["l"], self.price)
+        self.candle["c"] = self.price
+        self.candle["v"] += self._random.uniform(0, 10)
+        return closed
+
+
+class MockExchangeServer(object):
+    """
+    latency: seconds added to each REST response
+    error_rate: probability of an injected 500 response
+    rate_limit: weight allowed per rate_limit_window seconds, 0 is unlimited
+    messages_per_second: depth and kline events of each subscribed pair
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=18766,
+        latency=0.0,
+        error_rate=0.0,
+        rate_limit=0,
+        rate_limit_window=60,
+        messages_per_second=10,
+        pairs=DEFAULT_PAIRS,
+        seed=0,
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.messages_per_second = messages_per_second
+
+        self._random = random.Random(seed)
+        self.markets = dict()
+        for market, coin in pairs:
+            price = 50000.0 if coin == "BTC" else self._random.uniform(0.00001, 0.1)
+            if market == "KRW":
+                price *= 50000000 if coin != "BTC" else 1200
+            self.markets[(market, coin)] = MockMarket(market, coin, price, self._random)
+        self._binance_markets = {
+            market.binance_symbol: market for market in self.markets.values()
+        }
+
+        self.stats = dict(requests=0, errors=0, rate_limited=0, messages=0)
+        self._window_start = time.time()
+        self._used_weight = 0
+        self._orders = dict()
+        self._withdrawals = list()
+        self._order_ids = itertools.count(1)
+        # websocket: set of streams subscribed on it
+        self._websockets = dict()
+
+        self._runner = None
+        self._loop = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def upbit_url(self):
+        return f"http://{self.host}:{self.port}/v1"
+
+    @property
+    def websocket_url(self):
+        return f"ws://{self.host}:{self.port}/ws"
+
+    def application(self):
+        app = web.Application(middlewares=[self._inject])
+        app.router.add_get("/ws", self._websocket)
+
+        app.router.add_get("/api/v3/ping", self._binance_ping)
+        app.router.add_get("/api/v3/time", self._binance_time)
+        app.router.add_get("/api/v3/exchangeInfo", self._binance_exchange_info)
+        app.router.add_get("/api/v3/ticker/price", self._binance_ticker)
+        app.router.add_get("/api/v3/depth", self._binance_depth)
+        app.router.add_get("/api/v3/account", self._binance_account)
+        app.router.add_get("/api/v3/order", self._binance_get_order)
+        app.router.add_post("/api/v3/order", self._binance_post_order)
+        app.router.add_get("/sapi/v1/capital/config/getall", self._binance_config)
+        app.router.add_get(
+            "/sapi/v1/capital/deposit/address", self._binance_deposit_address
+        )
+        app.router.add_get("/sapi/v1/capital/deposit/hisrec", self._binance_deposits)
+        app.router.add_post(
+            "/sapi/v1/capital/withdraw/apply", self._binance_withdraw
+        )
+        app.router.add_get(
+            "/sapi/v1/capital/withdraw/history", self._binance_withdrawals
+        )
+
+        app.router.add_get("/public/orderbook/{symbol}", self._bithumb_orderbook)
+        app.router.add_get("/public/ticker/{symbol}", self._bithumb_ticker)
+        for path in ["/trade/place", "/trade/market_buy", "/trade/market_sell"]:
+            app.router.add_post(path, self._bithumb_order)
+        app.router.add_post("/trade/btc_withdrawal", self._bithumb_success)
+        app.router.add_post("/info/balance", self._bithumb_balance)
+        app.router.add_post("/info/account", self._bithumb_account)
+        app.router.add_post("/info/wallet_address", self._bithumb_wallet_address)
+        app.router.add_post("/info/order_detail", self._bithumb_order_detail)
+
+        app.router.add_get("/v1/ticker", self._upbit_ticker)
+        app.router.add_get("/v1/market/all", self._upbit_markets)
+        app.router.add_post("/v1/orders", self._upbit_post_order)
+        app.router.add_get("/v1/order", self._upbit_get_order)
+        app.router.add_route("*", "/v1/accounts", self._upbit_accounts)
+        app.router.add_get("/v1/deposits", self._upbit_list)
+        app.router.add_get("/v1/withdraws", self._upbit_list)
+        app.router.add_post("/v1/withdraws/coin", self._upbit_withdraw)
+        app.router.add_get("/v1/deposits/coin_addresses", self._upbit_addresses)
+        app.router.add_get("/v1/withdraws/chance", self._upbit_withdraw_chance)
+
+        app.on_startup.append(self._start_broadcast)
+        app.on_shutdown.append(self._stop_broadcast)
+        return app
+
+    @web.middleware
+    async def _inject(self, request, handler):
+        if request.path == "/ws":
+            return await handler(request)
+
+        self.stats["requests"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        now = time.time()
+        if now - self._window_start >= self.rate_limit_window:
+            self._window_start, self._used_weight = now, 0
+        self._used_weight += BINANCE_WEIGHTS.get(request.path, 1)
+        headers = {"X-MBX-USED-WEIGHT-1M": str(self._used_weight)}
+
+        if self.rate_limit and self._used_weight > self.rate_limit:
+            self.stats["rate_limited"] += 1
+            retry_after = int(self.rate_limit_window - (now - self._window_start)) + 1
+            headers["Retry-After"] = str(retry_after)
+            return web.json_response(
+                {"code": -1003, "msg": "Too many requests.", "status": "5600",
+                 "message": "Too many requests."},
+                status=429,
+                headers=headers,
+            )
+
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return web.json_response(
+                {"code": -1000, "msg": "injected error", "status": "5900",
+                 "message": "injected error",
+                 "error": {"name": "server_error", "message": "injected error"}},
+                status=500,
+                headers=headers,
+            )
+
+        response = await handler(request)
+        response.headers.update(headers)
+        return response
+
+    async def _params(self, request):
+        params = dict(request.query)
+        if request.method == "POST":
+            # Binance orders send a urlencoded body without a content type.
+            params.update(parse_qsl(await request.text()))
+        if "query" in params:
+            # upbit requests send their parameters urlencoded in query.
+            params.update(parse_qsl(params.pop("query")))
+        return params
+
+    # websocket of Binance
+    async def _start_broadcast(self, app):
+        app["broadcast"] = asyncio.ensure_future(self._broadcast())
+
+    async def _stop_broadcast(self, app):
+        app["broadcast"].cancel()
+        # open websockets would hold the shutdown until they time out.
+        await self._close_websockets()
+
+    async def _close_websockets(self):
+        for ws in list(self._websockets):
+            await ws.close(code=WSCloseCode.GOING_AWAY)
+
+    async def _websocket(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._websockets[ws] = set()
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                data = json.loads(message.data)
+                streams = set(data.get("params", list()))
+                if data.get("method") == "SUBSCRIBE":
+                    self._websockets[ws] |= streams
+                elif data.get("method") == "UNSUBSCRIBE":
+                    self._websockets[ws] -= streams
+                await ws.send_str(json.dumps({"result": None, "id": data.get("id")}))
+        finally:
+            self._websockets.pop(ws, None)
+        return ws
+
+    async def _broadcast(self):
+        while True:
+            await asyncio.sleep(1 / self.messages_per_second)
+            subscribed = set()
+            for streams in list(self._websockets.values()):
+                subscribed |= streams
+            if not subscribed:
+                continue
+
+            now = _millisecond()
+            frames = dict()
+            for symbol, market in self._binance_markets.items():
+                depth_stream = f"{symbol.lower()}@depth"
+                kline_stream = f"{symbol.lower()}@kline_1m"
+                if depth_stream not in subscribed and kline_stream not in subscribed:
+                    continue
+                first_update_id = market.update_id + 1
+                bids, asks = market.step()
+                closed = market.update_candle(now)
+                frames[depth_stream] = [json.dumps({
+                    "e": "depthUpdate",
+                    "E": now,
+                    "s": symbol,
+                    "U": first_update_id,
+                    "u": market.update_id,
+                    "b": bids,
+                    "a": asks,
+                })]
+                frames[kline_stream] = [
+                    self._kline_frame(symbol, candle, now, is_closed)
+                    for candle, is_closed in [(closed, True), (market.candle, False)]
+                    if candle is not None
+                ]
+
+            for ws, streams in list(self._websockets.items()):
+                for stream in streams:
+                    for frame in frames.get(stream, list()):
+                        try:
+                            await ws.send_str(frame)
+                        except ConnectionError:
+                            break
+                        self.stats["messages"] += 1
+
+    def _kline_frame(self, symbol, candle, now, is_closed):
+        return json.dumps({
+            "e": "kline",
+            "E": now,
+            "s": symbol,
+            "k": {
+                "t": candle["t"],
+                "T": candle["t"] + 59999,
+                "s": symbol,
+                "i": "1m",
+                "o": _number(candle["o"]),
+                "c": _number(candle["c"]),
+                "h": _number(candle["h"]),
+                "l": _number(candle["l"]),
+                "v": _number(candle["v"]),
+                "x": is_closed,
+            },
+        })
+
+    # Binance
+    def _binance_error(self, code, msg, status=400):
+        return web.json_response({"code": code, "msg": msg}, status=status)
+
+    async def _binance_ping(self, request):
+        return web.json_response({})
+
+    async def _binance_time(self, request):
+        return web.json_response({"serverTime": _millisecond()})
+
+    async def _binance_exchange_info(self, request):
+        symbols = [
+            {
+                "symbol": symbol,
+                "status": "TRADING",
+                "baseAsset": market.coin,
+                "quoteAsset": market.market,
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "tickSize": "0.00000001"},
+                    {
+                        "filterType": "LOT_SIZE",
+                        "minQty": "0.00100000",
+                        "maxQty": "90000000.00000000",
+                        "stepSize": "0.00100000",
+                    },
+                    {"filterType": "MIN_NOTIONAL", "minNotional": "0.00010000"},
+                ],
+            }
+            for symbol, market in self._binance_markets.items()
+        ]
+        return web.json_response({"serverTime": _millisecond(), "symbols": symbols})
+
+    async def _binance_ticker(self, request):
+        symbol = request.query.get("symbol")
+        if symbol is None:
+            return web.json_response([
+                {"symbol": symbol, "price": _number(market.price)}
+                for symbol, market in self._binance_markets.items()
+            ])
+        market = self._binance_markets.get(symbol)
+        if market is None:
+            return self._binance_error(-1121, "Invalid symbol.")
+        return web.json_response({"symbol": symbol, "price": _number(market.price)})
+
+    async def _binance_depth(self, request):
+        market = self._binance_markets.get(request.query.get("symbol"))
+        if market is None:
+            return self._binance_error(-1121, "Invalid symbol.")
+        bids, asks = market.levels(int(request.query.get("limit", 100)))
+        return web.json_response({
+            "lastUpdateId": market.update_id,
+            "bids": [[_number(price), _number(amount)] for price, amount in bids],
+            "asks": [[_number(price), _number(amount)] for price, amount in asks],
+        })
+
+    async def _binance_account(self, request):
+        coins = {coin for pair in self.markets for coin in pair}
+        return web.json_response({
+            "balances": [
+                {"asset": coin, "free": _number(1000), "locked": _number(0)}
+                for coin in sorted(coins)
+            ]
+        })
+
+    async def _binance_post_order(self, request):
+        params = await self._params(request)
+        market = self._binance_markets.get(params.get("symbol"))
+        if market is None:
+            return self._binance_error(-1121, "Invalid symbol.")
+        quantity = float(params.get("quantity", 0))
+        price = float(params.get("price") or market.price)
+        side = str(params.get("side", "")).upper()
+        # every asset has a balance of 1000.
+        spent = price * quantity if side == "BUY" else quantity
+        if spent > 1000:
+            return self._binance_error(
+                -2010, "Account has insufficient balance for requested action."
+            )
+        order = {
+            "symbol": market.binance_symbol,
+            "orderId": next(self._order_ids),
+            "clientOrderId": uuid.uuid4().hex,
+            "transactTime": _millisecond(),
+            "price": _number(price),
+            "origQty": _number(quantity),
+            "executedQty": _number(quantity),
+            "cummulativeQuoteQty": _number(price * quantity),
+            "status": "FILLED",
+            "type": str(params.get("type", "")).upper(),
+            "side": side,
+        }
+        self._orders[order["orderId"]] = order
+        return web.json_response(order)
+
+    async def _binance_get_order(self, request):
+        order = self._orders.get(int(request.query.get("orderId", 0)))
+        if order is None:
+            return self._binance_error(-2013, "Order does not exist.")
+        return web.json_response(order)
+
+    async def _binance_config(self, request):
+        coins = {coin for _, coin in self.markets}
+        return web.json_response([
+            {
+                "coin": coin,
+                "depositAllEnable": True,
+                "withdrawAllEnable": True,
+                "networkList": [
+                    {"coin": coin, "network": coin, "withdrawFee": _number(0.0005)}
+                ],
+            }
+            for coin in sorted(coins)
+        ])
+
+    async def _binance_deposit_address(self, request):
+        coin = request.query.get("coin", "").upper()
+        return web.json_response({
+            "coin": coin,
+            "address": f"mock-{coin.lower()}-address",
+            "tag": "",
+            "url": "",
+        })
+
+    async def _binance_deposits(self, request):
+        return web.json_response([
+            {"amount": _number(1), "coin": request.query.get("coin"), "status": 1}
+        ])
+
+    async def _binance_withdraw(self, request):
+        params = await self._params(request)
+        withdrawal = {
+            "id": uuid.uuid4().hex,
+            "address": params.get("address"),
+            "amount": params.get("amount"),
+            "applyTime": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "coin": params.get("coin"),
+            "network": params.get("coin"),
+            "transactionFee": _number(0.0005),
+            "txId": uuid.uuid4().hex,
+            "status": 6,
+        }
+        self._withdrawals.append(withdrawal)
+        return web.json_response({"id": withdrawal["id"]})
+
+    async def _binance_withdrawals(self, request):
+        coin = request.query.get("coin")
+        return web.json_response(
+            [each for each in self._withdrawals if coin is None or each["coin"] == coin]
+        )
+
+    # Bithumb
+    def _bithumb_markets(self):
+        return {coin: market for (payment, coin), market in self.markets.items()
+                if payment == "KRW"}
+
+    def _bithumb_book(self, coin, market):
+        bids, asks = market.levels(30)
+        return {
+            "order_currency": coin,
+            "payment_currency": "KRW",
+            "bids": [{"price": _number(p), "quantity": _number(q)} for p, q in bids],
+            "asks": [{"price": _number(p), "quantity": _number(q)} for p, q in asks],
+        }
+
+    async def _bithumb_orderbook(self, request):
+        symbol = request.match_info["symbol"].split("_")[0].upper()
+        markets = self._bithumb_markets()
+        data = {"timestamp": str(_millisecond()), "payment_currency": "KRW"}
+        if symbol == "ALL":
+            for coin, market in markets.items():
+                data[coin] = self._bithumb_book(coin, market)
+        elif symbol in markets:
+            data.update(self._bithumb_book(symbol, markets[symbol]))
+        else:
+            return web.json_response({"status": "5500", "message": "Invalid Parameter"})
+        return web.json_response({"status": "0000", "data": data})
+
+    def _bithumb_ticker_data(self, market):
+        price = _number(market.price)
+        return {
+            "opening_price": price,
+            "closing_price": price,
+            "min_price": price,
+            "max_price": price,
+            "units_traded": _number(1000),
+        }
+
+    async def _bithumb_ticker(self, request):
+        symbol = request.match_info["symbol"].split("_")[0].upper()
+        markets = self._bithumb_markets()
+        if symbol == "ALL":
+            data = {coin: self._bithumb_ticker_data(m) for coin, m in markets.items()}
+            data["date"] = str(_millisecond())
+        elif symbol in markets:
+            data = self._bithumb_ticker_data(markets[symbol])
+        else:
+            return web.json_response({"status": "5500", "message": "Invalid Parameter"})
+        return web.json_response({"status": "0000", "data": data})
+
+    async def _bithumb_order(self, request):
+        order_id = f"C{next(self._order_ids):019d}"
+        self._orders[order_id] = await self._params(request)
+        return web.json_response({"status": "0000", "order_id": order_id})
+
+    async def _bithumb_success(self, request):
+        return web.json_response({"status": "0000"})
+
+    async def _bithumb_balance(self, request):
+        data = dict()
+        for coin in list(self._bithumb_markets()) + ["krw"]:
+            coin = coin.lower()
+            data[f"total_{coin}"] = _number(1000)
+            data[f"in_use_{coin}"] = _number(0)
+            data[f"available_{coin}"] = _number(1000)
+        return web.json_response({"status": "0000", "data": data})
+
+    async def _bithumb_account(self, request):
+        params = await self._params(request)
+        return web.json_response({
+            "status": "0000",
+            "data": {
+                "created": str(_millisecond()),
+                "account_id": "mock",
+                "order_currency": params.get("currency", "BTC"),
+                "payment_currency": "KRW",
+                "trade_fee": "0.0025",
+                "balance": _number(1000),
+            },
+        })
+
+    async def _bithumb_wallet_address(self, request):
+        params = await self._params(request)
+        currency = params.get("currency", "BTC")
+        return web.json_response({
+            "status": "0000",
+            "data": {"wallet_address": f"mock-{currency.lower()}-address",
+                     "currency": currency},
+        })
+
+    async def _bithumb_order_detail(self, request):
+        params = await self._params(request)
+        return web.json_response({
+            "status": "0000",
+            "data": {
+                "order_date": str(_millisecond()),
+                "type": params.get("type", "bid"),
+                "order_status": "Completed",
+                "order_currency": params.get("order_currency", "BTC"),
+                "payment_currency": "KRW",
+                "order_id": params.get("order_id"),
+                "contract": [],
+            },
+        })
+
+    # Upbit
+    def _upbit_error(self, name, message, status=400):
+        return web.json_response(
+            {"error": {"name": name, "message": message}}, status=status
+        )
+
+    async def _upbit_ticker(self, request):
+        result = list()
+        for symbol in request.query.get("markets", "").split(","):
+            payment, _, coin = symbol.partition("-")
+            market = self.markets.get((payment, coin))
+            if market is None:
+                return self._upbit_error("not_found_market", "Code not found", 404)
+            result.append({
+                "market": symbol,
+                "trade_price": market.price,
+                "timestamp": _millisecond(),
+            })
+        return web.json_response(result)
+
+    async def _upbit_markets(self, request):
+        return web.json_response([
+            {"market": f"{payment}-{coin}", "korean_name": coin, "english_name": coin}
+            for payment, coin in self.markets
+        ])
+
+    async def _upbit_post_order(self, request):
+        params = await self._params(request)
+        order = {
+            "uuid": str(uuid.uuid4()),
+            "side": params.get("side"),
+            "ord_type": params.get("ord_type"),
+            "price": params.get("price"),
+            "state": "done",
+            "market": params.get("market"),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S+09:00"),
+            "volume": params.get("volume"),
+            "remaining_volume": "0",
+            "executed_volume": params.get("volume"),
+            "trades_count": 1,
+        }
+        self._orders[order["uuid"]] = order
+        return web.json_response(order, status=201)
+
+    async def _upbit_get_order(self, request):
+        params = await self._params(request)
+        order = self._orders.get(params.get("uuid"))
+        if order is None:
+            return self._upbit_error("order_not_found", "Order not found", 404)
+        return web.json_response(order)
+
+    async def _upbit_accounts(self, request):
+        currencies = {coin for _, coin in self.markets} | {"KRW"}
+        return web.json_response([
+            {
+                "currency": currency,
+                "balance": _number(1000),
+                "locked": _number(0),
+                "avg_buy_price": "0",
+                "unit_currency": "KRW",
+            }
+            for currency in sorted(currencies)
+        ])
+
+    async def _upbit_list(self, request):
+        return web.json_response(list())
+
+    async def _upbit_withdraw(self, request):
+        params = await self._params(request)
+        return web.json_response({
+            "type": "withdraw",
+            "uuid": str(uuid.uuid4()),
+            "currency": params.get("currency"),
+            "state": "submitting",
+            "amount": params.get("amount"),
+            "fee": "0.0005",
+        }, status=201)
+
+    async def _upbit_addresses(self, request):
+        return web.json_response([
+            {
+                "currency": coin,
+                "deposit_address": f"mock-{coin.lower()}-address",
+                "secondary_address": None,
+            }
+            for coin in sorted({coin for _, coin in self.markets})
+        ])
+
+    async def _upbit_withdraw_chance(self, request):
+        params = await self._params(request)
+        currency = params.get("currency", "BTC")
+        return web.json_response({
+            "currency": {"code": currency, "withdraw_fee": "0.0005"},
+            "withdraw_limit": {"currency": currency, "minimum": "0.001"},
+        })
+
+    async def start(self):
+        self._runner = web.AppRunner(self.application())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        # port 0 binds a free port.
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self):
+        """
+        serve in a daemon thread of its own event loop, for tests in the same process.
+        """
+        started = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def drop_websockets(self):
+        """
+        close every websocket served by start_in_thread, clients reconnect.
+        """
+        asyncio.run_coroutine_threadsafe(self._close_websockets(), self._loop).result()
+
+    def stop_thread(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18766)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    parser.add_argument("--messages-per-second", type=float, default=10)
+    args = parser.parse_args(argv)
+
+    server = MockExchangeServer(
+        args.host,
+        args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        messages_per_second=args.messages_per_second,
+    )
+    print(f"mock exchange server [{server.base_url}], [{server.websocket_url}]")
+    web.run_app(server.application(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
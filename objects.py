@@ -1,18 +1,47 @@
 import websocket
+import logging
 
 from threading import Event
 from decimal import Context
 
 import time
+import random
+import functools
+import copy
 
 import requests
 import json
 import threading
+import multiprocessing
+import asyncio
 import aiohttp
 import decimal
 
 from Exchanges.messages import DebugMessage, WarningMessage
-from Exchanges.settings import Consts
+from Exchanges.settings import (
+    Consts,
+    SessionConsts,
+    CacheConsts,
+    Tickets,
+    WebsocketBackend,
+    JsonDecoder,
+)
+from Exchanges.decoders import get_loads
+from Exchanges.caches import TTLCache
+from Exchanges.singleflight import SingleFlight
+from Exchanges.sessions import create_session, AsyncSessionManager
+from Exchanges.orderbooks import (
+    CompactOrderbook,
+    AverageOrderbookCache,
+    OrderbookSnapshot,
+)
+from Exchanges.candles import (
+    CandleSeries,
+    interval_to_milliseconds,
+    validate_intervals,
+)
+from Exchanges.shared import SharedMarketData
+from Exchanges.recorder import FrameRecorder
 
 
 decimal.getcontext().prec = 8
@@ -20,8 +49,7 @@ decimal.getcontext().prec = 8
 
 class SAIDataValidator(object):
     def _has_key(self, dic, required):
-        key = set(dic.keys())
-        return key == key.intersection(required)
+        return set(required).issubset(dic.keys())
 
     def generate_sai_data_dict(self, required, key_list, data_dict):
         if not self._has_key(data_dict, required):
@@ -29,7 +57,10 @@ class SAIDataValidator(object):
 
         sai_dict = dict()
         for key, type_ in key_list:
-            sai_dict[f"sai_{key}"] = data_dict.get(type_(key), Consts.NOT_FOUND)
+            value = data_dict.get(key)
+            sai_dict[f"sai_{key}"] = (
+                Consts.NOT_FOUND if value is None else type_(value)
+            )
 
         return sai_dict
 
@@ -77,39 +108,419 @@ class ExchangeResult(object):
         self.wait_time = wait_time
 
 
+def _set_waiter_result(waiter, value):
+    if not waiter.done():
+        waiter.set_result(value)
+
+
+class StripedLock(object):
+    """
+    fixed number of locks shared by keys, a writer of a key does not block other keys.
+    """
+
+    def __init__(self, stripes):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def get(self, key):
+        return self._locks[hash(key) % len(self._locks)]
+
+
 class DataStore(object):
-    def __init__(self):
+    def __init__(self, compact_orderbook=False):
+        """
+        compact_orderbook: store orderbooks as CompactOrderbook, not lists of Decimals
+        orderbook_locks: locks of each symbol for writers of orderbooks
+        orderbook_entries: {sai_symbol: (version, orderbook)}
+        orderbook_update_times: {sai_symbol: time of the last stored orderbook}
+        ticker_prices: {sai_symbol: last price} of all symbols, see store_tickers
+        """
+        self.compact_orderbook = compact_orderbook
         self.channel_set = dict()
         self.activated_channels = list()
         self.orderbook_queue = dict()
+        self.orderbook_entries = dict()
+        self.orderbook_locks = StripedLock(Consts.ORDERBOOK_LOCK_STRIPES)
+        self.orderbook_averages = AverageOrderbookCache()
+        self.orderbook_update_times = dict()
         self.balance_queue = dict()
         self.candle_queue = dict()
+        self.ticker_prices = dict()
+        self.ticker_update_time = 0
+
+    def sync_orderbooks(self):
+        """
+        called before orderbooks are read, stores filled from elsewhere refresh here.
+        """
+        pass
+
+    def sync_candle(self, sai_symbol, interval):
+        pass
+
+    def store_tickers(self, prices):
+        """
+        prices: {sai_symbol: Decimal}, a whole market at once from a bulk source.
+        """
+        self.ticker_prices.update(prices)
+        self.ticker_update_time = time.time()
 
+    def get_ticker_price(self, sai_symbol, max_age=Consts.TICKER_STALE_SECONDS):
+        """
+        price of the ticker table, None when it is missing or older than max_age.
+        """
+        if time.time() - self.ticker_update_time > max_age:
+            return None
+        return self.ticker_prices.get(sai_symbol)
+
+
+def _flight_key(method, path, extra):
+    params = tuple(sorted((key, str(value)) for key, value in extra.items()))
+    return method, path, params
+
+
+def _copy_result(result):
+    return ExchangeResult(
+        result.success, copy.deepcopy(result.data), result.message, result.wait_time
+    )
 
-class CustomWebsocket(websocket.WebSocketApp, threading.Thread):
+
+def reconnect_delay(attempt):
+    # exponential backoff with jitter
+    delay = min(
+        Consts.RECONNECT_MAX_DELAY, Consts.RECONNECT_BASE_DELAY * 2 ** attempt
+    )
+    return random.uniform(delay / 2, delay)
+
+
+class OpenEventMixin(object):
+    """
+    open event of a websocket, messages sent before it is opened are queued
+    and flushed in order when it is opened.
+    a dropped connection is reconnected until close() is called,
+    on_reopen(ws) is called before the queue is flushed on every reconnection,
+    it sends ahead of queued messages by queue_first.
+    """
+
+    def _init_open_event(self):
+        self.opened = threading.Event()
+        self.on_reopen = None
+        self._pending_lock = threading.Lock()
+        self._pending_messages = list()
+        self._open_count = 0
+        self._reconnect_attempt = 0
+        self._closed_by_user = False
+
+    def _reopened(self):
+        self._open_count += 1
+        self._reconnect_attempt = 0
+        if self._open_count > 1 and self.on_reopen is not None:
+            self.on_reopen(self)
+
+    def _next_reconnect_delay(self):
+        delay = reconnect_delay(self._reconnect_attempt)
+        self._reconnect_attempt += 1
+        return delay
+
+    def _queue_if_not_opened(self, message):
+        with self._pending_lock:
+            if self.opened.is_set():
+                return False
+            self._pending_messages.append(message)
+            return True
+
+    def queue_first(self, message):
+        """
+        queue message before every pending message, used by on_reopen.
+        """
+        with self._pending_lock:
+            self._pending_messages.insert(0, message)
+
+    def _take_pending_or_open(self):
+        # opened is set only when nothing is pending, so the order is kept.
+        with self._pending_lock:
+            pending, self._pending_messages = self._pending_messages, list()
+            if not pending:
+                self.opened.set()
+            return pending
+
+    def _set_closed(self):
+        self.opened.clear()
+
+    def wait_opened(self, timeout=None):
+        return self.opened.wait(timeout)
+
+
+class CustomWebsocket(OpenEventMixin, websocket.WebSocketApp, threading.Thread):
     def __init__(self, url, on_message, ping_time_per_second):
-        websocket.WebSocketApp.__init__(self, url, on_message=on_message)
+        websocket.WebSocketApp.__init__(
+            self,
+            url,
+            on_message=on_message,
+            on_open=self._on_open,
+            on_close=self._on_close,
+        )
         threading.Thread.__init__(self)
+        self._init_open_event()
         self._ping_time_per_second = ping_time_per_second
 
+    def _on_open(self, *args):
+        self._reopened()
+        while True:
+            pending = self._take_pending_or_open()
+            if not pending:
+                break
+            for message in pending:
+                websocket.WebSocketApp.send(self, message)
+
+    def _on_close(self, *args):
+        self._set_closed()
+
+    def send(self, data, opcode=websocket.ABNF.OPCODE_TEXT):
+        if self._queue_if_not_opened(data):
+            return
+        websocket.WebSocketApp.send(self, data, opcode)
+
+    def close(self, **kwargs):
+        self._closed_by_user = True
+        websocket.WebSocketApp.close(self, **kwargs)
+
     def run(self) -> None:
-        self.run_forever(ping_interval=self._ping_time_per_second)
+        while not self._closed_by_user:
+            self.run_forever(ping_interval=self._ping_time_per_second)
+            if self._closed_by_user:
+                break
+            time.sleep(self._next_reconnect_delay())
+
+
+class EventLoopThread(object):
+    """
+    one event loop in a daemon thread, shared by every AsyncWebsocket of the process.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def get(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+
+class AsyncWebsocket(OpenEventMixin):
+    """
+    asyncio replacement of CustomWebsocket with the same interface,
+    on_message(ws, message) is called in the shared EventLoopThread.
+    """
+
+    def __init__(self, url, on_message, ping_time_per_second):
+        self.url = url
+        self.on_message = on_message
+        self.sock = None
+        self.keep_running = False
+        self._init_open_event()
+
+        self._ping_time_per_second = ping_time_per_second
+        self._loop_thread = EventLoopThread.get()
+        self._future = None
+
+    def start(self):
+        self.keep_running = True
+        self._future = self._loop_thread.submit(self._run())
+
+    async def _run(self):
+        while not self._closed_by_user:
+            try:
+                await self._run_forever()
+            except Exception as ex:
+                logging.debug(f"AsyncWebsocket::: connection error, [{ex}]")
+            if self._closed_by_user:
+                break
+            await asyncio.sleep(self._next_reconnect_delay())
+
+    async def _run_forever(self):
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.ws_connect(
+                    self.url, heartbeat=self._ping_time_per_second
+                ) as ws:
+                    self.sock = ws
+                    self.keep_running = True
+                    self._reopened()
+                    while True:
+                        pending = self._take_pending_or_open()
+                        if not pending:
+                            break
+                        for message in pending:
+                            await ws.send_str(message)
+
+                    async for message in ws:
+                        if message.type == aiohttp.WSMsgType.TEXT:
+                            self.on_message(self, message.data)
+                        elif message.type in (
+                            aiohttp.WSMsgType.CLOSED,
+                            aiohttp.WSMsgType.ERROR,
+                        ):
+                            break
+        finally:
+            self._set_closed()
+            self.sock = None
+            self.keep_running = False
+
+    def send(self, message):
+        if self._queue_if_not_opened(message):
+            return
+        # not waiting for the result, send can be called in the loop itself.
+        self._loop_thread.submit(self._send(message))
+
+    async def _send(self, message):
+        # the connection may be dropped between send and this, the message is
+        # then queued for the next connection.
+        sock = self.sock
+        if sock is None or sock.closed:
+            with self._pending_lock:
+                self._pending_messages.append(message)
+            return
+        await sock.send_str(message)
+
+    def close(self):
+        self._closed_by_user = True
+        self.keep_running = False
+        if self.sock is not None:
+            self._loop_thread.submit(self.sock.close())
+
+
+class WebsocketShard(object):
+    """
+    a websocket connection of a subscriber and the streams subscribed on it.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.app = None
+        self.streams = set()
+        self.message_count = 0
+
+        self._last_count = 0
+        self._last_time = time.time()
+
+    def on_message(self, handler, *args):
+        self.message_count += 1
+        handler(*args)
+
+    def stats(self):
+        now = time.time()
+        elapsed = now - self._last_time
+        rate = (self.message_count - self._last_count) / elapsed if elapsed else 0
+        self._last_count, self._last_time = self.message_count, now
+
+        return {
+            "index": self.index,
+            "streams": len(self.streams),
+            "messages": self.message_count,
+            "rate": rate,
+        }
+
+
+class MessageDispatcher(object):
+    """
+    handlers of each event type, a message is dispatched by a single dict lookup
+    so adding a stream type does not slow the others.
+    count, errors and seconds spent are kept for each event type.
+    """
+
+    def __init__(self):
+        self.unknown_count = 0
+        self._handlers = dict()
+        # event_type: [count, errors, seconds]
+        self._counters = dict()
+
+    def register(self, event_type, handler):
+        self._handlers[event_type] = handler
+        self._counters.setdefault(event_type, [0, 0, 0.0])
+
+    def unregister(self, event_type):
+        self._handlers.pop(event_type, None)
+
+    def dispatch(self, event_type, data):
+        """
+        return False if no handler is registered for event_type,
+        an exception of the handler is counted and raised.
+        """
+        handler = self._handlers.get(event_type)
+        if handler is None:
+            self.unknown_count += 1
+            return False
+
+        counter = self._counters[event_type]
+        start = time.perf_counter()
+        try:
+            handler(data)
+        except Exception:
+            counter[1] += 1
+            raise
+        finally:
+            counter[0] += 1
+            counter[2] += time.perf_counter() - start
+        return True
+
+    def stats(self):
+        """
+        [{event_type, count, errors, seconds, average}, ..],
+        average is seconds per message.
+        """
+        return [
+            {
+                "event_type": event_type,
+                "count": count,
+                "errors": errors,
+                "seconds": seconds,
+                "average": seconds / count if count else 0,
+            }
+            for event_type, (count, errors, seconds) in self._counters.items()
+        ]
 
 
 class BaseSubscriber(object):
     base_url = str()
+    rest_url = str()
     name = "Base Subscriber"
+    converter = None
     ping_time_per_second = 120
     base_logger = None
+    websocket_backend = WebsocketBackend.THREAD
+    json_decoder = JsonDecoder.AUTO
+    max_streams_per_connection = 1024
+    shard_count = 1
 
     def __init__(self):
         super(BaseSubscriber, self).__init__()
 
+        # decoder of websocket messages, replaced by the one of the exchange.
+        self.loads = get_loads(self.json_decoder)
+        self.dispatcher = MessageDispatcher()
+
         self._evt = Event()
         self._evt.set()
 
         self._candle_symbol_set = set()
         self._orderbook_symbol_set = set()
+        self._orderbook_watch_times = dict()
+        self._watchdog_thread = None
+        self._candle_intervals = Consts.CANDLE_INTERVALS
+        self._folded_candle_dict = dict()
 
         self._temp_candle_store = dict()
 
@@ -117,24 +528,209 @@ class BaseSubscriber(object):
 
         self._subscribe_thread = None
         self._websocket_app = None
+        self._shards = list()
+        self._stream_shard_dict = dict()
+        self._connect_timeout = Consts.WEBSOCKET_CONNECT_TIMEOUT
+
+        self._waiter_lock = threading.Lock()
+        self._waiter_dict = dict()
 
         self.data_store = None
+        # SharedMarketData when the subscriber runs in a subscriber process.
+        self.publisher = None
+        # FrameRecorder of received frames, see start_recording
+        self.recorder = None
+        # False while a recording is replayed, snapshots come from the recording.
+        self.fetch_snapshot = True
+        # RateLimiter of the exchange, shared with REST snapshots of the subscriber.
+        self.rate_limiter = None
+
+    def start_websocket_thread(self, timeout=Consts.WEBSOCKET_CONNECT_TIMEOUT):
+        """
+        return as soon as every connection is opened or timeout seconds passed,
+        subscriptions sent before that are queued and flushed on open.
+        """
+        self._connect_timeout = timeout
+        shards = [self._add_shard(wait=False) for _ in range(max(self.shard_count, 1))]
+        self._websocket_app = self._shards[0].app
+
+        deadline = time.time() + timeout
+        for shard in shards:
+            self._wait_shard_opened(shard, max(deadline - time.time(), 0))
+
+    def _add_shard(self, wait=True):
+        if self.websocket_backend == WebsocketBackend.ASYNCIO:
+            websocket_class = AsyncWebsocket
+        else:
+            websocket_class = CustomWebsocket
+
+        shard = WebsocketShard(len(self._shards))
+        shard.app = websocket_class(
+            self.base_url,
+            functools.partial(shard.on_message, self.receive),
+            self.ping_time_per_second,
+        )
+        shard.app.on_reopen = functools.partial(self._on_shard_reopened, shard)
+        self.base_logger.debug(f"Start to connect {self.name} websocket")
+        shard.app.start()
+        self._shards.append(shard)
+
+        if wait:
+            self._wait_shard_opened(shard, self._connect_timeout)
+        return shard
+
+    def _wait_shard_opened(self, shard, timeout):
+        if shard.app.wait_opened(timeout):
+            self.base_logger.debug(f"Created connection to {self.name} websocket")
+        else:
+            self.base_logger.debug(
+                f"{self.name}::: connection is not opened in {timeout}s, "
+                f"messages are queued until it is opened"
+            )
 
-    def start_websocket_thread(self):
-        self._websocket_app = CustomWebsocket(
-            self.base_url, self.on_message, self.ping_time_per_second
+    def _on_shard_reopened(self, shard, app):
+        """
+        called on a reconnection before queued messages are flushed,
+        the subscription is queued first so streams of the shard are subscribed
+        again before anything else.
+        """
+        streams = sorted(shard.streams)
+        self.base_logger.debug(
+            f"{self.name}::: reconnected [{shard.index}], "
+            f"resubscribe {len(streams)} streams"
         )
-        self._websocket_app.start()
-        for _ in range(60):
-            self.base_logger.debug(f"Start to connect {self.name} websocket")
-            time.sleep(1)
-            if self._websocket_app.sock and self._websocket_app.keep_running:
-                self.base_logger.debug(f"Created connection to {self.name} websocket")
+        self.on_reconnected(streams)
+        if streams:
+            message = self.subscribe_message(streams, Tickets.RESUBSCRIBE)
+            app.queue_first(json.dumps(message))
+
+    def on_reconnected(self, streams):
+        """
+        streams: streams of the reconnected connection, messages of them are lost
+            while it was disconnected.
+        """
+        pass
+
+    def _get_available_shard(self):
+        available = [
+            shard
+            for shard in self._shards
+            if len(shard.streams) < self.max_streams_per_connection
+        ]
+        if not available:
+            return self._add_shard()
+        return min(available, key=lambda shard: len(shard.streams))
+
+    def subscribe_message(self, streams, ticket):
+        pass
+
+    def unsubscribe_message(self, streams, ticket):
+        pass
+
+    def subscribe_streams(self, streams, ticket):
+        """
+        each new stream is placed on the least loaded connection,
+        a connection is added when every connection has max_streams_per_connection.
+        """
+        placement = dict()
+        for stream in streams:
+            if stream in self._stream_shard_dict:
+                continue
+            shard = self._get_available_shard()
+            shard.streams.add(stream)
+            self._stream_shard_dict[stream] = shard
+            placement.setdefault(shard, list()).append(stream)
+
+        for shard, shard_streams in placement.items():
+            shard.app.send(json.dumps(self.subscribe_message(shard_streams, ticket)))
+
+        self.rebalance(ticket)
+
+    def rebalance(self, ticket):
+        """
+        move streams from the most loaded connection to the least loaded one
+        until their difference is at most 1.
+        """
+        moves = dict()
+        while len(self._shards) > 1:
+            most = max(self._shards, key=lambda shard: len(shard.streams))
+            least = min(self._shards, key=lambda shard: len(shard.streams))
+            if len(most.streams) - len(least.streams) <= 1:
                 break
+            stream = most.streams.pop()
+            least.streams.add(stream)
+            self._stream_shard_dict[stream] = least
+            moves.setdefault((most, least), list()).append(stream)
+
+        for (source, target), streams in moves.items():
+            self.base_logger.debug(
+                f"{self.name}::: move {len(streams)} streams, "
+                f"{source.index} -> {target.index}"
+            )
+            target.app.send(json.dumps(self.subscribe_message(streams, ticket)))
+            source.app.send(json.dumps(self.unsubscribe_message(streams, ticket)))
+
+    def resend_streams(self, streams, ticket):
+        """
+        unsubscribe and subscribe streams again on their connections.
+        """
+        placement = dict()
+        for stream in streams:
+            shard = self._stream_shard_dict.get(stream)
+            if shard is not None:
+                placement.setdefault(shard, list()).append(stream)
+
+        for shard, shard_streams in placement.items():
+            shard.app.send(json.dumps(self.unsubscribe_message(shard_streams, ticket)))
+            shard.app.send(json.dumps(self.subscribe_message(shard_streams, ticket)))
+
+    def register_handler(self, event_type, handler):
+        """
+        handler(data) is called for each message of event_type.
+        """
+        self.dispatcher.register(event_type, handler)
+
+    def handler_stats(self):
+        return self.dispatcher.stats()
+
+    def shard_stats(self):
+        """
+        [{index, streams, messages, rate}, ..], rate is messages per second
+        since the previous call.
+        """
+        return [shard.stats() for shard in self._shards]
+
+    def receive(self, *args):
+        """
+        entry of websocket frames, a frame is recorded before on_message.
+        """
+        if self.recorder is not None:
+            self.recorder.record(args[-1])
+        self.on_message(*args)
 
     def on_message(self, *args):
         return
 
+    def on_snapshot(self, symbol, snapshot):
+        """
+        orderbook snapshot of symbol from REST or a replayed recording.
+        """
+        pass
+
+    def start_recording(self, directory, **options):
+        """
+        record received frames and snapshots into directory,
+        options: segment_size, compresslevel of FrameRecorder
+        """
+        if self.recorder is None:
+            self.recorder = FrameRecorder(directory, **options)
+        return self.recorder
+
+    def stop_recording(self):
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+
     def temp_orderbook_setter(self, units, data_keys):
         total_bids, total_asks = [], []
         context = Context(prec=8)
@@ -147,38 +743,233 @@ class BaseSubscriber(object):
 
             total_bids.append([bid_price, bid_amount])
             total_asks.append([ask_price, ask_amount])
+        if self.data_store is not None and self.data_store.compact_orderbook:
+            return CompactOrderbook.from_levels(total_bids, total_asks)
         dict_ = {Consts.BIDS: total_bids, Consts.ASKS: total_asks}
         return dict_
 
+    def store_orderbook(self, sai_symbol, orderbook):
+        """
+        should be called with data_store.orderbook_locks of the symbol,
+        the stored orderbook must not be mutated afterwards.
+        """
+        version, _ = self.data_store.orderbook_entries.get(sai_symbol, (0, None))
+        self.data_store.orderbook_entries[sai_symbol] = (version + 1, orderbook)
+        self.data_store.orderbook_queue[sai_symbol] = orderbook
+        self.data_store.orderbook_update_times[sai_symbol] = time.time()
+        if self.publisher is not None:
+            self.publisher.publish_orderbook(sai_symbol, orderbook)
+        self.data_store.orderbook_averages.mark_dirty(sai_symbol)
+        self._notify((Consts.ORDERBOOK, sai_symbol), orderbook)
+
+    def _notify(self, key, value):
+        with self._waiter_lock:
+            waiters = self._waiter_dict.pop(key, None)
+        if not waiters:
+            return
+
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(_set_waiter_result, waiter, value)
+
+    async def _wait(self, key, timeout=None):
+        waiter = asyncio.get_running_loop().create_future()
+        with self._waiter_lock:
+            self._waiter_dict.setdefault(key, list()).append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        finally:
+            with self._waiter_lock:
+                waiters = self._waiter_dict.get(key, list())
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters:
+                    self._waiter_dict.pop(key, None)
+
+    async def wait_orderbook(self, sai_symbol, timeout=None):
+        """
+        wait for the next stored orderbook of sai_symbol in any event loop.
+        """
+        return await self._wait((Consts.ORDERBOOK, sai_symbol), timeout)
+
+    async def wait_candle(self, sai_symbol, timeout=None):
+        """
+        wait for the next base interval candle of sai_symbol, returns CandleSeries.
+        """
+        return await self._wait((Consts.CANDLE, sai_symbol), timeout)
+
     def temp_candle_setter(self, store_list, candle_list):
         """
         Args:
-            store_list: data_store.candle_queue[sai_symbol]
+            store_list: data_store.candle_queue[sai_symbol], CandleSeries or None
             candle_list: open, high, low, close, amount, timestamp
         """
+        if store_list is None:
+            store_list = CandleSeries()
 
-        store_list.append(candle_list)
-        if len(store_list) >= Consts.CANDLE_LIMITATION:
-            store_list.pop(0)
+        store_list.update(*candle_list)
         return store_list
 
+    def store_candle(self, sai_symbol, candle_list, closed=False):
+        """
+        update the base interval series, fold a closed candle into higher intervals.
+        data_store.candle_queue: {(sai_symbol, interval): CandleSeries}
+        """
+        key = (sai_symbol, Consts.CANDLE_BASE_INTERVAL)
+        self.data_store.candle_queue[key] = self.temp_candle_setter(
+            self.data_store.candle_queue.get(key), candle_list
+        )
+        self._notify((Consts.CANDLE, sai_symbol), self.data_store.candle_queue[key])
+        if self.publisher is not None:
+            self.publisher.publish_candle(
+                sai_symbol,
+                Consts.CANDLE_BASE_INTERVAL,
+                self.data_store.candle_queue[key],
+            )
+
+        timestamp = int(candle_list[-1])
+        if not closed or self._folded_candle_dict.get(sai_symbol, -1) >= timestamp:
+            return
+        self._folded_candle_dict[sai_symbol] = timestamp
+
+        for interval in self._candle_intervals:
+            if interval == Consts.CANDLE_BASE_INTERVAL:
+                continue
+            key = (sai_symbol, interval)
+            series = self.data_store.candle_queue.get(key)
+            if series is None:
+                series = self.data_store.candle_queue[key] = CandleSeries()
+            series.fold(candle_list, interval_to_milliseconds(interval))
+            if self.publisher is not None:
+                self.publisher.publish_candle(sai_symbol, interval, series)
+
     def subscribe_orderbook(self):
         pass
 
     def subscribe_candle(self):
         pass
 
+    def subscribe_ticker(self):
+        pass
+
     def set_orderbook_symbol_set(self, symbol_list):
         self._orderbook_symbol_set = set(symbol_list)
+        self._orderbook_watch_times = dict.fromkeys(
+            self._orderbook_symbol_set, time.time()
+        )
+
+    def get_stale_symbols(self, stale_seconds=Consts.STALE_SECONDS):
+        """
+        exchange symbols of subscribed orderbooks which are not stored
+        in stale_seconds since they are subscribed or resubscribed.
+        """
+        now = time.time()
+        update_times = self.data_store.orderbook_update_times
+        stale_symbols = list()
+        for symbol, watch_time in self._orderbook_watch_times.items():
+            sai_symbol = self.converter.exchange_to_sai_subscriber(symbol.upper())
+            if now - max(update_times.get(sai_symbol, 0), watch_time) > stale_seconds:
+                stale_symbols.append(symbol)
+        return stale_symbols
+
+    def resubscribe_orderbook(self, symbol_list):
+        pass
+
+    def start_watchdog(self, stale_seconds=Consts.STALE_SECONDS, interval=None):
+        """
+        resubscribe orderbooks of stale symbols every interval seconds until stop().
+        """
+        if self._watchdog_thread is not None:
+            return
+        interval = interval or stale_seconds / 2
+
+        def watch():
+            while self._evt.is_set():
+                time.sleep(interval)
+                stale_symbols = self.get_stale_symbols(stale_seconds)
+                if not stale_symbols:
+                    continue
+                self.base_logger.debug(
+                    f"{self.name}::: stale orderbooks, resubscribe [{stale_symbols}]"
+                )
+                now = time.time()
+                for symbol in stale_symbols:
+                    self._orderbook_watch_times[symbol] = now
+                self.resubscribe_orderbook(stale_symbols)
+
+        self._watchdog_thread = threading.Thread(target=watch, daemon=True)
+        self._watchdog_thread.start()
 
     def set_candle_symbol_set(self, symbol_list):
         self._candle_symbol_set = set(symbol_list)
 
+    def set_candle_intervals(self, intervals):
+        validate_intervals(intervals)
+        self._candle_intervals = tuple(intervals)
+
     def set_subscribe_dict(self, list_):
         self._subscribe_dict = dict.fromkeys(list_, list())
 
     def stop(self):
         self._evt.clear()
+        # the last segment is complete only when the recorder is closed.
+        self.stop_recording()
+
+    def close_websockets(self):
+        self.stop()
+        for shard in self._shards:
+            shard.app.close()
+
+
+def run_subscriber_process(
+    subscriber_class,
+    names,
+    orderbook_symbol_list,
+    candle_symbol_list,
+    intervals,
+    websocket_backend,
+    stop_event,
+    rest_url=None,
+    websocket_url=None,
+    rate_limiter=None,
+    symbol_index=None,
+):
+    """
+    target of a subscriber process, symbols are symbols of the subscriber.
+    received orderbooks and candles are published to SharedMarketData of names
+    until stop_event is set.
+    rest_url, websocket_url: base_url and websocket_url of the exchange
+    rate_limiter: copy of the RateLimiter of the exchange for REST snapshots
+    symbol_index: SymbolIndex of the converter, a spawned process does not have
+        the markets loaded by setup of the exchange
+    """
+    publisher = SharedMarketData.attach(*names)
+    lock_dic = {Consts.ORDERBOOK: threading.Lock(), Consts.CANDLE: threading.Lock()}
+    subscriber = subscriber_class(DataStore(compact_orderbook=True), lock_dic)
+    subscriber.websocket_backend = websocket_backend
+    subscriber.publisher = publisher
+    if rest_url is not None:
+        subscriber.rest_url = rest_url
+    if websocket_url is not None:
+        subscriber.base_url = websocket_url
+    if rate_limiter is not None:
+        subscriber.rate_limiter = rate_limiter
+    if symbol_index is not None:
+        subscriber.converter.index = symbol_index
+    subscriber.start_websocket_thread()
+
+    if orderbook_symbol_list:
+        subscriber.set_orderbook_symbol_set(orderbook_symbol_list)
+        subscriber.subscribe_orderbook()
+    if candle_symbol_list:
+        subscriber.set_candle_symbol_set(candle_symbol_list)
+        subscriber.set_candle_intervals(intervals)
+        subscriber.subscribe_candle()
+
+    try:
+        stop_event.wait()
+    finally:
+        subscriber.close_websockets()
+        publisher.close()
 
 
 class BaseExchange(object):
@@ -192,48 +983,319 @@ class BaseExchange(object):
     base_url = None
     error_key = None
     base_logger = None
-
-    def __init__(self):
+    warmup_path = None
+    request_concurrency = SessionConsts.CONCURRENCY
+
+    def __init__(
+        self,
+        pool_size=SessionConsts.POOL_SIZE,
+        max_retries=SessionConsts.MAX_RETRIES,
+        timeout=SessionConsts.TIMEOUT,
+        compact_orderbook=False,
+        websocket_backend=WebsocketBackend.THREAD,
+        json_decoder=JsonDecoder.AUTO,
+        data_store=None,
+        base_url=None,
+        websocket_url=None,
+        cache_ttl=None,
+        stale_while_revalidate=False,
+    ):
+        """
+        pool_size: number of keep-alive connections kept for base_url
+        max_retries: retry count when the connection is reset
+        timeout: (connect, read) seconds of each request
+        compact_orderbook: store orderbooks as fixed point arrays, see CompactOrderbook
+        websocket_backend: WebsocketBackend.THREAD or WebsocketBackend.ASYNCIO
+        json_decoder: JsonDecoder of REST responses and websocket messages
+        data_store: DataStore to read market data from, RemoteDataStore of
+            a market data server instead of set_subscriber
+        base_url, websocket_url: endpoints instead of the exchange's ones,
+            a local mock server in load tests
+        cache_ttl: {key: seconds} cached data is fresh, overrides CacheConsts.TTL
+        stale_while_revalidate: serve expired cached data for CacheConsts.STALE_TTL
+            seconds while it is refreshed in the background
+        """
+        if base_url is not None:
+            self.base_url = base_url
+        self._websocket_url = websocket_url
+        self._websocket_backend = websocket_backend
+        self._loads = get_loads(json_decoder)
+        self._shared_market_data = None
+        self._subscriber_process = None
+        self._subscriber_stop_event = None
+        self._session = create_session(pool_size, max_retries)
+        self._async_session = AsyncSessionManager(timeout=timeout)
+        self._timeout = timeout
         self._lock_dic = {
             Consts.ORDERBOOK: threading.Lock(),
             Consts.CANDLE: threading.Lock(),
-            Consts.TICKER: threading.Lock(),
-            Consts.BALANCE: threading.Lock(),
-            Consts.DEPOSIT_ADDRESS: threading.Lock(),
         }
-        self.data_store = DataStore()
+        if data_store is None:
+            data_store = DataStore(compact_orderbook)
+        self.data_store = data_store
+        # key: TTLCache, created on the first use of each key
         self._cached_data = {}
+        self._cache_ttl = dict(CacheConsts.TTL, **(cache_ttl or dict()))
+        self._stale_while_revalidate = stale_while_revalidate
         self._data_validator = SAIDataValidator()
+        # RateLimiter of the exchange, requests are not limited when None.
+        self.rate_limiter = None
+        # concurrent identical GETs share one request, see _coalesce
+        self._single_flight = SingleFlight()
+        self._ticker_refresher = None
+        self._ticker_refresher_stop = Event()
+
+    def warmup(self):
+        """
+        open a connection to base_url before the first real request,
+        the first order does not pay for TCP+TLS handshake.
+        """
+        if self.warmup_path is None:
+            return
+        try:
+            self._session.get(self.base_url + self.warmup_path, timeout=self._timeout)
+        except requests.exceptions.RequestException:
+            self.base_logger.debug(
+                DebugMessage.FATAL.format(name=self.name, fn="warmup")
+            )
+
+    def close(self):
+        self._ticker_refresher_stop.set()
+        self._session.close()
+
+    async def aclose(self):
+        await self._async_session.close()
+        self.close()
+
+    async def __aenter__(self):
+        await self._async_session.get()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    def _get_cache(self, key):
+        cache = self._cached_data.get(key)
+        if cache is None:
+            stale_ttl = (
+                CacheConsts.STALE_TTL.get(key, 0) if self._stale_while_revalidate else 0
+            )
+            cache = self._cached_data.setdefault(
+                key,
+                TTLCache(self._cache_ttl.get(key, 0), stale_ttl, CacheConsts.MAX_SIZE),
+            )
+        return cache
 
     def set_cached_data(self, key, data, additional_key=None):
-        with self._lock_dic[key]:
-            if additional_key:
-                self._cached_data[key][additional_key] = {
-                    "data": data,
-                    "cached_time": time.time(),
-                }
-            else:
-                self._cached_data[key] = {"data": data, "cached_time": time.time()}
-
-    def get_cached_data(self, key, additional_key=None):
-        with self._lock_dic[key]:
-            if key not in self._cached_data:
-                return {}
-            if additional_key:
-                return self._cached_data[key][additional_key]["data"]
-            else:
-                return self._cached_data[key]["data"]
+        self._get_cache(key).set(additional_key, data)
+
+    def get_cached_data(self, key, additional_key=None, refresh=None):
+        """
+        data cached within the ttl of key, None when it is missing or expired.
+        refresh: function which fetches the data again, used to serve expired data
+            while it is refreshed when stale_while_revalidate is set.
+        """
+        return self._get_cache(key).get(additional_key, refresh)
 
-    def set_subscriber(self):
+    def get_cache_stats(self):
+        """
+        {key: {size, hits, stale_hits, misses, evictions, refreshes, max_age}}
+        """
+        return {key: cache.stats() for key, cache in list(self._cached_data.items())}
+
+    def set_subscriber(self, timeout=Consts.WEBSOCKET_CONNECT_TIMEOUT):
+        """
+        timeout: max seconds to wait for the websocket to be opened
+        """
         self.base_logger.debug(
             DebugMessage.ENTRANCE.format(
                 name=self.name, fn="set_subscriber", data=str(locals())
             )
         )
         self._subscriber = self.exchange_subscriber(self.data_store, self._lock_dic)
-        self._subscriber.start_websocket_thread()
+        self._subscriber.websocket_backend = self._websocket_backend
+        self._subscriber.loads = self._loads
+        self._subscriber.rest_url = self.base_url
+        self._subscriber.rate_limiter = self.rate_limiter
+        if self._websocket_url is not None:
+            self._subscriber.base_url = self._websocket_url
+        self._subscriber.start_websocket_thread(timeout)
+
+    def start_subscriber_process(
+        self,
+        orderbook_sai_symbol_list=(),
+        candle_sai_symbol_list=(),
+        intervals=Consts.CANDLE_INTERVALS,
+    ):
+        """
+        run the subscriber in a dedicated process instead of set_subscriber,
+        decoding and book maintenance do not share the core of this process.
+        get_orderbook, get_orderbook_snapshot, get_curr_avg_orderbook, get_candle
+        and get_candle_series read what it publishes from shared memory.
 
-    def set_subscribe_candle(self, sai_symbol_list):
+        the process is spawned, the caller script should be guarded
+        by if __name__ == "__main__".
+        """
+        self.base_logger.debug(
+            DebugMessage.ENTRANCE.format(
+                name=self.name, fn="start_subscriber_process", data=str(locals())
+            )
+        )
+        # the child would fail on an interval which can not be folded.
+        validate_intervals(intervals)
+        candle_list = [
+            (sai_symbol, interval)
+            for sai_symbol in candle_sai_symbol_list
+            for interval in intervals
+        ]
+        to_exchange = self.converter.sai_to_exchange_subscriber
+        self._shared_market_data = SharedMarketData.create(
+            orderbook_sai_symbol_list, candle_list
+        )
+
+        context = multiprocessing.get_context("spawn")
+        self._subscriber_stop_event = context.Event()
+        self._subscriber_process = context.Process(
+            target=run_subscriber_process,
+            args=(
+                self.exchange_subscriber,
+                self._shared_market_data.names,
+                list(map(to_exchange, orderbook_sai_symbol_list)),
+                list(map(to_exchange, candle_sai_symbol_list)),
+                list(intervals),
+                self._websocket_backend,
+                self._subscriber_stop_event,
+                self.base_url,
+                self._websocket_url,
+                self.rate_limiter,
+                getattr(self.converter, "index", None),
+            ),
+            daemon=True,
+        )
+        self._subscriber_process.start()
+
+    def stop_subscriber_process(self, timeout=5):
+        if self._subscriber_process is None:
+            return
+        self._subscriber_stop_event.set()
+        self._subscriber_process.join(timeout)
+        if self._subscriber_process.is_alive():
+            self._subscriber_process.terminate()
+
+        self._shared_market_data.close()
+        self._shared_market_data.unlink()
+        self._shared_market_data = None
+        self._subscriber_process = None
+
+    def _sync_shared_orderbooks(self):
+        """
+        copy orderbooks of newer versions from shared memory into data_store.
+        """
+        data_store = self.data_store
+        for sai_symbol in self._shared_market_data.sai_symbols:
+            version, _ = data_store.orderbook_entries.get(sai_symbol, (0, None))
+            entry = self._shared_market_data.read_orderbook(sai_symbol, version)
+            if entry is None:
+                continue
+
+            version, orderbook = entry
+            if not data_store.compact_orderbook:
+                orderbook = {
+                    Consts.BIDS: list(orderbook.bids),
+                    Consts.ASKS: list(orderbook.asks),
+                }
+            data_store.orderbook_entries[sai_symbol] = (version, orderbook)
+            data_store.orderbook_queue[sai_symbol] = orderbook
+            data_store.orderbook_averages.mark_dirty(sai_symbol)
+
+    def start_recording(self, directory, **options):
+        """
+        record raw frames of the subscriber, replay them by recorder.FrameReplayer.
+        """
+        self._subscriber.start_recording(directory, **options)
+
+    def stop_recording(self):
+        self._subscriber.stop_recording()
+
+    def get_subscriber_stats(self):
+        """
+        streams, messages and message rate of each websocket connection
+        """
+        return ExchangeResult(True, self._subscriber.shard_stats())
+
+    def get_handler_stats(self):
+        """
+        count, errors and handling seconds of each websocket event type
+        """
+        return ExchangeResult(True, self._subscriber.handler_stats())
+
+    def start_orderbook_watchdog(
+        self, stale_seconds=Consts.STALE_SECONDS, interval=None
+    ):
+        """
+        orderbooks not stored in stale_seconds are resubscribed by the subscriber.
+        """
+        self._subscriber.start_watchdog(stale_seconds, interval)
+
+    def get_stale_orderbooks(self, stale_seconds=Consts.STALE_SECONDS):
+        stale_symbols = self._subscriber.get_stale_symbols(stale_seconds)
+        # the same conversion as get_stale_symbols of the subscriber.
+        sai_symbols = [
+            self.converter.exchange_to_sai_subscriber(symbol.upper())
+            for symbol in stale_symbols
+        ]
+        return ExchangeResult(True, sai_symbols)
+
+    async def wait_orderbook(self, sai_symbol, timeout=None):
+        return await self._subscriber.wait_orderbook(sai_symbol, timeout)
+
+    def set_subscribe_ticker(self):
+        """
+        keep the ticker table of all symbols updated by the subscriber.
+        """
+        self._subscriber.subscribe_ticker()
+
+    def refresh_tickers(self):
+        """
+        fill the ticker table of all symbols by a request.
+        """
+        return ExchangeResult(
+            False,
+            message=WarningMessage.NOT_SUPPORTED.format(
+                name=self.name, function_name="refresh_tickers"
+            ),
+        )
+
+    def start_ticker_refresher(self, interval=Consts.TICKER_REFRESH_INTERVAL):
+        """
+        refresh_tickers every interval seconds in a daemon thread until close().
+        """
+        if self._ticker_refresher is not None:
+            return
+
+        def refresh():
+            while not self._ticker_refresher_stop.is_set():
+                result_object = self.refresh_tickers()
+                if not result_object.success:
+                    self.base_logger.debug(
+                        f"{self.name}::: refresh_tickers error, "
+                        f"[{result_object.message}]"
+                    )
+                self._ticker_refresher_stop.wait(interval)
+
+        self._ticker_refresher = threading.Thread(target=refresh, daemon=True)
+        self._ticker_refresher.start()
+
+    def get_ticker_price(self, sai_symbol, max_age=Consts.TICKER_STALE_SECONDS):
+        return self.data_store.get_ticker_price(sai_symbol, max_age)
+
+    async def wait_candle(self, sai_symbol, timeout=None):
+        return await self._subscriber.wait_candle(sai_symbol, timeout)
+
+    def set_subscribe_candle(self, sai_symbol_list, intervals=Consts.CANDLE_INTERVALS):
+        """
+        only the base interval is subscribed, higher intervals are derived from it.
+        """
         self.base_logger.debug(
             DebugMessage.ENTRANCE.format(
                 name=self.name, fn="set_subscribe_candle", data=str(locals())
@@ -244,6 +1306,7 @@ class BaseExchange(object):
             map(self.converter.sai_to_exchange_subscriber, sai_symbol_list)
         )
         self._subscriber.set_candle_symbol_set(exchange_symbols)
+        self._subscriber.set_candle_intervals(intervals)
         self._subscriber.subscribe_candle()
 
     def set_subscribe_orderbook(self, sai_symbol_list):
@@ -260,37 +1323,89 @@ class BaseExchange(object):
         self._subscriber.subscribe_orderbook()
 
     def get_orderbook(self):
-        with self._lock_dic["orderbook"]:
-            self.base_logger.debug(
-                DebugMessage.ENTRANCE.format(
-                    name=self.name, fn="get_orderbook", data=str(locals())
-                )
+        self.base_logger.debug(
+            DebugMessage.ENTRANCE.format(
+                name=self.name, fn="get_orderbook", data=str(locals())
+            )
+        )
+        if self._shared_market_data is not None:
+            self._sync_shared_orderbooks()
+        self.data_store.sync_orderbooks()
+        # copy of the dict, receivers replace orderbooks instead of mutating them.
+        orderbooks = dict(self.data_store.orderbook_queue)
+        if not orderbooks:
+            return ExchangeResult(
+                False,
+                message=WarningMessage.ORDERBOOK_NOT_STORED.format(name=self.name),
+                wait_time=5,
+            )
+
+        return ExchangeResult(True, orderbooks)
+
+    def get_orderbook_snapshot(self, sai_symbol_list=None):
+        """
+        OrderbookSnapshot of sai_symbol_list or all symbols, readable without any lock.
+        """
+        self.base_logger.debug(
+            DebugMessage.ENTRANCE.format(
+                name=self.name, fn="get_orderbook_snapshot", data=str(locals())
+            )
+        )
+        if self._shared_market_data is not None:
+            self._sync_shared_orderbooks()
+        self.data_store.sync_orderbooks()
+        entries = dict(self.data_store.orderbook_entries)
+        if sai_symbol_list is not None:
+            entries = {
+                sai_symbol: entries[sai_symbol]
+                for sai_symbol in sai_symbol_list
+                if sai_symbol in entries
+            }
+
+        if not entries:
+            return ExchangeResult(
+                False,
+                message=WarningMessage.ORDERBOOK_NOT_STORED.format(name=self.name),
+                wait_time=5,
             )
-            orderbooks = self.data_store.orderbook_queue
-            if not orderbooks:
-                return ExchangeResult(
-                    False,
-                    message=WarningMessage.ORDERBOOK_NOT_STORED.format(name=self.name),
-                    wait_time=5,
-                )
 
-            return ExchangeResult(True, orderbooks)
+        return ExchangeResult(True, OrderbookSnapshot(entries))
 
-    def get_candle(self, sai_symbol):
+    def get_candle(self, sai_symbol, interval=Consts.CANDLE_BASE_INTERVAL):
+        """
+        [[open, high, low, close, volume, timestamp], ..] from the oldest candle,
+        prices and volume are Decimals, timestamp is an int.
+        """
         self.base_logger.debug(
             DebugMessage.ENTRANCE.format(
                 name=self.name, fn="get_candle", data=str(locals())
             )
         )
-        with self._lock_dic["candle"]:
-            candles = self.data_store.candle_queue.get(sai_symbol, None)
-            if candles is None:
-                return ExchangeResult(
-                    False,
-                    message=WarningMessage.CANDLE_NOT_STORED.format(name=self.name),
-                    wait_time=1,
-                )
-            return ExchangeResult(True, candles)
+        result = self.get_candle_series(sai_symbol, interval)
+        if result.success:
+            result.data = result.data.decimal_rows()
+        return result
+
+    def get_candle_series(self, sai_symbol, interval=Consts.CANDLE_BASE_INTERVAL):
+        """
+        copy of the CandleSeries, a column of it by series["close"].
+        values are float64, get_candle returns them as Decimals.
+        receivers keep updating the stored series, so it is copied under the lock.
+        """
+        with self._lock_dic[Consts.CANDLE]:
+            if self._shared_market_data is not None:
+                candles = self._shared_market_data.read_candle(sai_symbol, interval)
+            else:
+                self.data_store.sync_candle(sai_symbol, interval)
+                series = self.data_store.candle_queue.get((sai_symbol, interval))
+                candles = None if series is None else series.copy()
+        if candles is None:
+            return ExchangeResult(
+                False,
+                message=WarningMessage.CANDLE_NOT_STORED.format(name=self.name),
+                wait_time=1,
+            )
+        return ExchangeResult(True, candles)
 
     async def get_curr_avg_orderbook(self, btc_sum=1.0):
         """
@@ -301,32 +1416,9 @@ class BaseExchange(object):
         if not orderbook_result.success:
             return orderbook_result
 
-        data_store_orderbook = orderbook_result.data
-        average_orderbook = dict()
-        for sai_symbol, orderbook_items in data_store_orderbook.items():
-            orderbooks = data_store_orderbook.get(sai_symbol, None)
-            if not orderbooks:
-                continue
-
-            average_orderbook[sai_symbol] = dict()
-
-            for order_type in [Consts.ASKS, Consts.BIDS]:
-                total_amount, total_price = decimal.Decimal(0), decimal.Decimal(0)
-                for data in orderbook_items[order_type]:
-                    price, amount = data
-
-                    total_price += price * amount
-                    total_amount += amount
-
-                    if total_price > btc_sum:
-                        break
-
-                try:
-                    average_orderbook[sai_symbol][order_type] = (
-                        total_price / total_amount
-                    )
-                except decimal.InvalidOperation:
-                    average_orderbook[sai_symbol][order_type] = decimal.Decimal(0)
+        average_orderbook = self.data_store.orderbook_averages.get(
+            orderbook_result.data, btc_sum
+        )
         if not average_orderbook:
             return ExchangeResult(success=False, message="")
         else:
@@ -348,9 +1440,9 @@ class BaseExchange(object):
     def _get_result(self, response, path, extra, fn, error_key=error_key):
         try:
             if isinstance(response, requests.models.Response):
-                result = response.json()
+                result = self._loads(response.content)
             else:
-                result = json.loads(response)
+                result = self._loads(response)
         except:
             self.base_logger.debug(DebugMessage.FATAL.format(name=self.name, fn=fn))
             return ExchangeResult(
@@ -372,19 +1464,83 @@ class BaseExchange(object):
         else:
             return ExchangeResult(success=False, message=error)
 
+    def _wait_rate_limit(self, method, path, extra):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(method, path, extra)
+
+    async def _async_wait_rate_limit(self, method, path, extra):
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(method, path, extra)
+
+    def _update_rate_limit(self, status, headers):
+        if self.rate_limiter is not None:
+            self.rate_limiter.update(status, headers)
+
+    def get_rate_limit_stats(self):
+        """
+        remaining budget of each bucket and time spent waiting, see RateLimiter.stats
+        """
+        if self.rate_limiter is None:
+            return dict()
+        return self.rate_limiter.stats()
+
+    def _coalesce(self, method, path, extra, request):
+        """
+        request(), a function which returns ExchangeResult, is shared by concurrent
+        identical GETs, each caller of a shared request gets a deep copy of the data
+        so callers can mutate what they got.
+        """
+        if method != "GET":
+            return request()
+        return self._single_flight.do(
+            _flight_key(method, path, extra), request, _copy_result
+        )
+
+    async def _async_coalesce(self, method, path, extra, request):
+        if method != "GET":
+            return await request()
+        return await self._single_flight.do_async(
+            _flight_key(method, path, extra), request, _copy_result
+        )
+
+    def get_coalescing_stats(self):
+        """
+        {calls, collapsed, in_flight} of GETs, collapsed calls shared another request.
+        """
+        return self._single_flight.stats()
+
     def _public_api(self, path, extra):
         if extra is None:
             extra = dict()
 
-        request = requests.get(self.base_url + path, params=extra)
+        return self._coalesce(
+            "GET", path, extra, functools.partial(self._send_public_api, path, extra)
+        )
+
+    def _send_public_api(self, path, extra):
+        self._wait_rate_limit("GET", path, extra)
+        request = self._session.get(
+            self.base_url + path, params=extra, timeout=self._timeout
+        )
+        self._update_rate_limit(request.status_code, request.headers)
         return self._get_result(request, path, extra, fn="_public_api")
 
     async def _async_pubilc_api(self, path, extra=None):
         if extra is None:
             extra = dict()
 
-        async with aiohttp.ClientSession() as session:
-            rq = await session.get(self.base_url + path, params=extra)
+        return await self._async_coalesce(
+            "GET",
+            path,
+            extra,
+            functools.partial(self._async_send_public_api, path, extra),
+        )
+
+    async def _async_send_public_api(self, path, extra):
+        await self._async_wait_rate_limit("GET", path, extra)
+        session = await self._async_session.get()
+        async with session.get(self.base_url + path, params=extra) as rq:
+            self._update_rate_limit(rq.status, rq.headers)
             result_text = await rq.text()
 
-            return self._get_result(result_text, path, extra, fn="_async_public_api")
+        return self._get_result(result_text, path, extra, fn="_async_public_api")
@@ -0,0 +1,469 @@
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import deque, OrderedDict
+from collections.abc import Mapping
+from decimal import Context, Decimal, InvalidOperation, localcontext
+from itertools import accumulate
+from operator import mul
+from threading import Lock
+
+from Exchanges.settings import Consts
+
+
+class OrderbookSide(object):
+    """
+    price levels of one side, {price: amount} with prices sorted ascending.
+    an amount update of an existing level is a dict assignment. inserting or
+    deleting a level finds it by O(log n) binary search but shifts the sorted
+    list, which is O(n). books are at most ORDERBOOK_SNAPSHOT_LIMITATION levels,
+    so the shift is one memmove, and no sorted container dependency is needed.
+    """
+
+    def __init__(self, descending=False):
+        self._descending = descending
+        self._amounts = dict()
+        self._prices = list()
+
+    def __len__(self):
+        return len(self._prices)
+
+    def clear(self):
+        self._amounts.clear()
+        self._prices.clear()
+
+    def update(self, price, amount):
+        if not amount:
+            if price in self._amounts:
+                del self._amounts[price]
+                del self._prices[bisect_left(self._prices, price)]
+            return
+
+        if price not in self._amounts:
+            insort(self._prices, price)
+        self._amounts[price] = amount
+
+    def levels(self, depth=None):
+        """
+        [[price, amount], ..] from the best price
+        """
+        if self._descending:
+            start = 0 if depth is None else max(len(self._prices) - depth, 0)
+            prices = reversed(self._prices[start:])
+        else:
+            prices = self._prices if depth is None else self._prices[:depth]
+
+        return [[price, self._amounts[price]] for price in prices]
+
+
+class LocalOrderbook(object):
+    """
+    local order book of a symbol maintained by a REST snapshot and diff-depth events.
+
+    1. events are buffered until the snapshot is applied.
+    2. events with u <= lastUpdateId are already in the snapshot and dropped.
+    3. each event should satisfy U <= last_update_id + 1 <= u,
+        otherwise an event is missed and the book should be resynced.
+    4. amount 0 means the level is removed.
+
+    compact: levels are kept as fixed point CompactOrderbookSides instead of
+        Decimals, to_compact slices them without converting every level.
+    """
+
+    def __init__(self, symbol, compact=False):
+        self.symbol = symbol
+        self.compact = compact
+        self.last_update_id = None
+        self.synced = False
+        self.snapshot_requested = False
+
+        self._context = Context(prec=8)
+        if compact:
+            self._bids = CompactOrderbookSide(descending=True)
+            self._asks = CompactOrderbookSide()
+        else:
+            self._bids = OrderbookSide(descending=True)
+            self._asks = OrderbookSide()
+        self._buffer = deque(maxlen=Consts.ORDERBOOK_BUFFER_LIMITATION)
+
+    def buffer(self, event):
+        self._buffer.append(event)
+
+    def reset(self):
+        self._bids.clear()
+        self._asks.clear()
+        self.last_update_id = None
+        self.synced = False
+        self.snapshot_requested = False
+
+    def apply_snapshot(self, snapshot):
+        """
+        snapshot: response of /api/v3/depth
+        return False if buffered events can not be continued from the snapshot.
+        """
+        self._bids.clear()
+        self._asks.clear()
+        self._set_levels(self._bids, snapshot["bids"])
+        self._set_levels(self._asks, snapshot["asks"])
+        self.last_update_id = snapshot["lastUpdateId"]
+        self.synced = True
+
+        while self._buffer:
+            event = self._buffer.popleft()
+            if not self.apply_diff(event):
+                self._buffer.appendleft(event)
+                self.reset()
+                return False
+
+        return True
+
+    def apply_diff(self, event):
+        """
+        event: <symbol>@depth message
+        return False if a gap is detected.
+        """
+        if event["u"] <= self.last_update_id:
+            return True
+
+        if event["U"] > self.last_update_id + 1:
+            return False
+
+        self._set_levels(self._bids, event["b"])
+        self._set_levels(self._asks, event["a"])
+        self.last_update_id = event["u"]
+
+        return True
+
+    def to_dict(self, depth=Consts.ORDERBOOK_LIMITATION):
+        return {
+            Consts.BIDS: self._bids.levels(depth),
+            Consts.ASKS: self._asks.levels(depth),
+        }
+
+    def to_compact(self, depth=Consts.ORDERBOOK_LIMITATION):
+        if self.compact:
+            return CompactOrderbook(self._bids.head(depth), self._asks.head(depth))
+        return CompactOrderbook.from_levels(
+            self._bids.levels(depth), self._asks.levels(depth)
+        )
+
+    def _set_levels(self, side, levels):
+        if self.compact:
+            for price, amount in levels:
+                side.update(to_fixed_point(price), to_fixed_point(amount))
+            return
+
+        for price, amount in levels:
+            side.update(
+                self._context.create_decimal(price),
+                self._context.create_decimal(amount),
+            )
+
+
+FIXED_POINT_DIGITS = 8
+FIXED_POINT_SCALE = 10 ** FIXED_POINT_DIGITS
+
+
+def to_fixed_point(value):
+    """
+    Decimal or str -> int scaled by 10 ** FIXED_POINT_DIGITS
+    """
+    return int(Decimal(value).scaleb(FIXED_POINT_DIGITS))
+
+
+def from_fixed_point(value):
+    return Decimal(value).scaleb(-FIXED_POINT_DIGITS)
+
+
+class CompactOrderbookSide(object):
+    """
+    prices and amounts of one side as fixed point int64 arrays, from the best price.
+    iterating yields [Decimal price, Decimal amount] like a list of levels,
+    prices and amounts are exposed for integer depth walks.
+
+    a side of LocalOrderbook is updated in place, published sides are heads
+    of it and never updated.
+    descending: prices are from the highest, bids
+    """
+
+    __slots__ = ("prices", "amounts", "descending", "_cumulative")
+
+    def __init__(self, prices=None, amounts=None, descending=False):
+        self.prices = array("q") if prices is None else prices
+        self.amounts = array("q") if amounts is None else amounts
+        self.descending = descending
+        self._cumulative = None
+
+    def clear(self):
+        del self.prices[:]
+        del self.amounts[:]
+        self._cumulative = None
+
+    def _find(self, price):
+        if not self.descending:
+            return bisect_left(self.prices, price)
+
+        low, high = 0, len(self.prices)
+        while low < high:
+            middle = (low + high) // 2
+            if self.prices[middle] > price:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def update(self, price, amount):
+        """
+        price, amount: fixed point, amount 0 means the level is removed.
+        """
+        index = self._find(price)
+        found = index < len(self.prices) and self.prices[index] == price
+        if not amount:
+            if found:
+                del self.prices[index]
+                del self.amounts[index]
+        elif found:
+            self.amounts[index] = amount
+        else:
+            self.prices.insert(index, price)
+            self.amounts.insert(index, amount)
+        self._cumulative = None
+
+    def head(self, depth=None):
+        """
+        new side of the best depth levels, copied by slicing the arrays.
+        """
+        return CompactOrderbookSide(
+            self.prices[:depth], self.amounts[:depth], self.descending
+        )
+
+    def levels(self, depth=None):
+        return self[:depth]
+
+    def cumulative_until(self, limit):
+        """
+        (notional, amount) summed from the best price until notional exceeds limit,
+        the level that exceeds limit is included.
+        notional is scaled by FIXED_POINT_SCALE ** 2, amount by FIXED_POINT_SCALE.
+        cumulative sums are computed once for a published side.
+        """
+        if not self.prices:
+            return 0, 0
+
+        if self._cumulative is None:
+            self._cumulative = (
+                list(accumulate(map(mul, self.prices, self.amounts))),
+                list(accumulate(self.amounts)),
+            )
+        cumulative_notional, cumulative_amount = self._cumulative
+
+        last = min(
+            bisect_right(cumulative_notional, limit), len(cumulative_notional) - 1
+        )
+        return cumulative_notional[last], cumulative_amount[last]
+
+    @classmethod
+    def from_levels(cls, levels):
+        side = cls()
+        for price, amount in levels:
+            side.prices.append(to_fixed_point(price))
+            side.amounts.append(to_fixed_point(amount))
+        return side
+
+    def __len__(self):
+        return len(self.prices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return [
+            from_fixed_point(self.prices[index]),
+            from_fixed_point(self.amounts[index]),
+        ]
+
+    def __iter__(self):
+        for price, amount in zip(self.prices, self.amounts):
+            yield [from_fixed_point(price), from_fixed_point(amount)]
+
+
+class CompactOrderbook(Mapping):
+    """
+    opt-in replacement of {bids: [[price, amount], ..], asks: [[price, amount], ..]}.
+    a level costs 16 bytes instead of a list of two Decimals,
+    and readers still get Decimals by book[Consts.BIDS].
+    """
+
+    __slots__ = ("bids", "asks")
+
+    def __init__(self, bids=None, asks=None):
+        self.bids = CompactOrderbookSide() if bids is None else bids
+        self.asks = CompactOrderbookSide() if asks is None else asks
+
+    @classmethod
+    def from_levels(cls, bids, asks):
+        return cls(
+            CompactOrderbookSide.from_levels(bids),
+            CompactOrderbookSide.from_levels(asks),
+        )
+
+    def __getitem__(self, key):
+        if key == Consts.BIDS:
+            return self.bids
+        elif key == Consts.ASKS:
+            return self.asks
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter((Consts.BIDS, Consts.ASKS))
+
+    def __len__(self):
+        return 2
+
+
+def _compact_average_price(side, limit, context):
+    total_notional, total_amount = side.cumulative_until(limit)
+    if not total_amount:
+        return Decimal(0)
+    return context.divide(
+        Decimal(total_notional), Decimal(total_amount * FIXED_POINT_SCALE)
+    )
+
+
+def average_prices(orderbooks, btc_sum=1.0):
+    """
+    average price of each side until the sum of price * amount exceeds btc_sum,
+    the level that exceeds btc_sum is included.
+
+    CompactOrderbook sides find the cutoff level by binary search over their
+    cumulative notional, list sides are walked level by level inline.
+
+    orderbooks: {sai_symbol: {bids: [[price, amount], ..], asks: ..}}
+        or {sai_symbol: CompactOrderbook}
+    return: {sai_symbol: {asks: Decimal, bids: Decimal}}
+    """
+    context = Context(prec=8)
+    limit = to_fixed_point(btc_sum) * FIXED_POINT_SCALE
+
+    average_orderbook = dict()
+    with localcontext(context):
+        for sai_symbol, orderbook in orderbooks.items():
+            if not orderbook:
+                continue
+
+            if isinstance(orderbook[Consts.ASKS], CompactOrderbookSide):
+                average_orderbook[sai_symbol] = {
+                    order_type: _compact_average_price(
+                        orderbook[order_type], limit, context
+                    )
+                    for order_type in [Consts.ASKS, Consts.BIDS]
+                }
+                continue
+
+            averages = average_orderbook[sai_symbol] = dict()
+            for order_type in [Consts.ASKS, Consts.BIDS]:
+                total_amount, total_price = Decimal(0), Decimal(0)
+                for price, amount in orderbook[order_type]:
+                    total_price += price * amount
+                    total_amount += amount
+
+                    if total_price > btc_sum:
+                        break
+                try:
+                    averages[order_type] = total_price / total_amount
+                except InvalidOperation:
+                    averages[order_type] = Decimal(0)
+
+    return average_orderbook
+
+
+class _AverageTable(object):
+    __slots__ = ("lock", "table", "dirty_set")
+
+    def __init__(self):
+        # held while the table is recomputed, other btc_sums are not blocked.
+        self.lock = Lock()
+        self.table = None
+        self.dirty_set = set()
+
+
+class AverageOrderbookCache(object):
+    """
+    average_prices table of each btc_sum, only dirty symbols are recomputed.
+    subscribers mark a symbol dirty whenever its orderbook is stored.
+
+    the stored table is updated in place under the lock of its btc_sum and
+    callers get one copy of it. the least recently used btc_sum is dropped
+    beyond max_size tables.
+    """
+
+    def __init__(self, max_size=Consts.AVERAGE_ORDERBOOK_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = Lock()
+        self._tables = OrderedDict()
+
+    def mark_dirty(self, sai_symbol):
+        with self._lock:
+            for entry in self._tables.values():
+                entry.dirty_set.add(sai_symbol)
+
+    def _get_entry(self, btc_sum):
+        with self._lock:
+            entry = self._tables.get(btc_sum)
+            if entry is None:
+                entry = self._tables[btc_sum] = _AverageTable()
+                if len(self._tables) > self.max_size:
+                    self._tables.popitem(last=False)
+            else:
+                self._tables.move_to_end(btc_sum)
+            return entry
+
+    def get(self, orderbooks, btc_sum=1.0):
+        entry = self._get_entry(btc_sum)
+        with entry.lock:
+            with self._lock:
+                dirty_set, entry.dirty_set = entry.dirty_set, set()
+
+            if entry.table is None:
+                entry.table = average_prices(orderbooks, btc_sum)
+            elif dirty_set:
+                dirty_orderbooks = dict()
+                for sai_symbol in dirty_set:
+                    orderbook = orderbooks.get(sai_symbol)
+                    if orderbook:
+                        dirty_orderbooks[sai_symbol] = orderbook
+                    else:
+                        entry.table.pop(sai_symbol, None)
+                entry.table.update(average_prices(dirty_orderbooks, btc_sum))
+
+            return dict(entry.table)
+
+
+class OrderbookSnapshot(Mapping):
+    """
+    immutable view of stored orderbooks, {sai_symbol: orderbook}.
+    published orderbooks are never mutated, so a snapshot is consistent
+    without holding the lock of the receiver.
+
+    versions: {sai_symbol: version}, version increases on every stored orderbook.
+    """
+
+    __slots__ = ("_orderbooks", "versions")
+
+    def __init__(self, entries):
+        """
+        entries: {sai_symbol: (version, orderbook)}
+        """
+        self._orderbooks = {
+            sai_symbol: orderbook for sai_symbol, (_, orderbook) in entries.items()
+        }
+        self.versions = {
+            sai_symbol: version for sai_symbol, (version, _) in entries.items()
+        }
+
+    def __getitem__(self, sai_symbol):
+        return self._orderbooks[sai_symbol]
+
+    def __iter__(self):
+        return iter(self._orderbooks)
+
+    def __len__(self):
+        return len(self._orderbooks)
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket(object):
+    """
+    limit tokens refilled evenly over interval seconds.
+    a reservation may take the bucket below zero, the caller waits for the debt,
+    so concurrent callers are queued in the order they reserved.
+    """
+
+    def __init__(self, limit, interval):
+        self.limit = limit
+        self.interval = interval
+        self.rate = limit / interval
+        self.tokens = float(limit)
+        self.server_used = None
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.limit, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount, now):
+        """
+        return seconds to wait before amount is available.
+        """
+        self._refill(now)
+        self.tokens -= amount
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+    def calibrate(self, used, now):
+        """
+        used: weight the server counted in its current window,
+            tokens are never more than what the server still allows.
+        """
+        self._refill(now)
+        self.server_used = used
+        self.tokens = min(self.tokens, self.limit - used)
+
+    def drain(self, seconds, now):
+        """
+        nothing is available for seconds, on 429 or 418 with Retry-After.
+        """
+        self._refill(now)
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def available(self, now):
+        self._refill(now)
+        return self.tokens
+
+
+class RateLimiter(object):
+    """
+    request budget of an exchange shared by threads and event loops.
+
+    buckets: {name: TokenBucket}
+    cost: function(method, path, params) -> {bucket name: amount}
+    used_headers: {response header: bucket name}, used weight the server reports
+        calibrates the bucket, e.g. X-MBX-USED-WEIGHT-1M of Binance
+    """
+
+    def __init__(self, buckets, cost, used_headers=None):
+        self.buckets = buckets
+        self.cost = cost
+        self.used_headers = used_headers or dict()
+
+        self._lock = threading.Lock()
+        self._waits = 0
+        self._waited_seconds = 0.0
+        self._retry_afters = 0
+
+    def __getstate__(self):
+        # a subscriber process gets a copy of the buckets, the lock is not shared.
+        # both processes calibrate by the weight the server counts for the ip.
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def reserve(self, method, path, params=None):
+        now = time.monotonic()
+        costs = self.cost(method, path, params or dict())
+        with self._lock:
+            waits = [
+                self.buckets[name].reserve(amount, now)
+                for name, amount in costs.items()
+            ]
+            wait = max(waits, default=0)
+            if wait:
+                self._waits += 1
+                self._waited_seconds += wait
+        return wait
+
+    def acquire(self, method, path, params=None):
+        """
+        block the thread until the request can be sent.
+        """
+        wait = self.reserve(method, path, params)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, method, path, params=None):
+        wait = self.reserve(method, path, params)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def update(self, status, headers):
+        """
+        status, headers: of the response, calibrate buckets by used weight headers
+            and stop every bucket for Retry-After seconds when banned.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for header, name in self.used_headers.items():
+                used = headers.get(header)
+                if used is not None:
+                    self.buckets[name].calibrate(int(used), now)
+
+            if status in (418, 429):
+                retry_after = int(headers.get("Retry-After") or 1)
+                self._retry_afters += 1
+                for bucket in self.buckets.values():
+                    bucket.drain(retry_after, now)
+
+    def stats(self):
+        """
+        {buckets: {name: {limit, available, server_used}}, waits, waited_seconds,
+            retry_afters}
+        """
+        now = time.monotonic()
+        with self._lock:
+            buckets = {
+                name: {
+                    "limit": bucket.limit,
+                    "available": bucket.available(now),
+                    "server_used": bucket.server_used,
+                }
+                for name, bucket in self.buckets.items()
+            }
+            return {
+                "buckets": buckets,
+                "waits": self._waits,
+                "waited_seconds": self._waited_seconds,
+                "retry_afters": self._retry_afters,
+            }
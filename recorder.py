@@ -0,0 +1,211 @@
+"""
+record of raw websocket frames and orderbook snapshots into segmented gzip logs,
+and a replay of them through on_message of a subscriber without network.
+
+python -m Exchanges.recorder DIRECTORY [--speed SPEED]
+    replays a recording into BinanceSubscriber, max speed unless --speed is given.
+"""
+import argparse
+import gzip
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+
+from Exchanges.settings import Consts
+
+
+FRAME = 0
+SNAPSHOT = 1
+
+# kind, receive time, key length, payload length
+RECORD_HEADER = struct.Struct("<BdHI")
+SEGMENT_PREFIX = "frames-"
+SEGMENT_SUFFIX = ".gz"
+
+
+def _segment_paths(directory):
+    names = [
+        name
+        for name in os.listdir(directory)
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+    ]
+    return [os.path.join(directory, name) for name in sorted(names)]
+
+
+class FrameRecorder(object):
+    """
+    append-only log of received frames, a new segment is started on every start
+    and whenever segment_size bytes are written to the current one.
+    frames are written by a background thread, record() only puts them in a queue.
+    """
+
+    def __init__(
+        self,
+        directory,
+        segment_size=Consts.RECORD_SEGMENT_SIZE,
+        compresslevel=Consts.RECORD_COMPRESS_LEVEL,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_size = segment_size
+        self.compresslevel = compresslevel
+        self.records = 0
+
+        paths = _segment_paths(directory)
+        if paths:
+            name = os.path.basename(paths[-1])
+            self._segment_index = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+        else:
+            self._segment_index = 0
+        self._file = None
+        self._written = 0
+
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write_forever, daemon=True)
+        self._thread.start()
+
+    def record(self, frame, key=str()):
+        self._queue.put((FRAME, time.time(), key, frame))
+
+    def record_snapshot(self, key, payload):
+        """
+        key: symbol of the snapshot, payload: raw body of the REST response
+        """
+        self._queue.put((SNAPSHOT, time.time(), key, payload))
+
+    def _open_segment(self):
+        if self._file is not None:
+            self._file.close()
+        self._segment_index += 1
+        path = os.path.join(
+            self.directory,
+            f"{SEGMENT_PREFIX}{self._segment_index:06d}{SEGMENT_SUFFIX}",
+        )
+        self._file = gzip.open(path, "wb", compresslevel=self.compresslevel)
+        self._written = 0
+
+    def _write_forever(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            kind, received_time, key, payload = item
+            if isinstance(payload, str):
+                payload = payload.encode()
+            key = key.encode()
+
+            if self._file is None or self._written >= self.segment_size:
+                self._open_segment()
+            self._file.write(
+                RECORD_HEADER.pack(kind, received_time, len(key), len(payload))
+            )
+            self._file.write(key)
+            self._file.write(payload)
+            self._written += RECORD_HEADER.size + len(key) + len(payload)
+            self.records += 1
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        """
+        flush queued frames and close the current segment.
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+
+def read_records(directory):
+    """
+    (kind, receive time, key, payload) of every segment in order,
+    a segment truncated by a crash is read until the last complete record.
+    """
+    for path in _segment_paths(directory):
+        with gzip.open(path, "rb") as file:
+            while True:
+                try:
+                    header = file.read(RECORD_HEADER.size)
+                    if len(header) < RECORD_HEADER.size:
+                        break
+                    kind, received_time, key_size, payload_size = RECORD_HEADER.unpack(
+                        header
+                    )
+                    key = file.read(key_size).decode()
+                    payload = file.read(payload_size)
+                except (EOFError, OSError):
+                    break
+                if len(payload) < payload_size:
+                    break
+                yield kind, received_time, key, payload
+
+
+class FrameReplayer(object):
+    """
+    feeds a recording to subscriber.on_message like frames of the websocket.
+    speed: 1 is real time, 10 is ten times faster, None is as fast as possible.
+    """
+
+    def __init__(self, directory, speed=None):
+        self.directory = directory
+        self.speed = speed
+
+    def replay(self, subscriber):
+        """
+        recorded snapshots are given to subscriber.on_snapshot and the subscriber
+        does not request snapshots itself.
+        return {frames, snapshots, seconds, rate}
+        """
+        subscriber.fetch_snapshot = False
+        frames, snapshots = 0, 0
+        first_time, start = None, time.perf_counter()
+        for kind, received_time, key, payload in read_records(self.directory):
+            if self.speed:
+                if first_time is None:
+                    first_time = received_time
+                delay = (received_time - first_time) / self.speed - (
+                    time.perf_counter() - start
+                )
+                if delay > 0:
+                    time.sleep(delay)
+
+            if kind == SNAPSHOT:
+                subscriber.on_snapshot(key, subscriber.loads(payload))
+                snapshots += 1
+            else:
+                subscriber.on_message(None, payload)
+                frames += 1
+
+        seconds = time.perf_counter() - start
+        return {
+            "frames": frames,
+            "snapshots": snapshots,
+            "seconds": seconds,
+            "rate": frames / seconds if seconds else 0,
+        }
+
+
+def main(argv=None):
+    from Exchanges.objects import DataStore
+    from Exchanges.binance.binance import BinanceSubscriber
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("directory")
+    parser.add_argument("--speed", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    lock_dic = {Consts.ORDERBOOK: threading.Lock(), Consts.CANDLE: threading.Lock()}
+    subscriber = BinanceSubscriber(DataStore(), lock_dic)
+    stats = FrameReplayer(args.directory, args.speed).replay(subscriber)
+    logging.info(
+        "frames={frames}, snapshots={snapshots}, {seconds:.3f}s, "
+        "{rate:.0f} frames/s".format(**stats)
+    )
+    logging.info("orderbooks={}".format(len(subscriber.data_store.orderbook_queue)))
+
+
+if __name__ == "__main__":
+    main()
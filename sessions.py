@@ -0,0 +1,115 @@
+import asyncio
+import aiohttp
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from Exchanges.settings import SessionConsts
+
+
+def create_session(
+    pool_size=SessionConsts.POOL_SIZE,
+    max_retries=SessionConsts.MAX_RETRIES,
+    backoff_factor=SessionConsts.BACKOFF_FACTOR,
+    headers=None,
+):
+    """
+    keep-alive session which reuses TCP+TLS connections of each exchange.
+
+    pool_size: number of kept connections per host
+    max_retries: retry count when the connection is reset or refused.
+        read errors are only retried on idempotent methods(GET, DELETE..),
+        so an order(POST) never be sent twice.
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=0,
+        backoff_factor=backoff_factor,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if headers:
+        session.headers.update(headers)
+
+    return session
+
+
+class AsyncSessionManager(object):
+    """
+    one long-lived aiohttp client of an exchange.
+    the client is created lazily in the running event loop and recreated
+    only when the loop is changed, so fan-outs by asyncio.gather reuse connections.
+    """
+
+    def __init__(
+        self,
+        limit_per_host=SessionConsts.LIMIT_PER_HOST,
+        dns_cache_ttl=SessionConsts.DNS_CACHE_TTL,
+        keepalive_timeout=SessionConsts.KEEPALIVE_TIMEOUT,
+        timeout=SessionConsts.TIMEOUT,
+    ):
+        self._limit_per_host = limit_per_host
+        self._dns_cache_ttl = dns_cache_ttl
+        self._keepalive_timeout = keepalive_timeout
+        connect_timeout, read_timeout = timeout
+        self._timeout = aiohttp.ClientTimeout(
+            sock_connect=connect_timeout, sock_read=read_timeout
+        )
+
+        self._session = None
+        self._loop = None
+
+    async def _close_other_loop(self):
+        """
+        close the session of the previous loop, its connections can not be reused
+        in this loop and it can be closed only in its own loop.
+        """
+        session, loop = self._session, self._loop
+        if session is None or session.closed:
+            return
+
+        if loop.is_running():
+            # the loop of another thread
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        elif loop.is_closed():
+            # closing marks the connector and the session closed without the loop,
+            # sockets left open by the closed loop are released when collected.
+            await session.close()
+        else:
+            # a stopped loop, the session is marked closed and its connections
+            # are released with the loop.
+            session.detach()
+
+    async def get(self):
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            await self._close_other_loop()
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self._limit_per_host,
+                ttl_dns_cache=self._dns_cache_ttl,
+                keepalive_timeout=self._keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self._timeout
+            )
+            self._loop = loop
+
+        return self._session
+
+    async def close(self):
+        if self._loop is asyncio.get_running_loop():
+            if not self._session.closed:
+                await self._session.close()
+        else:
+            await self._close_other_loop()
+        self._session = None
+        self._loop = None
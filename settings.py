@@ -38,6 +38,8 @@ class Tickets(object):
 
     ORDERBOOK = 10
     CANDLE = 20
+    RESUBSCRIBE = 30
+    TICKER = 40
 
 
 class Consts(object):
@@ -47,8 +49,29 @@ class Consts(object):
 
     MARKET = "market"
     LIMIT = "limit"
+    GET = "GET"
+    POST = "POST"
     CANDLE_LIMITATION = 100
+    CANDLE_BASE_INTERVAL = "1m"
+    CANDLE_INTERVALS = ("1m", "5m", "15m", "1h")
     ORDERBOOK_LIMITATION = 20
+    ORDERBOOK_SNAPSHOT_LIMITATION = 1000
+    ORDERBOOK_BUFFER_LIMITATION = 1000
+    ORDERBOOK_LOCK_STRIPES = 16
+    # threads fetching REST snapshots of orderbooks to resync
+    ORDERBOOK_SNAPSHOT_WORKERS = 4
+    # btc_sums of which average orderbooks are cached
+    AVERAGE_ORDERBOOK_CACHE_SIZE = 16
+    WEBSOCKET_CONNECT_TIMEOUT = 60
+    RECONNECT_BASE_DELAY = 1
+    RECONNECT_MAX_DELAY = 60
+    STALE_SECONDS = 30
+    TICKER_REFRESH_INTERVAL = 5
+    # max age of a price of the ticker table used to validate orders
+    TICKER_STALE_SECONDS = 15
+    MARKET_DATA_SOCKET_PATH = "/tmp/sai-market-data.sock"
+    RECORD_SEGMENT_SIZE = 64 * 1024 * 1024
+    RECORD_COMPRESS_LEVEL = 1
 
     CANDLE = "candle"
     ORDERBOOK = "orderbook"
@@ -66,6 +89,50 @@ class Consts(object):
     ASK_AMOUNT_KEY = "ask_amount"
 
 
+class SessionConsts(object):
+    """
+    default options of pooled http sessions of each exchange.
+    TIMEOUT: (connect, read) seconds
+    LIMIT_PER_HOST: max connections of async client per host
+    DNS_CACHE_TTL, KEEPALIVE_TIMEOUT: seconds
+    CONCURRENCY: max in-flight requests of a fan-out such as get_deposit_addrs
+    """
+
+    POOL_SIZE = 10
+    MAX_RETRIES = 3
+    BACKOFF_FACTOR = 0.1
+    TIMEOUT = (3.05, 10)
+
+    LIMIT_PER_HOST = 30
+    DNS_CACHE_TTL = 300
+    KEEPALIVE_TIMEOUT = 60
+
+    CONCURRENCY = 10
+
+
+class CacheConsts(object):
+    """
+    TTL: seconds cached data of each key is fresh
+    STALE_TTL: seconds expired data is still served while it is refreshed,
+        only with stale_while_revalidate of BaseExchange
+    MAX_SIZE: max symbols of per-symbol keys such as ticker
+    """
+
+    TTL = {
+        Consts.BALANCE: 5,
+        Consts.TICKER: 2,
+        Consts.DEPOSIT_ADDRESS: 60 * 60,
+        Consts.TRANSACTION_FEE: 10 * 60,
+    }
+    STALE_TTL = {
+        Consts.BALANCE: 5,
+        Consts.TICKER: 5,
+        Consts.DEPOSIT_ADDRESS: 24 * 60 * 60,
+        Consts.TRANSACTION_FEE: 60 * 60,
+    }
+    MAX_SIZE = 1024
+
+
 class BaseMarkets(object):
     BTC = "BTC"
     ETH = "ETH"
@@ -79,6 +146,22 @@ class BaseTradeType(object):
     SELL_LIMIT = "SELL_LIMIT"
 
 
+class WebsocketBackend(object):
+    THREAD = "thread"
+    ASYNCIO = "asyncio"
+
+
+class JsonDecoder(object):
+    """
+    AUTO: the fastest installed decoder, orjson > ujson > json
+    """
+
+    AUTO = "auto"
+    ORJSON = "orjson"
+    UJSON = "ujson"
+    JSON = "json"
+
+
 class SaiOrderStatus(object):
     OPEN = "open"
     ON_TRADING = "on_trading"
@@ -0,0 +1,283 @@
+"""
+market data published by a subscriber process into shared memory,
+read by other processes without pickling.
+"""
+import time
+
+from array import array
+from multiprocessing import shared_memory
+
+from Exchanges.settings import Consts
+from Exchanges.orderbooks import CompactOrderbook, CompactOrderbookSide
+from Exchanges.candles import CandleSeries
+
+
+ITEM_SIZE = 8
+KEY_SIZE = 32
+MAGIC = 0x5341492D4D4B54
+# magic, key count, column count, capacity
+HEADER_SIZE = 4
+
+
+def _attach_shared_memory(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before python 3.13 attaching registers the block to resource_tracker,
+        # a child process shares the tracker of the creator which unlinks it.
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedColumnTable(object):
+    """
+    fixed size columns of each key in a shared memory block,
+    written by a single process and read by any number of processes.
+
+    slot of a key: seq, length of each column, columns of capacity 8-byte items.
+    seqlock: the writer makes seq odd while it writes and even when it is done,
+    a reader copies the slot and retries if seq was odd or changed during the copy.
+    version of a slot is seq // 2, 0 means it is not written yet.
+    """
+
+    def __init__(self, shm, keys, typecodes, capacity):
+        self.shm = shm
+        self.keys = keys
+        self.typecodes = typecodes
+        self.capacity = capacity
+
+        self._buf = shm.buf
+        self._ints = shm.buf.cast("q")
+        self._slots = dict()
+        slot_size = self.slot_size(typecodes, capacity)
+        start = self.header_size(keys, typecodes)
+        for index, key in enumerate(keys):
+            self._slots[key] = start + index * slot_size
+
+    @staticmethod
+    def header_size(keys, typecodes):
+        return HEADER_SIZE + len(typecodes) + len(keys) * KEY_SIZE // ITEM_SIZE
+
+    @staticmethod
+    def slot_size(typecodes, capacity):
+        return 1 + len(typecodes) * (1 + capacity)
+
+    @classmethod
+    def create(cls, keys, typecodes, capacity, name=None):
+        keys = list(keys)
+        for key in keys:
+            if len(key.encode()) > KEY_SIZE:
+                raise ValueError(f"key [{key}] is longer than {KEY_SIZE} bytes")
+
+        items = cls.header_size(keys, typecodes) + len(keys) * cls.slot_size(
+            typecodes, capacity
+        )
+        shm = shared_memory.SharedMemory(name=name, create=True, size=items * ITEM_SIZE)
+
+        ints = shm.buf.cast("q")
+        ints[:HEADER_SIZE] = array("q", [MAGIC, len(keys), len(typecodes), capacity])
+        ints[HEADER_SIZE:HEADER_SIZE + len(typecodes)] = array(
+            "q", map(ord, typecodes)
+        )
+        ints.release()
+
+        start = (HEADER_SIZE + len(typecodes)) * ITEM_SIZE
+        for index, key in enumerate(keys):
+            encoded = key.encode()
+            offset = start + index * KEY_SIZE
+            shm.buf[offset:offset + len(encoded)] = encoded
+
+        return cls(shm, keys, typecodes, capacity)
+
+    @classmethod
+    def attach(cls, name):
+        shm = _attach_shared_memory(name)
+        ints = shm.buf.cast("q")
+        magic, key_count, column_count, capacity = ints[:HEADER_SIZE].tolist()
+        typecodes = "".join(
+            map(chr, ints[HEADER_SIZE:HEADER_SIZE + column_count].tolist())
+        )
+        ints.release()
+        if magic != MAGIC:
+            shm.close()
+            raise ValueError(f"[{name}] is not a SharedColumnTable")
+
+        start = (HEADER_SIZE + column_count) * ITEM_SIZE
+        keys = list()
+        for index in range(key_count):
+            offset = start + index * KEY_SIZE
+            keys.append(bytes(shm.buf[offset:offset + KEY_SIZE]).rstrip(b"\0").decode())
+
+        return cls(shm, keys, typecodes, capacity)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, key, columns):
+        """
+        columns: buffers of each column in typecodes, longer ones are truncated.
+        """
+        slot = self._slots[key]
+        ints, buf, capacity = self._ints, self._buf, self.capacity
+        data_start = slot + 1 + len(self.typecodes)
+
+        seq = ints[slot]
+        ints[slot] = seq + 1
+        for index, values in enumerate(columns):
+            length = min(len(values), capacity)
+            ints[slot + 1 + index] = length
+            start = (data_start + index * capacity) * ITEM_SIZE
+            buf[start:start + length * ITEM_SIZE] = memoryview(values)[:length].cast("B")
+        ints[slot] = seq + 2
+
+    def read(self, key, known_version=None):
+        """
+        (version, [array of each column]), None if the version is known_version.
+        """
+        slot = self._slots[key]
+        ints, buf, capacity = self._ints, self._buf, self.capacity
+        column_count = len(self.typecodes)
+        data_start = slot + 1 + column_count
+
+        while True:
+            seq = ints[slot]
+            if seq & 1:
+                # the writer is in the middle of an update.
+                time.sleep(0)
+                continue
+            if seq // 2 == known_version:
+                return None
+
+            lengths = ints[slot + 1:data_start].tolist()
+            columns = list()
+            for index, (typecode, length) in enumerate(zip(self.typecodes, lengths)):
+                start = (data_start + index * capacity) * ITEM_SIZE
+                column = array(typecode)
+                column.frombytes(buf[start:start + min(length, capacity) * ITEM_SIZE])
+                columns.append(column)
+
+            if ints[slot] == seq:
+                return seq // 2, columns
+
+    def close(self):
+        self._ints.release()
+        self._buf = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def candle_key(sai_symbol, interval):
+    return f"{sai_symbol}@{interval}"
+
+
+class SharedMarketData(object):
+    """
+    orderbooks and candles of symbols in shared memory.
+    the strategy process creates it, a subscriber process attaches to it by names
+    and publishes what it receives.
+
+    orderbook columns: bid prices, bid amounts, ask prices, ask amounts in fixed point
+    candle columns: CandleSeries.COLUMNS from the oldest candle
+    """
+
+    ORDERBOOK_TYPECODES = "qqqq"
+
+    def __init__(self, orderbooks, candles):
+        self.orderbooks = orderbooks
+        self.candles = candles
+
+    @classmethod
+    def create(
+        cls,
+        sai_symbol_list,
+        candle_list,
+        depth=Consts.ORDERBOOK_LIMITATION,
+        capacity=Consts.CANDLE_LIMITATION,
+    ):
+        """
+        candle_list: [(sai_symbol, interval), ..]
+        """
+        orderbooks = SharedColumnTable.create(
+            sai_symbol_list, cls.ORDERBOOK_TYPECODES, depth
+        )
+        candles = SharedColumnTable.create(
+            [candle_key(sai_symbol, interval) for sai_symbol, interval in candle_list],
+            "".join(typecode for _, typecode in CandleSeries.COLUMNS),
+            capacity,
+        )
+        return cls(orderbooks, candles)
+
+    @classmethod
+    def attach(cls, orderbook_name, candle_name):
+        return cls(
+            SharedColumnTable.attach(orderbook_name),
+            SharedColumnTable.attach(candle_name),
+        )
+
+    @property
+    def names(self):
+        return self.orderbooks.name, self.candles.name
+
+    @property
+    def sai_symbols(self):
+        return self.orderbooks.keys
+
+    def publish_orderbook(self, sai_symbol, orderbook):
+        if sai_symbol not in self.orderbooks.keys:
+            return
+        if not isinstance(orderbook, CompactOrderbook):
+            orderbook = CompactOrderbook.from_levels(
+                orderbook[Consts.BIDS], orderbook[Consts.ASKS]
+            )
+        self.orderbooks.write(
+            sai_symbol,
+            [
+                orderbook.bids.prices,
+                orderbook.bids.amounts,
+                orderbook.asks.prices,
+                orderbook.asks.amounts,
+            ],
+        )
+
+    def publish_candle(self, sai_symbol, interval, series):
+        key = candle_key(sai_symbol, interval)
+        if key not in self.candles.keys:
+            return
+        self.candles.write(key, [series.column(name) for name, _ in series.COLUMNS])
+
+    def read_orderbook(self, sai_symbol, known_version=None):
+        """
+        (version, CompactOrderbook), None if it is not published
+        or its version is known_version.
+        """
+        entry = self.orderbooks.read(sai_symbol, known_version)
+        if entry is None or not entry[0]:
+            return None
+        version, (bid_prices, bid_amounts, ask_prices, ask_amounts) = entry
+        orderbook = CompactOrderbook(
+            CompactOrderbookSide(bid_prices, bid_amounts),
+            CompactOrderbookSide(ask_prices, ask_amounts),
+        )
+        return version, orderbook
+
+    def read_candle(self, sai_symbol, interval):
+        """
+        copy of the published CandleSeries, None if it is not published.
+        """
+        key = candle_key(sai_symbol, interval)
+        if key not in self.candles.keys:
+            return None
+        version, columns = self.candles.read(key)
+        if not version:
+            return None
+        return CandleSeries.from_columns(columns, self.candles.capacity)
+
+    def close(self):
+        self.orderbooks.close()
+        self.candles.close()
+
+    def unlink(self):
+        self.orderbooks.unlink()
+        self.candles.unlink()
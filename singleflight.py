@@ -0,0 +1,114 @@
+import asyncio
+import threading
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight(object):
+    """
+    concurrent calls of the same key share one execution of the function,
+    callers which arrive while it is in flight get its result or its exception.
+
+    copy: function(result) -> result, when a call is shared every caller gets
+        copy of the result, so one caller mutating its result does not reach
+        the others. without copy the result is shared and must not be mutated.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = dict()
+        # event loop: {key: future}, futures can not be awaited from other loops.
+        self._futures = dict()
+
+        self.calls = 0
+        self.collapsed = 0
+
+    def do(self, key, fn, copy=None):
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+                self.collapsed += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result if copy is None else copy(call.result)
+
+        try:
+            call.result = fn()
+        except Exception as ex:
+            call.error = ex
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        # followers are counted until the key is deleted, the leader keeps
+        # the result itself only when nobody else got it.
+        if copy is not None and call.followers:
+            return copy(call.result)
+        return call.result
+
+    async def do_async(self, key, fn, copy=None):
+        """
+        fn: coroutine function, shared by calls in the same event loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.calls += 1
+            futures = self._futures.setdefault(loop, dict())
+            future = futures.get(key)
+            leader = future is None
+            if leader:
+                future = futures[key] = loop.create_future()
+                future.followers = 0
+            else:
+                future.followers += 1
+                self.collapsed += 1
+
+        if not leader:
+            # a cancelled follower does not cancel the leader.
+            result = await asyncio.shield(future)
+            return result if copy is None else copy(result)
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as ex:
+            future.set_exception(ex)
+            # retrieved, so a future without followers does not log the exception.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                del futures[key]
+                if not futures:
+                    self._futures.pop(loop, None)
+        if copy is not None and future.followers:
+            return copy(result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "collapsed": self.collapsed,
+                "in_flight": len(self._calls)
+                + sum(len(futures) for futures in self._futures.values()),
+            }
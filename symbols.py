@@ -0,0 +1,67 @@
+import sys
+
+
+class SymbolIndex(object):
+    """
+    SAI symbol <-> exchange symbol maps built once from the markets of an exchange,
+    lookups are a dict access instead of parsing the symbol on every message.
+
+    each symbol gets an integer id in the order it is added, ids are compact keys
+    of per-symbol arrays or tables. symbols are interned so the keys stored from
+    websocket messages share one string object per symbol.
+    exchange symbols are found in upper and lower case, streams use lower case.
+    """
+
+    def __init__(self):
+        self._exchange_by_sai = dict()
+        self._sai_by_exchange = dict()
+        self._id_by_sai = dict()
+        self._sai_by_id = list()
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """
+        pairs: iterable of (sai_symbol, exchange_symbol)
+        """
+        index = cls()
+        for sai_symbol, exchange_symbol in pairs:
+            index.add(sai_symbol, exchange_symbol)
+        return index
+
+    def add(self, sai_symbol, exchange_symbol):
+        """
+        return id of sai_symbol, an added symbol keeps its id.
+        """
+        sai_symbol = sys.intern(sai_symbol)
+        exchange_symbol = sys.intern(exchange_symbol)
+        self._exchange_by_sai[sai_symbol] = exchange_symbol
+        self._sai_by_exchange[exchange_symbol] = sai_symbol
+        self._sai_by_exchange[sys.intern(exchange_symbol.upper())] = sai_symbol
+        self._sai_by_exchange[sys.intern(exchange_symbol.lower())] = sai_symbol
+
+        symbol_id = self._id_by_sai.get(sai_symbol)
+        if symbol_id is None:
+            symbol_id = self._id_by_sai[sai_symbol] = len(self._sai_by_id)
+            self._sai_by_id.append(sai_symbol)
+        return symbol_id
+
+    def to_exchange(self, sai_symbol):
+        return self._exchange_by_sai.get(sai_symbol)
+
+    def to_sai(self, exchange_symbol):
+        return self._sai_by_exchange.get(exchange_symbol)
+
+    def get_id(self, sai_symbol):
+        return self._id_by_sai.get(sai_symbol)
+
+    def get_sai(self, symbol_id):
+        return self._sai_by_id[symbol_id]
+
+    def sai_symbols(self):
+        return list(self._sai_by_id)
+
+    def __len__(self):
+        return len(self._sai_by_id)
+
+    def __contains__(self, sai_symbol):
+        return sai_symbol in self._id_by_sai
@@ -1,9 +1,10 @@
-import requests
 import jwt
 import json
 import time
 from urllib.parse import urlencode
-import aiohttp
+
+from Exchanges.settings import SessionConsts
+from Exchanges.sessions import create_session, AsyncSessionManager
 
 
 class DepositStatus(object):
@@ -34,10 +35,35 @@ class BaseTradeType(object):
 
 
 class UpbitAPI(object):
-    def __init__(self, key, secret):
+    def __init__(
+        self,
+        key,
+        secret,
+        pool_size=SessionConsts.POOL_SIZE,
+        max_retries=SessionConsts.MAX_RETRIES,
+        timeout=SessionConsts.TIMEOUT,
+        base_url="https://api.upbit.com/v1",
+    ):
         self.__key = key
         self.__secret = secret
-        self.__base_url = "https://api.upbit.com/v1"
+        self.__base_url = base_url
+        self.__session = create_session(pool_size, max_retries)
+        self.__async_session = AsyncSessionManager(timeout=timeout)
+        self.__timeout = timeout
+
+    def close(self):
+        self.__session.close()
+
+    async def aclose(self):
+        await self.__async_session.close()
+        self.close()
+
+    async def __aenter__(self):
+        await self.__async_session.get()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
 
     def get_ticker(self, symbol):
         return self.__public_api("/ticker", {"markets": symbol})
@@ -101,14 +127,16 @@ class UpbitAPI(object):
         return await self.__async_get_private_api("/withdraws/chance", {"currency": coin})
 
     async def get_transaction_fee(self):
-        return self.__async_get_raw_api(
+        return await self.__async_get_raw_api(
             url="https://api-manager.upbit.com/api/v1/kv/UPBIT_PC_COIN_DEPOSIT_AND_WITHDRAW_GUIDE"
         )
 
     def __public_api(self, path, extra=None):
         if extra is None:
             extra = dict()
-        return requests.get(self.__base_url + path, params=extra)
+        return self.__session.get(
+            self.__base_url + path, params=extra, timeout=self.__timeout
+        )
 
     def __header_generator(self):
         payload = {
@@ -127,10 +155,11 @@ class UpbitAPI(object):
     def __get_private_api(self, path, extra=None):
         extra = {"query": urlencode(extra)} if extra is not None else dict()
 
-        response = requests.get(
+        response = self.__session.get(
             url=self.__base_url + path,
             headers=self.__header_generator(),
-            params=extra
+            params=extra,
+            timeout=self.__timeout
         )
 
         return response.json()
@@ -138,39 +167,38 @@ class UpbitAPI(object):
     def __post_private_api(self, path, extra=None):
         extra = {"query": urlencode(extra)} if extra is not None else dict()
 
-        response = requests.post(
+        response = self.__session.post(
             url=self.__base_url + path,
             headers=self.__header_generator(),
-            data=extra
+            data=extra,
+            timeout=self.__timeout
         )
 
         return response.json()
 
     async def __async_get_raw_api(self, url):
-        async with aiohttp.ClinetSession() as session:
-            response = await session.get(url)
+        session = await self.__async_session.get()
+        async with session.get(url) as response:
             return json.loads(await response.text())
 
     async def __async_get_private_api(self, path, extra=None):
         extra = {"query": urlencode(extra)} if extra is not None else dict()
 
-        async with aiohttp.ClinetSession() as session:
-            response = await session.get(
-                url=self.__base_url + path,
-                headers=self.__header_generator(),
-                params=extra
-            )
-
-            return await json.loads(response.text())
+        session = await self.__async_session.get()
+        async with session.get(
+            url=self.__base_url + path,
+            headers=self.__header_generator(),
+            params=extra
+        ) as response:
+            return json.loads(await response.text())
 
     async def __async_post_private_api(self, path, extra=None):
         extra = {"query": urlencode(extra)} if extra is not None else dict()
 
-        async with aiohttp.ClinetSession() as session:
-            response = await session.post(
-                url=self.__base_url + path,
-                headers=self.__header_generator(),
-                data=extra
-            )
-
-            return await json.loads(response.text())
+        session = await self.__async_session.get()
+        async with session.post(
+            url=self.__base_url + path,
+            headers=self.__header_generator(),
+            data=extra
+        ) as response:
+            return json.loads(await response.text())
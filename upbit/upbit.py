@@ -1,4 +1,5 @@
 from Exchanges.upbit.apis import UpbitAPI
+from Exchanges.symbols import SymbolIndex
 import datetime
 
 
@@ -59,8 +60,33 @@ class SAIDataValidator(object):
 
 class UpbitConverter(object):
     # 각 exchange의 converter의 함수 이름은 동일해야함
+    # SymbolIndex of market/all, symbols are replaced only until it is loaded.
+    index = None
+
+    @classmethod
+    def load_markets(cls, markets):
+        """
+        markets: response of market/all, [{"market": "KRW-BTC", ..}, ..]
+        """
+        cls.index = SymbolIndex.from_pairs(
+            (each["market"].replace("-", "_"), each["market"])
+            for each in markets
+            if each.get("market")
+        )
+        return cls.index
+
+    @staticmethod
+    def get_symbol_id(sai_symbol):
+        if UpbitConverter.index is None:
+            return None
+        return UpbitConverter.index.get_id(sai_symbol)
+
     @staticmethod
     def sai_to_exchange(sai_symbol):
+        if UpbitConverter.index is not None:
+            symbol = UpbitConverter.index.to_exchange(sai_symbol)
+            if symbol is not None:
+                return symbol
         return sai_symbol.replace("_", "-")
 
     @staticmethod
@@ -69,6 +95,10 @@ class UpbitConverter(object):
 
     @staticmethod
     def exchange_to_sai(symbol):
+        if UpbitConverter.index is not None:
+            sai_symbol = UpbitConverter.index.to_sai(symbol)
+            if sai_symbol is not None:
+                return sai_symbol
         return symbol.replace("-", "_")
 
     @staticmethod
@@ -88,11 +118,27 @@ class UpbitConverter(object):
 
 
 class Upbit(object):
-    def __init__(self, key, secret):
-        self.__api = UpbitAPI(key, secret)
+    def __init__(self, key, secret, **options):
+        """
+        options: pool_size, max_retries, timeout, base_url of UpbitAPI
+        """
+        self.__api = UpbitAPI(key, secret, **options)
         self.__validator = SAIDataValidator()
         self.__converter = UpbitConverter
 
+    def close(self):
+        self.__api.close()
+
+    async def aclose(self):
+        await self.__api.aclose()
+
+    async def __aenter__(self):
+        await self.__api.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
     def get_deposit_history(self, coin, number):
         result = self.__api.get_accepted_deposits(coin)
         return ExchangeResult(
@@ -131,6 +177,7 @@ class Upbit(object):
 
     def get_available_symbols(self):
         result = self.__api.get_all_market()
+        self.__converter.load_markets(result)
 
         sai_symbol_list = []
         for each in result: